@@ -9,6 +9,28 @@ print(f"GITHUB_CLIENT_ID:{GITHUB_CLIENT_ID}")
 GITHUB_CLIENT_SECRET = os.getenv("GITHUB_CLIENT_SECRET")
 print(f"GITHUB_CLIENT_SECRET:{GITHUB_CLIENT_SECRET}")
 
+# GitHub API (overridable to point at a mock server)
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+GITHUB_OAUTH_URL = os.getenv("GITHUB_OAUTH_URL", "https://github.com")
+GITHUB_HTTP_MAX_CONNECTIONS = int(os.getenv("GITHUB_HTTP_MAX_CONNECTIONS", "100"))
+GITHUB_HTTP_MAX_RETRIES = int(os.getenv("GITHUB_HTTP_MAX_RETRIES", "3"))
+# below this many remaining calls, requests are spread out until the limit resets
+GITHUB_RATE_LIMIT_RESERVE = int(os.getenv("GITHUB_RATE_LIMIT_RESERVE", "100"))
+# installation tokens are refreshed in the background inside the refresh-ahead
+# window and never handed out with less than the min TTL left
+GITHUB_TOKEN_REFRESH_AHEAD_SECONDS = int(os.getenv("GITHUB_TOKEN_REFRESH_AHEAD_SECONDS", "300"))
+GITHUB_TOKEN_MIN_TTL_SECONDS = int(os.getenv("GITHUB_TOKEN_MIN_TTL_SECONDS", "60"))
+# tokens handed to agent jobs must outlive the job
+GITHUB_JOB_TOKEN_MIN_TTL_SECONDS = int(os.getenv("GITHUB_JOB_TOKEN_MIN_TTL_SECONDS", "1800"))
+# ETag cache: entries are revalidated with If-None-Match once older than FRESH
+GITHUB_CACHE_TTL_SECONDS = int(os.getenv("GITHUB_CACHE_TTL_SECONDS", "86400"))
+GITHUB_CACHE_FRESH_SECONDS = float(os.getenv("GITHUB_CACHE_FRESH_SECONDS", "10"))
+# listings: pages fetched in parallel after the first, and a hard page cap
+GITHUB_PAGE_CONCURRENCY = int(os.getenv("GITHUB_PAGE_CONCURRENCY", "4"))
+GITHUB_MAX_PAGES = int(os.getenv("GITHUB_MAX_PAGES", "50"))
+# installation -> repo metadata index, refreshed by listings and webhooks
+REPO_INDEX_TTL_SECONDS = int(os.getenv("REPO_INDEX_TTL_SECONDS", str(7 * 86400)))
+
 # GitHub App
 GITHUB_APP_ID = os.getenv("GITHUB_APP_ID")
 print(f"GITHUB_APP_ID:{GITHUB_APP_ID}")
@@ -18,6 +40,18 @@ GITHUB_APP_CLIENT_SECRET = os.getenv("GITHUB_APP_CLIENT_SECRET")
 print(f"GITHUB_APP_CLIENT_SECRET:{GITHUB_APP_CLIENT_SECRET}")
 GITHUB_PRIVATE_KEY_PATH = os.getenv("GITHUB_PRIVATE_KEY_PATH")
 print(f"GITHUB_PRIVATE_KEY_PATH:{GITHUB_PRIVATE_KEY_PATH}")
+# webhooks: signed with this secret, deduplicated by delivery id for the TTL,
+# queued on a Redis stream and handled in batches collected over the window
+GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET")
+WEBHOOK_QUEUE_KEY = os.getenv("WEBHOOK_QUEUE_KEY", "webhooks:stream")
+WEBHOOK_CONSUMER_GROUP = os.getenv("WEBHOOK_CONSUMER_GROUP", "webhooks")
+# deliveries a consumer took but never acked (it crashed) are taken over after this long
+WEBHOOK_CLAIM_IDLE_SECONDS = int(os.getenv("WEBHOOK_CLAIM_IDLE_SECONDS", "60"))
+WEBHOOK_DEDUPE_TTL_SECONDS = int(os.getenv("WEBHOOK_DEDUPE_TTL_SECONDS", str(3 * 86400)))
+WEBHOOK_BATCH_WINDOW_SECONDS = float(os.getenv("WEBHOOK_BATCH_WINDOW_SECONDS", "0.5"))
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "100"))
+# adding this label to a pull request starts an agent job on its branch
+WEBHOOK_JOB_LABEL = os.getenv("WEBHOOK_JOB_LABEL", "rawgent")
 
 # LLM
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -27,6 +61,24 @@ VERTEX_AI_API_KEY = os.getenv("VERTEX_AI_API_KEY")
 GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
 GCP_REGION = os.getenv("GCP_REGION")
 CLOUD_RUN_JOB = os.getenv("CLOUD_RUN_JOB")
+# where jobs run: cloud_run, local (job_runner subprocess) or redis (warm workers)
+JOB_DISPATCHER = os.getenv("JOB_DISPATCHER", "cloud_run")
+JOB_QUEUE_KEY = os.getenv("JOB_QUEUE_KEY", "jobs:pending")
+# admission control in front of the dispatcher
+SCHEDULER_MAX_RUNNING = int(os.getenv("SCHEDULER_MAX_RUNNING", "20"))
+SCHEDULER_MAX_RUNNING_PER_INSTALLATION = int(os.getenv("SCHEDULER_MAX_RUNNING_PER_INSTALLATION", "3"))
+SCHEDULER_MAX_QUEUED = int(os.getenv("SCHEDULER_MAX_QUEUED", "100"))
+# a slot is reclaimed after this long even if no terminal status arrives
+SCHEDULER_SLOT_TTL_SECONDS = int(os.getenv("SCHEDULER_SLOT_TTL_SECONDS", "7200"))
+SCHEDULER_RETRY_AFTER_SECONDS = int(os.getenv("SCHEDULER_RETRY_AFTER_SECONDS", "30"))
+# after COMPLETED the runner keeps answering follow-ups for FOLLOW_UP_TIMEOUT; its slot is
+# released when it exits, or reclaimed this long after COMPLETED if the exit never arrives
+SCHEDULER_FOLLOW_UP_SLOT_SECONDS = int(os.getenv(
+    "SCHEDULER_FOLLOW_UP_SLOT_SECONDS", str(int(os.getenv("FOLLOW_UP_TIMEOUT", "600")) + 60)))
+JOB_RUNNER_PATH = os.getenv(
+    "JOB_RUNNER_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "job_runner"),
+)
 
 # FrontEnd URL
 FRONTEND_URL = os.getenv("FRONTEND_URL")
@@ -36,3 +88,46 @@ print(f"frontend url:{FRONTEND_URL}")
 BACKEND_URL = os.getenv("BACKEND_URL")
 REDIS_URL = os.getenv("REDIS_URL")
 
+# Job store (Redis hashes + local read-through cache)
+JOB_STATE_TTL_SECONDS = int(os.getenv("JOB_STATE_TTL_SECONDS", "86400"))
+JOB_CACHE_TTL_SECONDS = float(os.getenv("JOB_CACHE_TTL_SECONDS", "2"))
+JOB_CACHE_SIZE = int(os.getenv("JOB_CACHE_SIZE", "1024"))
+# per-job event streams (job:{id}:events) for WebSocket resume; approximate cap
+JOB_EVENTS_MAXLEN = int(os.getenv("JOB_EVENTS_MAXLEN", "1000"))
+# status updates are also appended to one shared stream, which a consumer group
+# persists into the job store exactly once across replicas; the cap only
+# matters while no backend is consuming
+JOB_STATUS_STREAM = os.getenv("JOB_STATUS_STREAM", "jobs:status")
+JOB_STATUS_GROUP = os.getenv("JOB_STATUS_GROUP", "job-status")
+JOB_STATUS_STREAM_MAXLEN = int(os.getenv("JOB_STATUS_STREAM_MAXLEN", "100000"))
+# updates a replica took but never acked (it crashed) are taken over after this long
+JOB_STATUS_CLAIM_IDLE_SECONDS = int(os.getenv("JOB_STATUS_CLAIM_IDLE_SECONDS", "30"))
+# job event envelopes at least this large are zstd-compressed (0 disables)
+WIRE_COMPRESS_MIN_BYTES = int(os.getenv("WIRE_COMPRESS_MIN_BYTES", "4096"))
+# Server-Sent Events: events a subscriber may fall behind before its stream is
+# ended (it resumes with Last-Event-ID), and the keep-alive comment interval
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "256"))
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+# most events replayed to a reconnecting socket before sending a snapshot instead
+WS_REPLAY_MAX_EVENTS = int(os.getenv("WS_REPLAY_MAX_EVENTS", "500"))
+
+# WebSocket send queues: a client further behind than this, or a single send
+# slower than the timeout, is disconnected (it reconnects and gets a snapshot)
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "10"))
+# clients offering the job-events.deflate subprotocol get messages of at least
+# this size as deflated binary frames. Run uvicorn with --ws-per-message-deflate
+# false so the transport doesn't deflate every frame again.
+WS_COMPRESS_MIN_BYTES = int(os.getenv("WS_COMPRESS_MIN_BYTES", "1024"))
+WS_COMPRESS_LEVEL = int(os.getenv("WS_COMPRESS_LEVEL", "6"))
+
+# Metrics: job runners push their phase and tool timings onto this list
+# (capped at RUNNER_METRICS_MAXLEN); each /metrics scrape drains it
+RUNNER_METRICS_KEY = os.getenv("RUNNER_METRICS_KEY", "metrics:runner")
+RUNNER_METRICS_DRAIN_MAX = int(os.getenv("RUNNER_METRICS_DRAIN_MAX", "10000"))
+
+# Tracing (core/tracing.py): memory keeps the newest TRACE_BUFFER_SPANS spans
+# for /internal/traces/{trace_id}, jsonl appends them to TRACE_FILE, none drops them
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "memory")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_BUFFER_SPANS = int(os.getenv("TRACE_BUFFER_SPANS", "10000"))
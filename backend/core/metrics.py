@@ -0,0 +1,217 @@
+"""
+Prometheus text exposition (format 0.0.4) without a client library.
+
+Hot paths only touch plain dicts: `Counter.inc` adds to a float and
+`Histogram.observe` bumps one bucket (bisect) plus a sum and a count; buckets
+are made cumulative when `/metrics` is scraped, not when observed. Numbers
+the services already keep for their /internal/*/metrics endpoints are not
+counted twice: collectors copy them into `Gauge`s right before rendering.
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# seconds; from one Redis round trip to a whole agent job
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def _labels(self, values: Labels, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.label_names, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterable[str]:
+        return ()
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples(),
+        ]
+
+
+class Counter(Metric):
+    """monotonic total per label values"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.values.items():
+            yield f"{self.name}{self._labels(labels)} {_number(value)}"
+
+
+class Gauge(Metric):
+    """
+    Current value per label values.
+
+    With kind="counter" it exposes a total some service already counts,
+    copied in by a collector at scrape time.
+    """
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), kind: str = "gauge"):
+        super().__init__(name, documentation, labels)
+        self.kind = kind
+        self.values: Dict[Labels, float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self.values[labels] = value
+
+    def clear(self) -> None:
+        self.values.clear()
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.values.items():
+            yield f"{self.name}{self._labels(labels)} {_number(value)}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: "Histogram", labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+
+class Histogram(Metric):
+    """bucketed observations per label values"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self.series: Dict[Labels, list] = {}
+
+    def _series(self, labels: Labels) -> list:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        return series
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series(labels)
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def time(self, *labels: str) -> _Timer:
+        """observe how long the wrapped block takes"""
+        return _Timer(self, labels)
+
+    def load(self, counts: Sequence[int], total: float, *labels: str) -> None:
+        """replace a series with per-bucket counts kept elsewhere (same buckets)"""
+        self.series[labels] = [list(counts), total]
+
+    def samples(self) -> Iterable[str]:
+        for labels, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{self._labels(labels, le)} {cumulative}"
+            yield f"{self.name}_sum{self._labels(labels)} {_number(total)}"
+            yield f"{self.name}_count{self._labels(labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = (), kind: str = "gauge") -> Gauge:
+        return self.register(Gauge(name, documentation, labels, kind))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """register a function that refreshes gauges before each scrape"""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ---------- metrics observed where they happen ----------
+
+JOB_TRANSITIONS = REGISTRY.counter(
+    "rawgent_job_transitions_total", "Job status changes seen by the replica that launched the job", ("from", "to"))
+JOB_QUEUE_WAIT = REGISTRY.histogram(
+    "rawgent_job_queue_wait_seconds", "Time a job waited for a scheduler slot", ("priority",))
+JOB_QUEUE_TO_START = REGISTRY.histogram(
+    "rawgent_job_queue_to_start_seconds", "Time from submission to the job's first running status", ("priority",))
+JOB_DISPATCH_TO_START = REGISTRY.histogram(
+    "rawgent_job_dispatch_to_start_seconds", "Time from dispatch to the job's first running status (runner startup)")
+JOB_RUN = REGISTRY.histogram(
+    "rawgent_job_run_seconds", "Time from the first running status to a terminal status", ("status",))
+
+REDIS_OPERATION = REGISTRY.histogram(
+    "rawgent_redis_operation_seconds", "Latency of Redis operations on the job path", ("operation",))
+
+JOB_UPDATE_HANDLING = REGISTRY.histogram(
+    "rawgent_job_update_handle_seconds",
+    "Time for the job update bus to handle one message and queue it for every local subscriber", ("type",))
+JOB_UPDATE_RECIPIENTS = REGISTRY.histogram(
+    "rawgent_job_update_recipients", "Local WebSocket and SSE subscribers one job message was queued for",
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100))
+
+RUNNER_PHASE = REGISTRY.histogram(
+    "rawgent_runner_phase_seconds", "Job runner phase durations (clone, routing, agent:<name>, diff_collection, publish)",
+    ("phase",))
+RUNNER_TOOL = REGISTRY.histogram(
+    "rawgent_runner_tool_seconds", "Job runner tool call durations", ("tool",))
+RUNNER_JOBS = REGISTRY.counter(
+    "rawgent_runner_jobs_total", "Jobs whose runner reported timings", ("outcome",))
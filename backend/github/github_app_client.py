@@ -1,36 +1,56 @@
 import jwt as pyjwt
 import time
 from core.config import GITHUB_APP_CLIENT_ID, GITHUB_PRIVATE_KEY_PATH
-import httpx
 import os
+from github.http_client import github_http
 
 print(f"GITHUB_APP_ID :{GITHUB_APP_CLIENT_ID} , GITHUB_PRIVATE_KEY_PATH : {GITHUB_PRIVATE_KEY_PATH}")
 
 
+# GitHub accepts app JWTs for at most 10 minutes; iat is backdated for clock drift
+JWT_LIFETIME_SECONDS = 600
+JWT_CLOCK_DRIFT_SECONDS = 60
+# regenerate the cached JWT when it has less than this left
+JWT_REFRESH_MARGIN_SECONDS = 60
+
+_cached_jwt = None
+_cached_jwt_expires_at = 0
+
+
 def generate_jwt():
+    """
+    Return the app JWT, signing a new one only when the cached one is about to
+    expire (RS256 signing is the expensive part).
+    """
+    global _cached_jwt, _cached_jwt_expires_at
     now = int(time.time())
+    if _cached_jwt and _cached_jwt_expires_at - now > JWT_REFRESH_MARGIN_SECONDS:
+        return _cached_jwt
+
     private_key = os.getenv("GITHUB_PRIVATE_KEY_PATH")
     if not private_key:
-        return RuntimeError("Missing GITHUB_PRIVATE_KEY env variable")
+        raise RuntimeError("Missing GITHUB_PRIVATE_KEY env variable")
 
     payload = {
-        "iat": now,
-        "exp": now + 600,
+        "iat": now - JWT_CLOCK_DRIFT_SECONDS,
+        "exp": now + JWT_LIFETIME_SECONDS - JWT_CLOCK_DRIFT_SECONDS,
         "iss": GITHUB_APP_CLIENT_ID
     }
     print(f"payload:{payload}")
-    return pyjwt.encode(payload, private_key, algorithm="RS256")
+    _cached_jwt = pyjwt.encode(payload, private_key, algorithm="RS256")
+    _cached_jwt_expires_at = payload["exp"]
+    return _cached_jwt
     
 
 async def get_installation_access_token(jwt_token, installation_id):
-    url = f"https://api.github.com/app/installations/{installation_id}/access_tokens"
+    url = f"/app/installations/{installation_id}/access_tokens"
     headers = {
         "Authorization": f"Bearer {jwt_token}",
         "Accept": "application/vnd.github+json"
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
+    # a retried mint just returns another token
+    response = await github_http.post(url, headers=headers, installation_id=installation_id, retry=True)
+    response.raise_for_status()
+    return response.json()
 
 
@@ -1,8 +1,8 @@
-import httpx
-from core.config import GITHUB_CLIENT_ID , GITHUB_CLIENT_SECRET
+from core.config import GITHUB_CLIENT_ID , GITHUB_CLIENT_SECRET, GITHUB_OAUTH_URL
+from github.http_client import github_http
 
 async def get_github_access_token(code: str):
-    url = "https://github.com/login/oauth/access_token"
+    url = f"{GITHUB_OAUTH_URL}/login/oauth/access_token"
 
     payload = {
         "client_id": GITHUB_CLIENT_ID,
@@ -12,10 +12,9 @@ async def get_github_access_token(code: str):
     print(f"payload:{payload}")
     headers = {"Accept": "application/json"}
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.json()
+    response = await github_http.post(url, json=payload, headers=headers)
+    response.raise_for_status()
+    return response.json()
 
     
 
@@ -23,30 +22,28 @@ async def get_github_user(access_token:str):
 
     headers = {"Authorization": f"Bearer {access_token}"}
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get("https://api.github.com/user",headers=headers)
-        response.raise_for_status()
-        return response.json()
+    response = await github_http.get("/user",headers=headers)
+    response.raise_for_status()
+    return response.json()
     
 
 async def get_user_repo_list(access_token:str):
-    url = "https://api.github.com/user/repos"
+    url = "/user/repos"
 
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Accept": "application/vnd.github+json"
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url,headers=headers)
-        response.raise_for_status()
-        return response.json()
+    response = await github_http.get(url,headers=headers)
+    response.raise_for_status()
+    return response.json()
     
 
 
 async def get_user_org_repo_list(access_token:str,org:str,type:str,sort:str):
 
-    url = f"https://api.github.com/orgs/{org}/repos"
+    url = f"/orgs/{org}/repos"
 
     headers = {
         "Authorization": f"Bearer {access_token}",
@@ -59,7 +56,6 @@ async def get_user_org_repo_list(access_token:str,org:str,type:str,sort:str):
         "sort": sort
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url,headers=headers,params=params)
-        response.raise_for_status()
-        return response.json()
+    response = await github_http.get(url,headers=headers,params=params)
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import logging
+import random
+import re
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional
+import httpx
+from core.config import (
+    GITHUB_API_URL,
+    GITHUB_HTTP_MAX_CONNECTIONS,
+    GITHUB_HTTP_MAX_RETRIES,
+    GITHUB_RATE_LIMIT_RESERVE,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+# longest we are willing to wait inside a request for a retry / throttle
+MAX_BACKOFF_SECONDS = 10.0
+MAX_THROTTLE_SECONDS = 2.0
+
+# retried by default; POST and PATCH only when the caller says it is safe
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class GitHubRateLimitError(Exception):
+    """raised when a rate limit is exhausted and the reset is too far away to wait for"""
+    def __init__(self, rate_key: str, retry_after: float):
+        super().__init__(f"GitHub rate limit exhausted for {rate_key}, resets in {retry_after:.0f}s")
+        self.rate_key = rate_key
+        self.retry_after = retry_after
+
+
+def metric_route(path: str) -> str:
+    """collapse ids and names in a path so metrics group by endpoint"""
+    path = re.sub(r"^https?://[^/]+", "", path).split("?")[0]
+    path = re.sub(r"^/repos/[^/]+/[^/]+", "/repos/{owner}/{repo}", path)
+    path = re.sub(r"^/orgs/[^/]+", "/orgs/{org}", path)
+    path = re.sub(r"/branches/.+$", "/branches/{branch}", path)
+    return re.sub(r"/\d+(?=/|$)", "/{id}", path)
+
+
+class GitHubHTTPClient:
+    """
+    One pooled HTTP/2 client for every GitHub API call in the process.
+
+    * keep-alive connection pooling (no TLS handshake per call)
+    * retries with full jitter on 5xx, 429 and secondary rate limits
+      (idempotent methods only, unless the caller opts in with retry=True)
+    * tracks X-RateLimit-* per installation / token and spreads calls out
+      when the remaining budget gets low
+    * request count, status and latency metrics per endpoint
+    """
+    def __init__(self, base_url: str = GITHUB_API_URL, max_connections: int = GITHUB_HTTP_MAX_CONNECTIONS,
+                 max_retries: int = GITHUB_HTTP_MAX_RETRIES, rate_limit_reserve: int = GITHUB_RATE_LIMIT_RESERVE,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.rate_limit_reserve = rate_limit_reserve
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # rate key -> {"limit", "remaining", "reset", "resource"}
+        self.rate_limits: Dict[str, Dict[str, Any]] = {}
+
+        # "METHOD route" -> counters
+        self.requests: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.retries: Dict[str, int] = defaultdict(int)
+        self.latency_sum: Dict[str, float] = defaultdict(float)
+        self.latency_buckets: Dict[str, list] = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+        self.throttled_seconds = 0.0
+
+    # ---------- lifecycle ----------
+
+    def _build_client(self) -> httpx.AsyncClient:
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            logger.warning("⚠️ h2 not installed, GitHub client falls back to HTTP/1.1")
+            http2 = False
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=http2,
+            transport=self._transport,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=max(1, self.max_connections // 2),
+                keepalive_expiry=60,
+            ),
+            timeout=httpx.Timeout(15.0, connect=5.0),
+            headers={"Accept": "application/vnd.github+json"},
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def start(self):
+        """open the shared client (called from the app lifespan)"""
+        _ = self.client
+        logger.info(f"✅ GitHub HTTP client ready ({self.base_url})")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("❌ GitHub HTTP client closed")
+
+    # ---------- rate limits ----------
+
+    @staticmethod
+    def rate_key_for(headers: Dict[str, str], installation_id: Optional[str]) -> str:
+        """
+        Budget a request counts against. Calls made with the app JWT (e.g.
+        minting an installation token) use the app's own limit, not the
+        installation's, even when they name an installation.
+        """
+        auth = headers.get("Authorization", "")
+        if auth.startswith("Bearer eyJ"):
+            return "app:" + hashlib.sha256(auth.encode()).hexdigest()[:12]
+        if installation_id:
+            return f"installation:{installation_id}"
+        if not auth:
+            return "anonymous"
+        return "token:" + hashlib.sha256(auth.encode()).hexdigest()[:12]
+
+    def _record_rate_limit(self, rate_key: str, response: httpx.Response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        self.rate_limits[rate_key] = {
+            "limit": int(response.headers.get("X-RateLimit-Limit", 0)),
+            "remaining": int(remaining),
+            "reset": int(reset),
+            "resource": response.headers.get("X-RateLimit-Resource", "core"),
+        }
+
+    async def _throttle(self, rate_key: str):
+        """spread the remaining budget over the time left until reset"""
+        state = self.rate_limits.get(rate_key)
+        if not state or state["remaining"] > self.rate_limit_reserve:
+            return
+        until_reset = max(0.0, state["reset"] - time.time())
+        if until_reset <= 0:
+            return
+        if state["remaining"] <= 0:
+            if until_reset > MAX_BACKOFF_SECONDS:
+                raise GitHubRateLimitError(rate_key, until_reset)
+            delay = until_reset
+        else:
+            delay = min(MAX_THROTTLE_SECONDS, until_reset / state["remaining"])
+        # count the call we are about to make
+        state["remaining"] = max(0, state["remaining"] - 1)
+        self.throttled_seconds += delay
+        logger.info(f"🐢 Throttling {rate_key} for {delay:.2f}s ({state['remaining']} calls left)")
+        await asyncio.sleep(delay)
+
+    # ---------- requests ----------
+
+    @staticmethod
+    def _should_retry(response: httpx.Response) -> bool:
+        if response.status_code >= 500 or response.status_code == 429:
+            return True
+        if response.status_code == 403:
+            # secondary rate limits come back as 403 with Retry-After or a message
+            if "Retry-After" in response.headers:
+                return True
+            return "secondary rate limit" in response.text.lower()
+        return False
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        if response is not None and "Retry-After" in response.headers:
+            try:
+                return min(MAX_BACKOFF_SECONDS, float(response.headers["Retry-After"]))
+            except ValueError:
+                pass
+        # full jitter
+        return random.uniform(0, min(MAX_BACKOFF_SECONDS, 0.5 * 2 ** attempt))
+
+    def _observe(self, metric: str, started: float, status: Optional[int]):
+        elapsed = time.perf_counter() - started
+        self.requests[metric] += 1
+        self.latency_sum[metric] += elapsed
+        buckets = self.latency_buckets[metric]
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if elapsed <= bound:
+                buckets[index] += 1
+                break
+        else:
+            buckets[-1] += 1
+        if status is None:
+            self.errors[metric] += 1
+        else:
+            self.statuses[metric][status] += 1
+
+    async def request(self, method: str, url: str, *, installation_id: Optional[str] = None,
+                      headers: Optional[Dict[str, str]] = None, retry: Optional[bool] = None,
+                      **kwargs) -> httpx.Response:
+        """
+        Send a request through the shared client.
+        Relative URLs go to GITHUB_API_URL; absolute URLs are sent as-is.
+
+        Args:
+            retry: retry failed attempts; defaults to True for idempotent
+                methods only, so a POST is sent once unless the caller knows
+                repeating it is harmless
+
+        Returns:
+            The final response (callers still decide whether to raise_for_status)
+        """
+        headers = headers or {}
+        rate_key = self.rate_key_for(headers, installation_id)
+        metric = f"{method.upper()} {metric_route(url)}"
+        if retry is None:
+            retry = method.upper() in IDEMPOTENT_METHODS
+        max_retries = self.max_retries if retry else 0
+
+        attempt = 0
+        while True:
+            await self._throttle(rate_key)
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, headers=headers, **kwargs)
+            except httpx.TransportError as e:
+                self._observe(metric, started, None)
+                if attempt >= max_retries:
+                    raise
+                delay = self._backoff(attempt, None)
+                logger.warning(f"⚠️ {metric} failed ({e}), retrying in {delay:.2f}s")
+            else:
+                self._observe(metric, started, response.status_code)
+                self._record_rate_limit(rate_key, response)
+                if attempt >= max_retries or not self._should_retry(response):
+                    return response
+                delay = self._backoff(attempt, response)
+                logger.warning(f"⚠️ {metric} returned {response.status_code}, retrying in {delay:.2f}s")
+            attempt += 1
+            self.retries[metric] += 1
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    # ---------- metrics ----------
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """request and rate limit metrics for the internal metrics endpoint"""
+        endpoints = {}
+        for metric, count in self.requests.items():
+            endpoints[metric] = {
+                "requests": count,
+                "errors": self.errors.get(metric, 0),
+                "retries": self.retries.get(metric, 0),
+                "statuses": dict(self.statuses.get(metric, {})),
+                "latency_avg_seconds": self.latency_sum[metric] / count if count else 0.0,
+                "latency_buckets": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], self.latency_buckets[metric])),
+            }
+        return {
+            "endpoints": endpoints,
+            "rate_limits": self.rate_limits,
+            "throttled_seconds": self.throttled_seconds,
+        }
+
+
+github_http = GitHubHTTPClient()
@@ -26,6 +26,8 @@ class RunAgentRequest(BaseModel):
 class RunAgentResponse(BaseModel):
     job_id:str
     status: str = "queued"
+    queue_position: Optional[int] = None  # set while waiting for a free slot
+    trace_id: Optional[str] = None  # spans at /internal/traces/{trace_id}
 
 class FileChange(BaseModel):
     file_path: str
@@ -1,9 +1,38 @@
-from fastapi import APIRouter , Request
-from fastapi.responses import JSONResponse
-from services.github_app_service import get_repos_from_installation , get_repo_branches
+import hashlib
+import json
+from fastapi import APIRouter , Request, Response
+from typing import AsyncIterator
+from fastapi.responses import JSONResponse, StreamingResponse
+from services.github_app_service import (
+    get_repos_from_installation , get_repo_branches, iter_installation_repos, iter_repo_branches
+)
 
 router = APIRouter()
 
+# per-user (cookie) data: browsers may keep it but must revalidate every time
+CACHE_CONTROL = "private, no-cache"
+
+
+def conditional_json_response(request: Request, content: dict) -> Response:
+    """JSON response with a strong ETag; 304 when the browser already has it"""
+    body = json.dumps(content, separators=(",", ":"), sort_keys=True).encode()
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Cookie"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def ndjson_lines(pages: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    """one JSON document per item, flushed page by page; errors end the stream with an error line"""
+    try:
+        async for page in pages:
+            yield b"".join(json.dumps(item, separators=(",", ":")).encode() + b"\n" for item in page)
+    except Exception as e:
+        print(f"[ERROR] Listing stream failed: {e}")
+        yield json.dumps({"error": "Failed to fetch the full listing"}).encode() + b"\n"
+
 
 @router.get("/installation-repos")
 async def list_installation_repos(request: Request):
@@ -16,7 +45,7 @@ async def list_installation_repos(request: Request):
         repos_data = await get_repos_from_installation(installation_id)
         repos = repos_data.get("repositories",[])
         # return JSONResponse({"repositories": repos_data["repositories"]})
-        return JSONResponse({"repositories": repos})
+        return conditional_json_response(request, {"repositories": repos})
     except Exception as e:
         print(f"[ERROR] Failed to get repos from installation: {e}")
         return JSONResponse({"error": "Failed to fetch repositories"}, status_code=500)
@@ -30,7 +59,32 @@ async def name(repo_name:str,request:Request):
     
     try:
       branches = await get_repo_branches(installation_id,repo_name)
-      return JSONResponse({"Branches":branches})
+      return conditional_json_response(request, {"Branches":branches})
     except Exception as e:
         print(f"[ERROR] Failed to get repos from installation: {e}")
         return JSONResponse({"error": "Failed to fetch repositories"}, status_code=500)
+
+
+@router.get("/installation-repos/stream")
+async def stream_installation_repos(request: Request):
+    # NDJSON variant: the first page renders while the rest are fetched
+    installation_id = request.cookies.get("installation_id")
+    if not installation_id:
+        return JSONResponse({"error": "GitHub App not installed or installation_id missing"}, status_code=400)
+    return StreamingResponse(
+        ndjson_lines(iter_installation_repos(installation_id)),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+@router.get("/branches/{repo_name}/stream")
+async def stream_repo_branches(repo_name: str, request: Request):
+    installation_id = request.cookies.get("installation_id")
+    if not installation_id:
+        return JSONResponse({"error": "No installation ID"}, status_code=400)
+    return StreamingResponse(
+        ndjson_lines(iter_repo_branches(installation_id, repo_name)),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store"},
+    )
@@ -1,12 +1,20 @@
 import asyncio
-from datetime import datetime
 import json
 import logging
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
-from services.job import get_job_status, schedule_agent_job, update_job_status
-from models.agent_model import JobStatusResponse, RunAgentRequest , RunAgentResponse
+from typing import Optional
+import orjson
+from fastapi import APIRouter, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+from services.job import get_job_seq, get_job_status_with_seq, schedule_agent_job
+from services.status_view import StatusQueryError, StatusView
+from models.agent_model import JobStatus, JobStatusResponse, RunAgentRequest , RunAgentResponse
 from services.ws import manager
-from services.redis import redisservices
+from fastapi.responses import StreamingResponse
+from services.redis import covered_until, redisservices, stream_id
+from services.job_events import catch_up, event_hub
+from core.config import SSE_KEEPALIVE_SECONDS
+from core.tracing import tracer
+from services.scheduler import QueueFullError
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,39 +24,137 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# browsers revalidate every poll with If-None-Match
+STATUS_CACHE_CONTROL = "private, no-cache"
+
 @router.post("/agent/run" , response_model=RunAgentResponse)
-async def run_agent(payload: RunAgentRequest)->RunAgentResponse:
-    job_id = await  schedule_agent_job(payload)
-    return RunAgentResponse(job_id=job_id,status="queued")
+async def run_agent(payload: RunAgentRequest, request: Request)->RunAgentResponse:
+    # the job's trace starts here, or continues the caller's
+    with tracer.span("agent.run", parent=request.headers.get("traceparent"), repo=payload.repo_name) as span:
+        try:
+            job_id, position = await schedule_agent_job(payload)
+        except QueueFullError as e:
+            span.set("rejected", True)
+            return JSONResponse(
+                {"detail": str(e)}, status_code=429, headers={"Retry-After": str(e.retry_after)}
+            )
+    return RunAgentResponse(job_id=job_id,status="queued",queue_position=position,trace_id=span.trace_id)
 
 @router.get("/agent/status/{job_id}",response_model = JobStatusResponse)
-def get_agent_status(job_id:str)->JobStatusResponse:
-    status = get_job_status(job_id=job_id)
+async def get_agent_status(
+    job_id:str,
+    request:Request,
+    fields:Optional[str]=None,
+    messages_cursor:Optional[str]=None,
+    messages_limit:Optional[int]=None,
+    file_changes_cursor:Optional[str]=None,
+    file_changes_limit:Optional[int]=None,
+):
+    # fields / cursors select part of the status (see StatusView); an unchanged
+    # job answers 304 from its version alone, without loading the status
+    try:
+        view = StatusView(
+            fields,
+            cursors={"messages": messages_cursor, "file_changes": file_changes_cursor},
+            limits={"messages": messages_limit, "file_changes": file_changes_limit},
+        )
+    except StatusQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    seq = await get_job_seq(job_id)
+    if seq is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if etag_matches(request, view.etag(seq)):
+        return Response(status_code=304, headers={"ETag": view.etag(seq), "Cache-Control": STATUS_CACHE_CONTROL})
+
+    status, seq = await get_job_status_with_seq(job_id=job_id)
     if not status:
         raise HTTPException(status_code=404, detail="Job not found")
-    return status
+    return Response(
+        content=orjson.dumps(view.render(status.model_dump(mode="json"))),
+        media_type="application/json",
+        headers={"ETag": view.etag(seq), "Cache-Control": STATUS_CACHE_CONTROL},
+    )
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match", "")
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+@router.get("/agent/events/{job_id}")
+async def stream_agent_events(job_id:str, request:Request, last_event_id:Optional[str]=None):
+    """
+    Read-only job progress as Server-Sent Events: the same messages as
+    /ws/status/{job_id}, one `data:` line each, with the stream id as the SSE
+    id so EventSource resumes by itself (Last-Event-ID). Served over HTTP/2
+    many of these share one connection.
+    """
+    if await get_job_seq(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    # subscribe before catching up so nothing published meanwhile is lost
+    queue = event_hub.subscribe(job_id)
+    resume_from = request.headers.get("last-event-id") or last_event_id
+
+    async def events():
+        try:
+            backlog, after = await catch_up(job_id, resume_from)
+            last = covered_until(backlog, after)
+            yield "retry: 3000\n\n"
+            for message_type, text, event_id in backlog:
+                yield sse_event(text, event_id)
+                if is_final(message_type, text):
+                    return
+            while True:
+                try:
+                    async with asyncio.timeout(SSE_KEEPALIVE_SECONDS):
+                        item = await queue.get()
+                except TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    # too slow or shutting down: the browser reconnects and resumes
+                    return
+                message_type, text, event_id = item
+                if last is not None and event_id and stream_id(event_id) <= last:
+                    continue
+                event_hub.events_sent += 1
+                yield sse_event(text, event_id)
+                if is_final(message_type, text):
+                    return
+        finally:
+            event_hub.unsubscribe(job_id, queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        # don't let nginx style proxies buffer the stream
+        "X-Accel-Buffering": "no",
+    })
+
+
+def sse_event(text: str, event_id: Optional[str]) -> str:
+    # browser texts are single-line JSON
+    return f"id: {event_id}\ndata: {text}\n\n" if event_id else f"data: {text}\n\n"
+
+
+def is_final(message_type: Optional[str], text: str) -> bool:
+    """a completed/failed status ends an event stream (EventSource would otherwise reconnect)"""
+    if message_type != "status_update":
+        return False
+    status = json.loads(json.loads(text).get("content") or "{}").get("status")
+    return status in (JobStatus.COMPLETED.value, JobStatus.FAILED.value)
 
 @router.websocket("/ws/status/{job_id}")
 async def websocket_handler(websocket:WebSocket,job_id:str):
-    # connect the 
-    await manager.connect(websocket=websocket,job_id=job_id)
-
-    # subscribe to redis
-    pubsub = await redisservices.subscribe_to_job(job_id=job_id)
+    # connect the socket; the job update bus fans this job's messages out to it,
+    # held back until the client has caught up
+    await manager.connect(websocket=websocket,job_id=job_id,hold=True)
 
     try:
-        # send initial status 
-        status = get_job_status(job_id=job_id)
-        if status:
-            await websocket.send_json({
-                "type":"status_update",
-                "data":status.dict(),
-                "timestamp":datetime.now().isoformat()
-            })
+        # a reconnecting client gets the events it missed, anyone else the current status
+        backlog, after = await catch_up(job_id, websocket.query_params.get("last_event_id"))
+        manager.release(websocket, job_id, backlog, after=after)
         
-        #  run two jobs parallel
-        
-        # 1.listen to websocket
+        # listen to websocket
         async def listen_to_websocket():
             try:
                 while True:
@@ -75,34 +181,8 @@ async def websocket_handler(websocket:WebSocket,job_id:str):
               logger.info(f"Error in websocket listener: {e}")
               logging.info(f"Error in websocket listener: {e}")
 
-        # 2.listen to redis for the messages from cloud
-        async def listen_to_redis():
-            try:
-                async for redis_message in pubsub.listen():
-                    if redis_message.get("type") == "message":
-                        data = json.loads(redis_message["data"])
-                        
-                        # ✅ Update job status if it's a status update
-                        if data.get("type") == "status_update":
-                            try:
-                                status_data = json.loads(data["content"])
-                                update_job_status(job_id, status_data)
-                                logger.debug(f"📊 Updated job status: {status_data.get('status')}")
-                            except Exception as e:
-                                logger.error(f"❌ Failed to update status: {e}")
-                        
-                        # ✅ Forward ALL messages to WebSocket client
-                        await websocket.send_json(data)
-                        logger.debug(f"📤 Sent to WebSocket: {data.get('type')}")
-
-            except Exception as e:
-                logger.error(f"❌ Error in Redis listener: {e}")
-              
-        # run both task in parallel
-        await asyncio.gather(
-           listen_to_websocket(),
-           listen_to_redis()
-        )
+        # messages from the runner reach this socket through the job update bus
+        await listen_to_websocket()
 
     except WebSocketDisconnect:
         logger.info(f"Client disconnected from job {job_id}")
@@ -113,5 +193,3 @@ async def websocket_handler(websocket:WebSocket,job_id:str):
     finally:
         # Cleanup
         await manager.disconnect(websocket, job_id)
-        await pubsub.unsubscribe()
-        await pubsub.close()
@@ -1,32 +1,76 @@
 from datetime import datetime
-import json
 from typing import Any, Dict
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
 from services.redis import redisservices
 from services.job import  get_job_status, update_job_status
+from github.http_client import github_http
+from services.github_cache import github_cache
+from services.ws import manager
+from services.job_events import event_hub
+from services.webhooks import webhook_pipeline
+from services.metrics import render_metrics
+from core.tracing import MemoryExporter, tracer
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
 
 router = APIRouter()
 
 @router.post("/internal/job-update/{job_id}")
 async def receive_job_update(job_id: str, job_update: Dict[Any, Any]):
     # getting update from cloud run
-    updated = update_job_status(job_id, job_update)
+    updated = await update_job_status(job_id, job_update)
     if not updated:
         raise HTTPException(status_code=404, detail="Job not found")
     
     # ✅ Get full status
-    status = get_job_status(job_id)
+    status = await get_job_status(job_id)
 
     
     # Publish to Redis pubsub so WebSocket picks it up
     await redisservices.publish_message(job_id, {
         "type": "status_update",
-        "content": json.dumps(status.model_dump() if status else {}),
+        "content": status.model_dump(mode="json") if status else {},
         "job_id": job_id,
         "timestamp": datetime.now().isoformat()
     })
-        # ✅ Also store in Redis
-    if status:
-        await redisservices.set_job_status(job_id, status.model_dump())
-    
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@router.get("/internal/github/metrics")
+async def github_metrics():
+    # request counts, latency, retries and rate limit budget of the GitHub client
+    metrics = github_http.metrics_snapshot()
+    metrics["response_cache"] = {
+        "fresh_hits": github_cache.hits,
+        "revalidated": github_cache.revalidated,
+        "misses": github_cache.misses,
+    }
+    return metrics
+
+@router.get("/internal/ws/metrics")
+async def ws_metrics():
+    # send queue depth, coalesced statuses, slow client disconnects, bytes and compression
+    metrics = manager.outbox_stats()
+    metrics["traffic"] = manager.traffic_stats()
+    metrics["sse"] = event_hub.stats()
+    return metrics
+
+@router.get("/internal/webhooks/metrics")
+async def webhook_metrics():
+    # deliveries accepted, deduplicated and rejected, batches and what they triggered
+    return webhook_pipeline.stats()
+
+@router.get("/internal/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    # spans this process recorded for a trace (TRACE_EXPORTER=memory), oldest first
+    if not isinstance(tracer.exporter, MemoryExporter):
+        raise HTTPException(status_code=404, detail="Traces are not kept in memory (TRACE_EXPORTER)")
+    spans = tracer.exporter.trace(trace_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return {"trace_id": trace_id, "spans": spans}
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    # Prometheus scrape target: job lifecycle, Redis, GitHub, WebSocket/SSE fan-out and runner timings
+    return Response(await render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,15 +1,36 @@
-# routes/webhook.py or inside your existing routes file
-
-from fastapi import APIRouter, Request
+import logging
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
+from services.webhooks import verify_signature, webhook_pipeline
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
+
 @router.post("/webhook")
 async def github_webhook(request: Request):
-    body = await request.json()
-    print("🔔 Webhook Event Received:", body)
+    # verify and queue only; the webhook consumer does the work
+    if not webhook_pipeline.secret:
+        logger.error("❌ GITHUB_WEBHOOK_SECRET is not set, refusing webhook")
+        raise HTTPException(status_code=503, detail="Webhook secret not configured")
+
+    body = await request.body()
+    if not verify_signature(webhook_pipeline.secret, body, request.headers.get("X-Hub-Signature-256")):
+        webhook_pipeline.rejected += 1
+        raise HTTPException(status_code=401, detail="Invalid signature")
 
-    # TODO: add logic here to handle PRs, issues, etc.
+    delivery_id = request.headers.get("X-GitHub-Delivery")
+    event = request.headers.get("X-GitHub-Event", "")
+    if not delivery_id:
+        raise HTTPException(status_code=400, detail="Missing X-GitHub-Delivery")
+    if event == "ping":
+        return JSONResponse({"message": "pong"}, status_code=200)
 
-    return JSONResponse({"message": "Webhook received"}, status_code=200)
+    if not await webhook_pipeline.accept(delivery_id, event, body):
+        return JSONResponse({"message": "Duplicate delivery"}, status_code=200)
+    return JSONResponse({"message": "Webhook queued"}, status_code=202)
@@ -5,17 +5,38 @@ from routes import auth_routes , webhook , add_repo_route
 from fastapi.middleware.cors import CORSMiddleware
 from core.config import FRONTEND_URL
 from services.redis import redisservices
+from services.job_bus import job_bus
+from github.http_client import github_http
+from services.dispatcher import close_dispatcher, get_dispatcher
+from services.scheduler import job_scheduler
+from services.ws import manager
+from services.job_events import event_hub
+from services.webhooks import webhook_pipeline
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🚀 Starting FastAPI app...")
     await redisservices.connect()
     print("✅ Redis connected")
+    job_bus.add_status_hook(job_scheduler.on_status)
+    job_bus.add_exit_hook(job_scheduler.on_exit)
+    await job_bus.start()
+    await job_scheduler.start()
+    await webhook_pipeline.start()
+    await github_http.start()
+    get_dispatcher()
     try:
         yield
     finally:
         print("🛑 Shutting down...")
-        await redisservices.close()
+        await webhook_pipeline.stop()
+        await job_scheduler.stop()
+        await job_bus.stop()
+        await manager.shutdown()
+        event_hub.shutdown()
+        await github_http.close()
+        await close_dispatcher()
+        await redisservices.disconnect()
 
 app = FastAPI(lifespan=lifespan)
 
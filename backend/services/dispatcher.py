@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+from core.config import (
+    BACKEND_URL, CLOUD_RUN_JOB, GCP_PROJECT_ID, GCP_REGION, JOB_DISPATCHER, JOB_QUEUE_KEY,
+    JOB_RUNNER_PATH, REDIS_URL,
+)
+from services.redis import redisservices
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+
+class JobDispatcher(ABC):
+    """
+    Starts agent jobs somewhere. `dispatch` returns as soon as the job is
+    accepted; progress comes back over the job's Redis channel as before.
+
+    `spec` carries the job runner's JobSpec fields: job_id, prompt, repo,
+    branch, token and optionally conversation_history and traceparent.
+    """
+    name = "base"
+
+    @abstractmethod
+    async def dispatch(self, spec: Dict) -> None:
+        """hand the job over; raises if it couldn't be started"""
+
+    async def close(self) -> None:
+        pass
+
+    @staticmethod
+    def job_env(spec: Dict) -> Dict[str, str]:
+        """the environment a single-job runner reads its JobSpec from"""
+        env = {
+            "PROMPT": spec["prompt"],
+            "REPO": spec["repo"],
+            "BRANCH": spec["branch"],
+            "TOKEN": spec["token"],
+            "JOB_ID": spec["job_id"],
+            "BACKEND_URL": BACKEND_URL or "",
+            "REDIS_URL": REDIS_URL or "",
+        }
+        if spec.get("conversation_history"):
+            env["CONVERSATION_HISTORY"] = json.dumps(spec["conversation_history"])
+        if spec.get("traceparent"):
+            env["TRACEPARENT"] = spec["traceparent"]
+        return env
+
+
+class CloudRunDispatcher(JobDispatcher):
+    """one Cloud Run job execution per agent job, through a shared async client"""
+    name = "cloud_run"
+
+    def __init__(self):
+        self._client = None
+        self.job_name = f"projects/{GCP_PROJECT_ID}/locations/{GCP_REGION}/jobs/{CLOUD_RUN_JOB}"
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google.cloud import run_v2
+            from google.oauth2 import service_account
+
+            credentials = None
+            if os.getenv("GOOGLE_CLOUD_KEY_JSON"):
+                try:
+                    creds_dict = json.loads(os.getenv("GOOGLE_CLOUD_KEY_JSON"))
+                    credentials = service_account.Credentials.from_service_account_info(creds_dict)
+                    logger.info("🔐 Loaded Google Cloud credentials successfully.")
+                except Exception as e:
+                    logger.error(f"❌ ERROR loading GCP credentials: {e}")
+            if not credentials:
+                logger.warning("⚠ No GCP credentials found. Using default creds.")
+            self._client = run_v2.JobsAsyncClient(credentials=credentials)
+        return self._client
+
+    async def dispatch(self, spec: Dict) -> None:
+        from google.cloud import run_v2
+
+        request = run_v2.RunJobRequest(
+            name=self.job_name,
+            overrides=run_v2.RunJobRequest.Overrides(
+                container_overrides=[
+                    run_v2.RunJobRequest.Overrides.ContainerOverride(
+                        env=[run_v2.EnvVar(name=name, value=value) for name, value in self.job_env(spec).items()]
+                    )
+                ]
+            )
+        )
+        # run_job returns once the execution is accepted; we don't wait for it to finish
+        await self.client.run_job(request=request)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.transport.close()
+            self._client = None
+
+
+class LocalSubprocessDispatcher(JobDispatcher):
+    """runs job_runner/main.py as a child process (local development)"""
+    name = "local"
+
+    def __init__(self, runner_path: str = JOB_RUNNER_PATH):
+        self.runner_path = os.path.abspath(runner_path)
+        # running child -> the task waiting for it to exit
+        self.processes: Dict[asyncio.subprocess.Process, asyncio.Task] = {}
+
+    async def dispatch(self, spec: Dict) -> None:
+        env = {**os.environ, **self.job_env(spec), "JOB_RUNNER_MODE": "single"}
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.join(self.runner_path, "main.py"),
+            cwd=self.runner_path,
+            env=env,
+        )
+        logger.info(f"🚀 Started local runner pid={process.pid} for job {spec['job_id']}")
+
+        async def reap():
+            returncode = await process.wait()
+            self.processes.pop(process, None)
+            logger.info(f"🏁 Local runner for job {spec['job_id']} exited with {returncode}")
+
+        self.processes[process] = asyncio.create_task(reap())
+
+    async def close(self) -> None:
+        for process in list(self.processes):
+            if process.returncode is None:
+                process.terminate()
+        await asyncio.gather(*list(self.processes.values()), return_exceptions=True)
+
+
+class RedisQueueDispatcher(JobDispatcher):
+    """pushes the JobSpec onto the queue served by warm runners (JOB_RUNNER_MODE=worker)"""
+    name = "redis"
+
+    def __init__(self, queue_key: str = JOB_QUEUE_KEY):
+        self.queue_key = queue_key
+
+    async def dispatch(self, spec: Dict) -> None:
+        await redisservices.redis.rpush(self.queue_key, json.dumps(spec))
+
+
+DISPATCHERS = {
+    CloudRunDispatcher.name: CloudRunDispatcher,
+    LocalSubprocessDispatcher.name: LocalSubprocessDispatcher,
+    RedisQueueDispatcher.name: RedisQueueDispatcher,
+}
+
+_dispatcher: Optional[JobDispatcher] = None
+
+
+def get_dispatcher() -> JobDispatcher:
+    """the process-wide dispatcher selected by JOB_DISPATCHER"""
+    global _dispatcher
+    if _dispatcher is None:
+        if JOB_DISPATCHER not in DISPATCHERS:
+            raise ValueError(f"Unknown JOB_DISPATCHER '{JOB_DISPATCHER}', expected one of {sorted(DISPATCHERS)}")
+        _dispatcher = DISPATCHERS[JOB_DISPATCHER]()
+        logger.info(f"✅ Using {_dispatcher.name} job dispatcher")
+    return _dispatcher
+
+
+def set_dispatcher(dispatcher: JobDispatcher) -> None:
+    """replace the dispatcher (benchmarks, tests)"""
+    global _dispatcher
+    _dispatcher = dispatcher
+
+
+async def close_dispatcher() -> None:
+    global _dispatcher
+    if _dispatcher is not None:
+        await _dispatcher.close()
+        _dispatcher = None
@@ -1,94 +1,93 @@
-import httpx
-from github.github_app_client import generate_jwt, get_installation_access_token
+from contextlib import aclosing
+from typing import AsyncIterator
+from github.http_client import github_http
+from services.installation_tokens import installation_tokens
+from services.github_pagination import collect, paginate
+from services.repo_index import repo_index
+from core.config import GITHUB_JOB_TOKEN_MIN_TTL_SECONDS
 
 async def get_user_installation_id(user_token: str) -> str | None:
-    url = "https://api.github.com/user/installations"
+    url = "/user/installations"
     headers = {
         "Authorization": f"Bearer {user_token}",
         "Accept": "application/vnd.github+json"
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=headers)
-        print("Status:", response.status_code)
-        print("Installations response:", response.text)
-        if response.status_code != 200:
-            return None
-        
-        installations = response.json().get("installations", [])
-        if not installations:
-            return None
-        
-        return installations[0]["id"] # Pick the first for now
+    response = await github_http.get(url, headers=headers)
+    print("Status:", response.status_code)
+    print("Installations response:", response.text)
+    if response.status_code != 200:
+        return None
+    
+    installations = response.json().get("installations", [])
+    if not installations:
+        return None
+    
+    return installations[0]["id"] # Pick the first for now
+
+async def _installation_headers(installation_id: str) -> dict:
+    token = await installation_tokens.get(installation_id)
+    return {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/vnd.github+json",
+        "X-GitHub-Api-Version": "2022-11-28"
+    }
+
+
+async def iter_installation_repos(installation_id: str) -> AsyncIterator[list]:
+    """Yield the installation's repositories page by page"""
+    headers = await _installation_headers(installation_id)
+    async with aclosing(paginate(
+        "/installation/repositories", headers=headers, installation_id=installation_id, items_key="repositories"
+    )) as pages:
+        async for repos in pages:
+            for repo in repos:
+                repo["installation_id"] = installation_id
+            await repo_index.add(installation_id, repos)
+            yield repos
+
 
 async def get_repos_from_installation(installation_id: str) -> dict:
-    jwt_token = generate_jwt()
-    access_token_data = await get_installation_access_token(jwt_token, installation_id)
-    installation_access_token = access_token_data.get("token")
+    repositories = await collect(iter_installation_repos(installation_id))
+    print(f"repos_data: {len(repositories)} repositories")
+    return {"total_count": len(repositories), "repositories": repositories}
 
-    headers = {
-        "Authorization": f"Bearer {installation_access_token}",
-        "Accept": "application/vnd.github+json"
-    }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.github.com/installation/repositories", headers=headers
-        )
-        response.raise_for_status()
-        repos_data = response.json()
-        for repo in repos_data.get("repositories", []):
-            repo["installation_id"] = installation_id
-        print("repos_data:", repos_data)
-        return repos_data
+async def resolve_repo(installation_id: str, repo_name: str) -> dict:
+    """
+    Metadata (owner, full_name, default_branch, ...) of `repo` or `owner/repo`
+    in an installation. Served from the repo index; only an unknown repo
+    lists the installation (which fills the index).
+    """
+    repo = await repo_index.lookup(installation_id, repo_name)
+    if repo:
+        return repo
+    # stop listing as soon as the repository shows up
+    async with aclosing(iter_installation_repos(installation_id)) as pages:
+        async for repos in pages:
+            for repo in repos:
+                if repo_index.field(repo["name"]) == repo_index.field(repo_name):
+                    entry = repo_index.metadata(repo)
+                    if "/" not in repo_name or entry["full_name"].lower() == repo_name.lower():
+                        return entry
+    raise Exception(f"Repository '{repo_name}' not found in installation")
 
 
-async def get_repo_branches(installation_id:str , repo_name:str):
-    jwt_token = generate_jwt()
-    access_token_data = await get_installation_access_token(jwt_token, installation_id)
-    token = access_token_data["token"]
+async def iter_repo_branches(installation_id: str, repo_name: str) -> AsyncIterator[list]:
+    """Yield a repository's branches page by page"""
+    repo = await resolve_repo(installation_id, repo_name)
+    headers = await _installation_headers(installation_id)
+    async with aclosing(paginate(
+        f"/repos/{repo['full_name']}/branches", headers=headers, installation_id=installation_id
+    )) as pages:
+        async for branches in pages:
+            yield branches
 
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github+json",
-        "X-GitHub-Api-Version": "2022-11-28"
-    }
 
-    async with httpx.AsyncClient() as client:
-        # First, get all repositories for this installation to find the owner
-        repos_response = await client.get(
-            "https://api.github.com/installation/repositories",
-            headers=headers
-        )
-        repos_response.raise_for_status()
-        repositories = repos_response.json()["repositories"]
-        
-        # Find the repository to get its owner
-        target_repo = None
-        for repo in repositories:
-            if repo["name"] == repo_name:
-                target_repo = repo
-                break
-        
-        if not target_repo:
-            raise Exception(f"Repository '{repo_name}' not found in installation")
-        
-        owner = target_repo["owner"]["login"]
-        
-        # Now fetch branches using the correct owner
-        branches_response = await client.get(
-            f"https://api.github.com/repos/{owner}/{repo_name}/branches",
-            headers=headers,
-            params={
-                "per_page": 100  # Get up to 100 branches
-            }
-        )
-        branches_response.raise_for_status()
-        return branches_response.json()
+async def get_repo_branches(installation_id:str , repo_name:str):
+    return await collect(iter_repo_branches(installation_id, repo_name))
 
 
 async def mint_installation_token(installation_id: str) -> str:
-    """Return a short-lived installation access token for a given installation_id."""
-    jwt_token = generate_jwt()
-    access_token_data = await get_installation_access_token(jwt_token, installation_id)
-    return access_token_data["token"]
\ No newline at end of file
+    """Return an installation access token for a job, valid for at least GITHUB_JOB_TOKEN_MIN_TTL_SECONDS (cached)."""
+    return await installation_tokens.get(installation_id, min_ttl=GITHUB_JOB_TOKEN_MIN_TTL_SECONDS)
\ No newline at end of file
@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+from core.config import GITHUB_CACHE_FRESH_SECONDS, GITHUB_CACHE_TTL_SECONDS
+from github.http_client import github_http
+from services.redis import redisservices
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+
+class GitHubResponseCache:
+    """
+    Conditional-request cache for GitHub GET calls.
+
+    Bodies and ETags are stored per installation and URL in Redis
+    (`github:cache:{installation_id}:{hash}`) so every replica revalidates
+    with If-None-Match; GitHub doesn't count 304s against the rate limit.
+    Entries younger than GITHUB_CACHE_FRESH_SECONDS are served without a
+    request at all, identical concurrent calls share one request, and
+    webhooks drop an installation's entries through `invalidate_installation`.
+    """
+    def __init__(self, ttl: int = GITHUB_CACHE_TTL_SECONDS, fresh_for: float = GITHUB_CACHE_FRESH_SECONDS):
+        self.ttl = ttl
+        self.fresh_for = fresh_for
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(installation_id: str, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        request_id = url + "?" + json.dumps(params or {}, sort_keys=True)
+        return f"github:cache:{installation_id}:{hashlib.sha256(request_id.encode()).hexdigest()[:24]}"
+
+    @staticmethod
+    def index_key(installation_id: str) -> str:
+        return f"github:cache:{installation_id}:keys"
+
+    async def get_json(self, url: str, *, installation_id: str, headers: Dict[str, str],
+                       params: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        GET a GitHub URL through the cache.
+
+        Returns:
+            The decoded JSON body (raises httpx.HTTPStatusError like raise_for_status)
+        """
+        body, _ = await self.get_page(url, installation_id=installation_id, headers=headers, params=params)
+        return body
+
+    async def get_page(self, url: str, *, installation_id: str, headers: Dict[str, str],
+                       params: Optional[Dict[str, Any]] = None) -> Tuple[Any, Optional[str]]:
+        """
+        Like get_json, for paginated listings.
+
+        Returns:
+            (decoded JSON body, Link header or None)
+        """
+        key = self.key(str(installation_id), url, params)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, url, str(installation_id), headers, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def invalidate_installation(self, installation_id: str) -> int:
+        """drop every cached response of an installation"""
+        if not redisservices.redis:
+            return 0
+        index = self.index_key(str(installation_id))
+        keys = await redisservices.redis.smembers(index)
+        if keys:
+            await redisservices.redis.delete(*keys, index)
+        logger.info(f"🧹 Dropped {len(keys)} cached GitHub response(s) for installation {installation_id}")
+        return len(keys)
+
+    # ---------- internals ----------
+
+    async def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        if not redisservices.redis:
+            return None
+        try:
+            raw = await redisservices.redis.get(key)
+        except Exception as e:
+            logger.warning(f"⚠️ GitHub cache read failed: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    async def _store(self, key: str, installation_id: str, entry: Dict[str, Any]):
+        if not redisservices.redis:
+            return
+        try:
+            async with redisservices.redis.pipeline(transaction=False) as pipe:
+                pipe.set(key, json.dumps(entry), ex=self.ttl)
+                pipe.sadd(self.index_key(installation_id), key)
+                pipe.expire(self.index_key(installation_id), self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ GitHub cache write failed: {e}")
+
+    async def _fetch(self, key: str, url: str, installation_id: str, headers: Dict[str, str],
+                     params: Optional[Dict[str, Any]]) -> Tuple[Any, Optional[str]]:
+        entry = await self._load(key)
+        if entry and time.time() - entry["fetched_at"] < self.fresh_for:
+            self.hits += 1
+            return entry["body"], entry.get("link")
+
+        request_headers = dict(headers)
+        if entry and entry.get("etag"):
+            request_headers["If-None-Match"] = entry["etag"]
+        response = await github_http.get(url, headers=request_headers, params=params, installation_id=installation_id)
+
+        if response.status_code == 304 and entry:
+            self.revalidated += 1
+            entry["fetched_at"] = time.time()
+            await self._store(key, installation_id, entry)
+            return entry["body"], entry.get("link")
+
+        response.raise_for_status()
+        self.misses += 1
+        body = response.json()
+        await self._store(key, installation_id, {
+            "etag": response.headers.get("ETag"),
+            "link": response.headers.get("Link"),
+            "body": body,
+            "fetched_at": time.time(),
+        })
+        return body, response.headers.get("Link")
+
+
+github_cache = GitHubResponseCache()
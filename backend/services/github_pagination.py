@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import math
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+from core.config import GITHUB_MAX_PAGES, GITHUB_PAGE_CONCURRENCY
+from services.github_cache import github_cache
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+PER_PAGE = 100
+
+_LINK_PATTERN = re.compile(r'<([^>]+)>;\s*rel="(\w+)"')
+
+
+def parse_link_header(link: Optional[str]) -> Dict[str, str]:
+    """{"next": url, "last": url, ...} from a GitHub Link header"""
+    return {rel: url for url, rel in _LINK_PATTERN.findall(link or "")}
+
+
+def _page_number(url: str) -> Optional[int]:
+    values = parse_qs(urlparse(url).query).get("page")
+    return int(values[0]) if values else None
+
+
+def _page_items(body: Any, items_key: Optional[str]) -> List[Any]:
+    if items_key:
+        return body.get(items_key, [])
+    return body
+
+
+async def paginate(url: str, *, installation_id: str, headers: Dict[str, str],
+                   params: Optional[Dict[str, Any]] = None, items_key: Optional[str] = None,
+                   concurrency: int = GITHUB_PAGE_CONCURRENCY,
+                   max_pages: int = GITHUB_MAX_PAGES) -> AsyncIterator[List[Any]]:
+    """
+    Yield every page of a GitHub listing, in order.
+
+    The first page tells how many pages there are (Link rel="last", or
+    total_count for wrapped listings like /installation/repositories); the
+    rest are fetched concurrently, at most `concurrency` at a time, and each
+    page is yielded as soon as it and the pages before it have arrived.
+    Every page goes through the ETag cache.
+
+    Args:
+        items_key: key holding the items when the body is an object
+            (e.g. "repositories"); None when the body is a list
+    """
+    params = {**(params or {}), "per_page": PER_PAGE}
+    body, link = await github_cache.get_page(url, installation_id=installation_id, headers=headers,
+                                             params={**params, "page": 1})
+    yield _page_items(body, items_key)
+
+    links = parse_link_header(link)
+    last_page = _page_number(links["last"]) if "last" in links else None
+    if last_page is None and items_key and isinstance(body, dict) and "total_count" in body:
+        last_page = math.ceil(body["total_count"] / PER_PAGE)
+    if not last_page or last_page <= 1:
+        return
+    if last_page > max_pages:
+        logger.warning(f"⚠️ {url} has {last_page} pages, only reading the first {max_pages}")
+        last_page = max_pages
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(page: int) -> List[Any]:
+        async with semaphore:
+            page_body, _ = await github_cache.get_page(url, installation_id=installation_id, headers=headers,
+                                                       params={**params, "page": page})
+            return _page_items(page_body, items_key)
+
+    tasks = [asyncio.create_task(fetch(page)) for page in range(2, last_page + 1)]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        # the consumer may stop early (e.g. found what it was looking for)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def collect(pages: AsyncIterator[List[Any]]) -> List[Any]:
+    """flatten every page into one list"""
+    items: List[Any] = []
+    async for page in pages:
+        items.extend(page)
+    return items
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from core.config import GITHUB_TOKEN_MIN_TTL_SECONDS, GITHUB_TOKEN_REFRESH_AHEAD_SECONDS
+from github.github_app_client import generate_jwt, get_installation_access_token
+from services.redis import redisservices
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+# how long a replica waits for another replica's mint before minting itself
+MINT_LOCK_SECONDS = 10
+
+
+class InstallationTokenCache:
+    """
+    Installation access tokens keyed by installation_id.
+
+    Tokens live for an hour, so they are kept locally and in Redis
+    (`github:installation:{id}:token`) for the other replicas. A token that is
+    close to expiry is still served while one background refresh runs;
+    a token that is about to expire blocks on the refresh. Concurrent callers
+    share a single in-flight mint per installation, and replicas coordinate
+    through a short Redis lock.
+    """
+    def __init__(self, refresh_ahead: int = GITHUB_TOKEN_REFRESH_AHEAD_SECONDS,
+                 min_ttl: int = GITHUB_TOKEN_MIN_TTL_SECONDS):
+        self.refresh_ahead = refresh_ahead
+        self.min_ttl = min_ttl
+        # installation_id -> (token, expires_at epoch seconds)
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.mints = 0
+
+    @staticmethod
+    def key(installation_id: str) -> str:
+        return f"github:installation:{installation_id}:token"
+
+    @staticmethod
+    def _parse_expiry(expires_at: Optional[str]) -> float:
+        if not expires_at:
+            # GitHub documents a one hour lifetime
+            return time.time() + 3600
+        return datetime.fromisoformat(expires_at.replace("Z", "+00:00")).timestamp()
+
+    async def get(self, installation_id: str, min_ttl: Optional[int] = None) -> str:
+        """
+        Return a valid installation token, minting one only when needed.
+
+        Args:
+            min_ttl: seconds the token must still be valid for (defaults to
+                GITHUB_TOKEN_MIN_TTL_SECONDS; jobs that run for a while ask for more)
+        """
+        installation_id = str(installation_id)
+        min_ttl = self.min_ttl if min_ttl is None else min_ttl
+        entry = self._tokens.get(installation_id)
+        if not entry or entry[1] - time.time() <= max(self.refresh_ahead, min_ttl):
+            # another replica may already have refreshed it
+            shared = await self._load_shared(installation_id)
+            if shared and (not entry or shared[1] > entry[1]):
+                entry = shared
+        token, expires_at = entry or (None, 0)
+        remaining = expires_at - time.time()
+
+        if token and remaining > min_ttl:
+            self.hits += 1
+            if remaining < self.refresh_ahead:
+                # serve the current token, refresh in the background
+                self._refresh(installation_id)
+            return token
+        # shield so one cancelled caller doesn't cancel the mint others wait on
+        token = await asyncio.shield(self._refresh(installation_id))
+        if self._tokens[installation_id][1] - time.time() <= min_ttl:
+            # joined a refresh that handed back another replica's older token
+            token = await asyncio.shield(self._refresh(installation_id, force=True))
+        return token
+
+    def invalidate(self, installation_id: str):
+        """forget the local token (e.g. installation suspended or deleted)"""
+        self._tokens.pop(str(installation_id), None)
+
+    # ---------- internals ----------
+
+    def _refresh(self, installation_id: str, force: bool = False) -> "asyncio.Task[str]":
+        """start (or join) the single in-flight mint for an installation"""
+        task = self._inflight.get(installation_id)
+        if task is None or task.done():
+            task = asyncio.create_task(self._mint(installation_id, force))
+            self._inflight[installation_id] = task
+            task.add_done_callback(lambda t: self._mint_done(installation_id, t))
+        return task
+
+    def _mint_done(self, installation_id: str, task: asyncio.Task):
+        if self._inflight.get(installation_id) is task:
+            self._inflight.pop(installation_id, None)
+        # a failed background refresh is retried by the next caller
+        if not task.cancelled() and task.exception():
+            logger.error(f"❌ Token refresh for installation {installation_id} failed: {task.exception()}")
+
+    async def _load_shared(self, installation_id: str) -> Optional[Tuple[str, float]]:
+        if not redisservices.redis:
+            return None
+        try:
+            raw = await redisservices.redis.get(self.key(installation_id))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read shared token for installation {installation_id}: {e}")
+            return None
+        if not raw:
+            return None
+        data = json.loads(raw)
+        entry = (data["token"], float(data["expires_at"]))
+        if entry[1] > self._tokens.get(installation_id, (None, 0))[1]:
+            self._tokens[installation_id] = entry
+        return entry
+
+    async def _store_shared(self, installation_id: str, token: str, expires_at: float):
+        if not redisservices.redis:
+            return
+        ttl = int(expires_at - time.time() - self.min_ttl)
+        if ttl <= 0:
+            return
+        try:
+            await redisservices.redis.set(
+                self.key(installation_id), json.dumps({"token": token, "expires_at": expires_at}), ex=ttl
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not share token for installation {installation_id}: {e}")
+
+    async def _wait_for_other_replica(self, installation_id: str, current: Optional[str]) -> Optional[Tuple[str, float]]:
+        """another replica holds the mint lock: wait for its token to show up"""
+        deadline = time.monotonic() + MINT_LOCK_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.2)
+            entry = await self._load_shared(installation_id)
+            if entry and entry[0] != current and entry[1] - time.time() > self.refresh_ahead:
+                return entry
+        return None
+
+    async def _mint(self, installation_id: str, force: bool = False) -> str:
+        current = self._tokens.get(installation_id, (None, 0))[0]
+        lock_key = f"{self.key(installation_id)}:lock"
+        locked = True
+        if redisservices.redis and not force:
+            try:
+                locked = await redisservices.redis.set(lock_key, "1", nx=True, ex=MINT_LOCK_SECONDS)
+            except Exception:
+                locked = True
+        if not locked:
+            entry = await self._wait_for_other_replica(installation_id, current)
+            if entry:
+                return entry[0]
+
+        try:
+            access_token_data = await get_installation_access_token(generate_jwt(), installation_id)
+            token = access_token_data["token"]
+            expires_at = self._parse_expiry(access_token_data.get("expires_at"))
+            self._tokens[installation_id] = (token, expires_at)
+            self.mints += 1
+            await self._store_shared(installation_id, token, expires_at)
+            logger.info(f"🔑 Minted installation token for {installation_id} (valid {int(expires_at - time.time())}s)")
+            return token
+        finally:
+            if locked and redisservices.redis and not force:
+                try:
+                    await redisservices.redis.delete(lock_key)
+                except Exception:
+                    pass
+
+
+installation_tokens = InstallationTokenCache()
@@ -1,41 +1,40 @@
-import json
-import os
-from typing import Any, Dict
-from google.oauth2 import service_account
+from typing import Any, Dict, Optional, Tuple
+import time
 import uuid
 from datetime import datetime
-from google.cloud import run_v2
+from core.tracing import Span, tracer
 from models.agent_model import FileChange, JobStatus, JobStatusResponse, RoleType, RunAgentRequest , AgentMessage
-from core.config import BACKEND_URL,GCP_PROJECT_ID,GCP_REGION,CLOUD_RUN_JOB, REDIS_URL
-from services.github_app_service import mint_installation_token
-
-# In-memory storage for results
-job_results : Dict[str, JobStatusResponse] = {}
-
-async def schedule_agent_job(payload:RunAgentRequest):
-    installation_access_token = await mint_installation_token(str(payload.installation_id))
-    credentials = None
-    if os.getenv("GOOGLE_CLOUD_KEY_JSON"):
-        try:
-          creds_dict = json.loads(os.getenv("GOOGLE_CLOUD_KEY_JSON"))
-          credentials = service_account.Credentials.from_service_account_info(creds_dict)
-          print("🔐 Loaded Google Cloud credentials successfully.")
-        except Exception as e:
-          print("❌ ERROR loading GCP credentials:", e)
-
-    if credentials:
-       client = run_v2.JobsClient(credentials=credentials)
-    else:
-        print("⚠ No GCP credentials found. Using default creds (will fail on Render).")
-        client = run_v2.JobsClient()
-
-    job_name = f"projects/{GCP_PROJECT_ID}/locations/{GCP_REGION}/jobs/{CLOUD_RUN_JOB}"
+from services.dispatcher import get_dispatcher
+from services.github_app_service import mint_installation_token, resolve_repo
+from services.job_store import job_store
+from services.redis import redisservices
+from services.scheduler import QueueFullError, job_scheduler
+
+async def schedule_agent_job(payload:RunAgentRequest, priority: str = "interactive") -> Tuple[str, Optional[int]]:
+    """
+    Create the job and hand it to the admission scheduler.
+
+    Returns:
+        (job_id, queue position or None when it started right away)
+
+    Raises:
+        QueueFullError: the scheduler's queue is full
+    """
+    with tracer.span("job.schedule", priority=priority) as span:
+        return await _schedule(payload, priority, span)
+
+
+async def _schedule(payload: RunAgentRequest, priority: str, span: Span) -> Tuple[str, Optional[int]]:
+    installation_id = str(payload.installation_id)
+    # accept "repo" or "owner/repo"; the runner clones by full name
+    repo = await resolve_repo(installation_id, payload.repo_name)
     
     # Generate unique job ID
     job_id = str(uuid.uuid4())
+    span.set("job_id", job_id)
     
     # ✅ Initialize job result storage with proper schema
-    job_results[job_id] = JobStatusResponse(
+    await job_store.create(JobStatusResponse(
         job_id=job_id,
         status=JobStatus.QUEUED,
         messages=[
@@ -50,63 +49,88 @@ async def schedule_agent_job(payload:RunAgentRequest):
         error=None,
         created_at=datetime.now().isoformat(),
         updated_at=None
-    )
-
-
-    request = run_v2.RunJobRequest(
-        name = job_name,
-        overrides = run_v2.RunJobRequest.Overrides(
-            container_overrides = [
-                run_v2.RunJobRequest.Overrides.ContainerOverride(
-                    env = [
-                        run_v2.EnvVar(name="PROMPT", value=payload.prompt),
-                        run_v2.EnvVar(name="REPO", value=payload.repo_name),
-                        run_v2.EnvVar(name="BRANCH", value=payload.branches),
-                        run_v2.EnvVar(name="TOKEN", value=installation_access_token),
-                        run_v2.EnvVar(name="JOB_ID", value=job_id),  # ← NEW
-                        run_v2.EnvVar(name="BACKEND_URL", value=BACKEND_URL),  # ← NEW
-                        run_v2.EnvVar(name="REDIS_URL", value=REDIS_URL),
-                    ]
-                )
-            ]
+    ))
+
+    submitted_at = time.time()
+
+    async def launch():
+        # runs from the scheduler, outside this request: parent the spans explicitly
+        tracer.record("scheduler.queue", submitted_at, time.time(), parent=span, job_id=job_id)
+        with tracer.span("job.dispatch", parent=span, job_id=job_id, dispatcher=get_dispatcher().name) as dispatch:
+            # the token is minted when the job actually starts, so queueing can't age it
+            try:
+                installation_access_token = await mint_installation_token(installation_id)
+                # returns once the job is accepted (Cloud Run execution created,
+                # process started or spec queued); progress arrives over Redis
+                await get_dispatcher().dispatch({
+                    "job_id": job_id,
+                    "prompt": payload.prompt,
+                    "repo": repo["full_name"],
+                    "branch": payload.branches,
+                    "token": installation_access_token,
+                    # the runner's spans are children of the dispatch
+                    "traceparent": dispatch.traceparent,
+                })
+            except Exception as e:
+                await fail_job(job_id, f"Failed to start job: {e}")
+                raise
+
+    try:
+        position = await job_scheduler.submit(
+            job_id, installation_id, launch, priority=priority,
+            abandon=lambda reason: fail_job(job_id, reason),
         )
-    )
+    except QueueFullError:
+        await fail_job(job_id, "Too many jobs queued, try again later")
+        raise
+    return job_id, position
 
-    operation = client.run_job(request=request)
-    response = operation.result()
-    return job_id
 
-def update_job_status(job_id: str, update: Dict[Any, Any]) -> bool:
-    if job_id not in job_results:
-        return False  # Job doesn't exist
-    
-    # ✅ Get the stored JobStatusResponse
-    current: JobStatusResponse = job_results[job_id]
-    
-    # ✅ Update it with new data from Cloud Run
+async def fail_job(job_id: str, error: str) -> None:
+    """mark a job FAILED and tell anyone watching it"""
+    await job_store.update(job_id, {"status": JobStatus.FAILED.value, "error": error})
+    await redisservices.publish_message(job_id, {
+        "type": "status_update",
+        "content": {"status": JobStatus.FAILED.value, "error": error},
+        "job_id": job_id,
+        "timestamp": datetime.now().isoformat()
+    })
+
+async def update_job_status(job_id: str, update: Dict[Any, Any], event_id: Optional[str] = None) -> bool:
+    """
+    Apply a (partial) status update from Cloud Run; only the given fields are written.
+    With `event_id` (its job event stream id) an update older than the stored one is skipped.
+    """
+    # ✅ Validate the incoming fields against the schema before storing them
+    fields: Dict[str, Any] = {}
     if "status" in update:
-        current.status = JobStatus(update["status"])
+        fields["status"] = JobStatus(update["status"]).value
     
     if "messages" in update:
-        current.messages = [AgentMessage(**msg) for msg in update["messages"]]
+        fields["messages"] = [AgentMessage(**msg).model_dump(mode="json") for msg in update["messages"]]
     
     if "file_changes" in update:
-        current.file_changes = [FileChange(**fc) for fc in update["file_changes"]]
+        fields["file_changes"] = [FileChange(**fc).model_dump(mode="json") for fc in update["file_changes"]]
     
     if "current_step" in update:
-        current.current_step = update["current_step"]
+        fields["current_step"] = update["current_step"]
     
     if "error" in update:
-        current.error = update["error"]
-    
-    current.updated_at = datetime.now().isoformat()
-    
-    # ✅ Store updated status back
-    job_results[job_id] = current
+        fields["error"] = update["error"]
     
-    return True
+    return await job_store.update(job_id, fields, event_id=event_id)
 
 
-def get_job_status(job_id: str) -> JobStatusResponse | None:
+async def get_job_status(job_id: str) -> JobStatusResponse | None:
     """Get current job status"""
-    return job_results.get(job_id)
\ No newline at end of file
+    return await job_store.get(job_id)
+
+
+async def get_job_status_with_seq(job_id: str) -> Tuple[JobStatusResponse | None, int]:
+    """Get current job status and its version (bumped by every update)"""
+    return await job_store.get_with_seq(job_id)
+
+
+async def get_job_seq(job_id: str) -> Optional[int]:
+    """Version of a job's status without reading it; None if the job doesn't exist"""
+    return await job_store.seq(job_id)
@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from contextlib import nullcontext
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from redis.exceptions import ResponseError
+from core import wire
+from core.config import JOB_STATUS_CLAIM_IDLE_SECONDS, JOB_STATUS_GROUP, JOB_STATUS_STREAM
+from core.metrics import JOB_UPDATE_HANDLING, JOB_UPDATE_RECIPIENTS
+from core.tracing import tracer
+from services.job import update_job_status
+from services.job_events import event_hub
+from services.job_store import job_store
+from services.redis import redisservices, stream_id
+from services.ws import manager
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+UPDATES_PATTERN = "job:*:updates"
+
+# published on updates channels for the backend only (not job events, never fanned out)
+RUNNER_EXIT = "runner_exit"
+STATE_SAVED = "state_saved"
+
+# pause after a read that returned nothing: Redis already blocked for up to
+# 5s, but a server that ignores BLOCK (fakeredis) would otherwise spin the loop
+EMPTY_READ_PAUSE_SECONDS = 0.05
+# longest wait for an updates message before the listener checks for stop()
+LISTEN_POLL_SECONDS = 1.0
+
+
+class JobStatusWriter:
+    """
+    Persists status updates into the job store, each exactly once across replicas.
+
+    The publish script also appends every status update to JOB_STATUS_STREAM.
+    Each backend process reads it as one consumer of JOB_STATUS_GROUP,
+    writes each update with its event id (so an older update can't overwrite
+    a newer one another replica already wrote), publishes `state_saved` on
+    the job's updates channel so every replica drops its cached copy, and
+    acks. Entries a crashed replica left unacked are claimed after
+    JOB_STATUS_CLAIM_IDLE_SECONDS.
+    """
+    def __init__(self, stream: str = JOB_STATUS_STREAM, group: str = JOB_STATUS_GROUP,
+                 claim_idle: int = JOB_STATUS_CLAIM_IDLE_SECONDS, batch_size: int = 100):
+        self.stream = stream
+        self.group = group
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.claim_idle = claim_idle
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        # checked by the loop as well, in case a client swallows the cancellation
+        self._stopping = False
+        self.written = 0
+        self.failures = 0
+
+    async def start(self):
+        self._stopping = False
+        if self._task is None or self._task.done():
+            try:
+                await redisservices.raw.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        logger.info(f"✅ Job status writer {self.consumer} reading {self.stream} (group {self.group})")
+        while not self._stopping:
+            try:
+                entries = await self._next_entries()
+                if not entries:
+                    await asyncio.sleep(EMPTY_READ_PAUSE_SECONDS)
+                    continue
+                await self.write(entries)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # unacked entries are claimed again once they have been idle long enough
+                logger.error(f"❌ Job status writer failed: {e}")
+                await asyncio.sleep(1)
+
+    async def _next_entries(self) -> List[Tuple[bytes, Dict[bytes, bytes]]]:
+        """entries abandoned by a crashed replica first, then new ones"""
+        claimed = await redisservices.raw.xautoclaim(
+            self.stream, self.group, self.consumer, min_idle_time=self.claim_idle * 1000,
+            start_id="0-0", count=self.batch_size,
+        )
+        # deleted entries come back as None
+        entries = [entry for entry in claimed[1] if entry[1]]
+        if entries:
+            return entries
+        result = await redisservices.raw.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"}, count=self.batch_size, block=5000)
+        return result[0][1] if result else []
+
+    async def write(self, entries: List[Tuple[bytes, Dict[bytes, bytes]]]) -> None:
+        """persist a batch in stream order, then announce and ack it"""
+        saved: Set[str] = set()
+        for entry_id, fields in entries:
+            job_id = fields.get(b"job", b"").decode()
+            try:
+                data = wire.decode(fields[b"data"])
+                await update_job_status(job_id, data.get("content") or {}, event_id=fields[b"event"].decode())
+            except (wire.WireError, KeyError, TypeError, ValueError, AttributeError) as e:
+                # malformed: a retry would fail the same way, so it is acked with the rest
+                self.failures += 1
+                logger.error(f"❌ Dropping status update {entry_id!r} of job {job_id}: {e}")
+                continue
+            self.written += 1
+            saved.add(job_id)
+
+        state_saved = [(job_id, wire.encode({"type": STATE_SAVED, "job_id": job_id})) for job_id in saved]
+        entry_ids = [entry_id for entry_id, _ in entries]
+        async with redisservices.raw.pipeline(transaction=False) as pipe:
+            for job_id, envelope in state_saved:
+                pipe.publish(f"job:{job_id}:updates", envelope)
+            pipe.xack(self.stream, self.group, *entry_ids)
+            pipe.xdel(self.stream, *entry_ids)
+            await pipe.execute()
+
+
+class JobUpdateBus:
+    """
+    The one Redis subscription of a backend process.
+
+    A single `psubscribe job:*:updates` replaces the per-WebSocket pub/sub
+    objects. Each envelope is decoded once; for a status update the status
+    hooks run (scheduler slot release and lifecycle metrics, idempotent on
+    every replica), the job's cached status is dropped, and the message is
+    encoded once for browsers and fanned out to every local WebSocket and
+    SSE stream watching the job.
+
+    Status updates are persisted by `JobStatusWriter`, on one replica only;
+    its `state_saved` message drops the cached status everywhere again, once
+    the new status can actually be read. `runner_exit` (published once the
+    runner, follow-ups included, is done) runs the exit hooks. Browsers see
+    neither.
+    """
+    def __init__(self):
+        self.writer = JobStatusWriter()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # called with (job_id, status) for every status seen on an updates channel
+        self._status_hooks: List[Callable[[str, str], Awaitable[None]]] = []
+        # called with job_id when a job's runner exits
+        self._exit_hooks: List[Callable[[str], Awaitable[None]]] = []
+        self.received = 0
+        self.delivered = 0
+
+    def add_status_hook(self, hook: Callable[[str, str], Awaitable[None]]):
+        """register a coroutine to call when a job publishes a status"""
+        if hook not in self._status_hooks:
+            self._status_hooks.append(hook)
+
+    def add_exit_hook(self, hook: Callable[[str], Awaitable[None]]):
+        """register a coroutine to call when a job's runner exits"""
+        if hook not in self._exit_hooks:
+            self._exit_hooks.append(hook)
+
+    async def start(self):
+        self._stopping = False
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+        await self.writer.start()
+
+    async def stop(self):
+        await self.writer.stop()
+        self._stopping = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen(self):
+        while not self._stopping:
+            pubsub = redisservices.raw.pubsub()
+            try:
+                await pubsub.psubscribe(UPDATES_PATTERN)
+                logger.info(f"✅ Job update bus subscribed to {UPDATES_PATTERN}")
+                # polled rather than `listen()`: stop() also works if a client
+                # swallows the cancellation of a blocked read (fakeredis does)
+                while not self._stopping:
+                    message = await pubsub.get_message(timeout=LISTEN_POLL_SECONDS)
+                    if not message or message.get("type") != "pmessage":
+                        continue
+                    # channel is job:{job_id}:updates
+                    channel = message["channel"].decode()
+                    await self.handle(channel[len("job:"):-len(":updates")], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # cached statuses expire on their own meanwhile
+                logger.error(f"❌ Job update bus failed, resubscribing: {e}")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.punsubscribe()
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    async def handle(self, job_id: str, payload: bytes) -> None:
+        """process one message published on job:{job_id}:updates"""
+        started = time.perf_counter()
+        self.received += 1
+        event_id, envelope = wire.split_event(payload)
+        try:
+            data = wire.decode(envelope)
+        except wire.WireError as e:
+            logger.warning(f"⚠️ Dropping undecodable update for job {job_id}: {e}")
+            return
+
+        message_type = data.get("type")
+        if message_type == STATE_SAVED:
+            job_store.invalidate(job_id)
+            return
+        if message_type == RUNNER_EXIT:
+            await self._run_hooks(self._exit_hooks, job_id)
+            return
+        with self._trace(data, event_id, message_type):
+            if message_type == "status_update":
+                status = (data.get("content") or {}).get("status")
+                if status:
+                    await self._run_hooks(self._status_hooks, job_id, status)
+            job_store.invalidate(job_id)
+
+            text = wire.client_text(data, event_id)
+            recipients = manager.broadcast(job_id, text, message_type, event_id)
+            recipients += event_hub.publish(job_id, text, message_type, event_id)
+        self.delivered += recipients
+        JOB_UPDATE_RECIPIENTS.observe(recipients)
+        JOB_UPDATE_HANDLING.observe(time.perf_counter() - started, message_type or "unknown")
+
+    @staticmethod
+    def _trace(data: dict, event_id: Optional[str], message_type: Optional[str]):
+        """
+        span of handling a traced message; Redis delivery (stream entry time
+        to receipt) is recorded as a sibling before it
+        """
+        traceparent = data.get("traceparent")
+        if not traceparent:
+            return nullcontext()
+        if event_id:
+            published = stream_id(event_id)[0] / 1000
+            tracer.record("redis.delivery", published, time.time(), parent=traceparent,
+                          type=message_type, event_id=event_id)
+        return tracer.span("job_update.handle", parent=traceparent, type=message_type, event_id=event_id)
+
+    @staticmethod
+    async def _run_hooks(hooks: list, job_id: str, *args) -> None:
+        for hook in hooks:
+            try:
+                await hook(job_id, *args)
+            except Exception as e:
+                logger.error(f"❌ Hook {getattr(hook, '__name__', hook)} failed for job {job_id}: {e}")
+
+
+job_bus = JobUpdateBus()
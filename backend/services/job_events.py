@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from core import wire
+from core.config import SSE_QUEUE_SIZE, WS_REPLAY_MAX_EVENTS
+from services.job import get_job_status
+from services.redis import redisservices
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+# (type, browser text, event id)
+Event = Tuple[Optional[str], str, Optional[str]]
+
+
+async def catch_up(job_id: str, last_event_id: Optional[str]) -> Tuple[List[Event], Optional[str]]:
+    """
+    What a new subscriber gets before live events: the events it missed when
+    it resumes from `last_event_id`, otherwise the current status tagged with
+    the newest event id.
+
+    Returns:
+        (events, id of the last event they cover). The id is None for a
+        snapshot (which still carries the newest id to resume from): live
+        events must not be filtered against it, since the bus may not have
+        applied them to the stored status yet.
+    """
+    if last_event_id:
+        missed = await redisservices.read_events(job_id, after=last_event_id, limit=WS_REPLAY_MAX_EVENTS)
+        if missed is not None:
+            return [
+                (message.get("type"), wire.client_text(message, event_id), event_id)
+                for event_id, message in missed
+            ], last_event_id
+
+    head = await redisservices.last_event_id(job_id)
+    status = await get_job_status(job_id=job_id)
+    if not status:
+        return [], None
+    text = wire.client_text({
+        "type": "status_update",
+        "content": status.model_dump_json(),
+        "job_id": job_id,
+        "timestamp": datetime.now().isoformat(),
+    }, head)
+    return [("status_update", text, head)], None
+
+
+class EventStreamHub:
+    """
+    Fan-out of job events to Server-Sent Events subscribers.
+
+    Fed by the job update bus next to the WebSocket manager. A subscriber is
+    only a bounded queue read by its own response generator: no heartbeat
+    task, no pong tracking (keep-alive comments are written when the queue
+    stays empty). A subscriber that falls a full queue behind is ended; its
+    browser reconnects with Last-Event-ID and catches up from the job's
+    event stream.
+    """
+    def __init__(self, queue_size: int = SSE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.events_sent = 0
+        self.slow_disconnects = 0
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        # one extra slot for the end-of-stream marker
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size + 1)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    def publish(self, job_id: str, text: str, message_type: Optional[str] = None,
+                event_id: Optional[str] = None) -> int:
+        """
+        queue an event for every subscriber of a job
+
+        Returns:
+            number of subscribers it was queued for
+        """
+        delivered = 0
+        for queue in list(self._subscribers.get(job_id, ())):
+            if queue.qsize() >= self.queue_size:
+                logger.warning(f"🐢 Ending slow event stream of job {job_id}")
+                self.slow_disconnects += 1
+                self.unsubscribe(job_id, queue)
+                queue.put_nowait(None)
+                continue
+            queue.put_nowait((message_type, text, event_id))
+            delivered += 1
+        return delivered
+
+    def shutdown(self):
+        """end every stream"""
+        for job_id, subscribers in list(self._subscribers.items()):
+            for queue in list(subscribers):
+                self.unsubscribe(job_id, queue)
+                try:
+                    queue.put_nowait(None)
+                except asyncio.QueueFull:
+                    pass
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "jobs": len(self._subscribers),
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "events_sent": self.events_sent,
+            "slow_disconnects": self.slow_disconnects,
+        }
+
+
+event_hub = EventStreamHub()
@@ -0,0 +1,169 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from models.agent_model import JobStatusResponse
+from core.config import JOB_CACHE_SIZE, JOB_CACHE_TTL_SECONDS, JOB_STATE_TTL_SECONDS
+from core.metrics import REDIS_OPERATION
+from services.redis import redisservices
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+# fields of JobStatusResponse that can be updated independently
+JOB_FIELDS = ("job_id", "status", "messages", "file_changes", "current_step", "error", "created_at", "updated_at")
+
+# Write fields of an existing job and bump its seq. With an event id (the
+# update's entry in job:{id}:events) the write is skipped unless it is newer
+# than the last one applied, so updates persisted by different replicas
+# can't go back in time.
+# KEYS: state hash   ARGV: ttl, event id or "", field, value, ...
+# returns -1 (no such job), 0 (stale, skipped) or 1
+_UPDATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return -1 end
+if ARGV[2] ~= '' then
+  local last = redis.call('HGET', KEYS[1], 'event_id')
+  if last then
+    local last_ms, last_seq = string.match(last, '(%d+)-(%d+)')
+    local ms, seq = string.match(ARGV[2], '(%d+)-(%d+)')
+    last_ms, last_seq, ms, seq = tonumber(last_ms), tonumber(last_seq), tonumber(ms), tonumber(seq)
+    if ms < last_ms or (ms == last_ms and seq <= last_seq) then return 0 end
+  end
+  redis.call('HSET', KEYS[1], 'event_id', ARGV[2])
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+redis.call('HINCRBY', KEYS[1], 'seq', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+class JobStore:
+    """
+    Job status shared by every backend worker / replica.
+
+    Each job is a Redis hash `job:{job_id}:state` with one JSON encoded value
+    per JobStatusResponse field, so an update only rewrites the fields it
+    carries, and a `seq` counter bumped by every write (a version for ETags).
+    Reads go through a small local cache that the job update bus invalidates
+    on every `job:{job_id}:updates` message (including the `state_saved`
+    sent once a status update is written), bounded by a short TTL.
+    """
+    def __init__(self, ttl: int = JOB_STATE_TTL_SECONDS, cache_size: int = JOB_CACHE_SIZE,
+                 cache_ttl: float = JOB_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: "OrderedDict[str, Tuple[float, JobStatusResponse, int]]" = OrderedDict()
+
+    @staticmethod
+    def key(job_id: str) -> str:
+        return f"job:{job_id}:state"
+
+    # ---------- local cache ----------
+
+    def _cache_get(self, job_id: str) -> Optional[Tuple[JobStatusResponse, int]]:
+        entry = self._cache.get(job_id)
+        if not entry:
+            return None
+        expires_at, status, seq = entry
+        if expires_at < time.monotonic():
+            self._cache.pop(job_id, None)
+            return None
+        self._cache.move_to_end(job_id)
+        return status, seq
+
+    def _cache_put(self, job_id: str, status: JobStatusResponse, seq: int):
+        self._cache[job_id] = (time.monotonic() + self.cache_ttl, status, seq)
+        self._cache.move_to_end(job_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, job_id: str):
+        """drop the local copy of a job"""
+        self._cache.pop(job_id, None)
+
+    # ---------- redis ----------
+
+    async def create(self, status: JobStatusResponse) -> None:
+        """store a new job"""
+        key = self.key(status.job_id)
+        fields = {name: json.dumps(value) for name, value in status.model_dump(mode="json").items()}
+        fields["seq"] = 1
+        with REDIS_OPERATION.time("job_create"):
+            async with redisservices.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping=fields)
+                pipe.expire(key, self.ttl)
+                await pipe.execute()
+        self._cache_put(status.job_id, status, 1)
+
+    async def get(self, job_id: str) -> Optional[JobStatusResponse]:
+        """read-through: local cache, then Redis"""
+        status, _ = await self.get_with_seq(job_id)
+        return status
+
+    async def get_with_seq(self, job_id: str) -> Tuple[Optional[JobStatusResponse], int]:
+        """the status and the version it was read at"""
+        cached = self._cache_get(job_id)
+        if cached:
+            return cached
+        with REDIS_OPERATION.time("job_get"):
+            raw = await redisservices.redis.hgetall(self.key(job_id))
+        if not raw:
+            return None, 0
+        status = JobStatusResponse(**{name: json.loads(value) for name, value in raw.items() if name in JOB_FIELDS})
+        seq = int(raw.get("seq", 0))
+        self._cache_put(job_id, status, seq)
+        return status, seq
+
+    async def seq(self, job_id: str) -> Optional[int]:
+        """
+        Current version of a job, without reading its status.
+
+        Returns:
+            None if the job doesn't exist
+        """
+        cached = self._cache_get(job_id)
+        if cached:
+            return cached[1]
+        key = self.key(job_id)
+        with REDIS_OPERATION.time("job_seq"):
+            async with redisservices.redis.pipeline(transaction=False) as pipe:
+                pipe.exists(key)
+                pipe.hget(key, "seq")
+                exists, seq = await pipe.execute()
+        return int(seq or 0) if exists else None
+
+    async def update(self, job_id: str, update: Dict[str, Any], event_id: Optional[str] = None) -> bool:
+        """
+        Write only the fields present in `update` (plus updated_at).
+
+        Args:
+            event_id: stream id of the event carrying the update; an update
+                older than the last one applied is skipped
+
+        Returns:
+            False if the job doesn't exist
+        """
+        fields = {name: json.dumps(value) for name, value in update.items() if name in JOB_FIELDS and name != "job_id"}
+        fields["updated_at"] = json.dumps(datetime.now().isoformat())
+        with REDIS_OPERATION.time("job_update"):
+            result = await redisservices.redis.eval(
+                _UPDATE_SCRIPT, 1, self.key(job_id), self.ttl, event_id or "",
+                *(item for pair in fields.items() for item in pair),
+            )
+        if result == -1:
+            return False
+        if result == 0:
+            logger.debug(f"⏭️ Skipped update {event_id} of job {job_id}: a newer one is stored")
+        self.invalidate(job_id)
+        return True
+
+
+job_store = JobStore()
@@ -0,0 +1,163 @@
+import logging
+from core import wire
+from core.config import RUNNER_METRICS_DRAIN_MAX, RUNNER_METRICS_KEY
+from core.metrics import REGISTRY, RUNNER_JOBS, RUNNER_PHASE, RUNNER_TOOL
+from github.http_client import LATENCY_BUCKETS, github_http
+from services.github_cache import github_cache
+from services.job_bus import job_bus
+from services.job_events import event_hub
+from services.redis import redisservices
+from services.scheduler import job_scheduler
+from services.webhooks import webhook_pipeline
+from services.ws import manager
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+# ---------- copied from the services' own counters at scrape time ----------
+
+WS_CONNECTIONS = REGISTRY.gauge("rawgent_ws_connections", "Open job WebSockets")
+WS_WATCHED_JOBS = REGISTRY.gauge("rawgent_ws_watched_jobs", "Jobs with at least one open WebSocket")
+WS_QUEUED = REGISTRY.gauge("rawgent_ws_queued_messages", "Messages waiting in WebSocket send queues")
+WS_MESSAGES = REGISTRY.gauge(
+    "rawgent_ws_messages_total", "WebSocket messages by outcome (queued, sent, coalesced, dropped)", ("outcome",),
+    kind="counter")
+WS_DISCONNECTS = REGISTRY.gauge(
+    "rawgent_ws_disconnects_total", "WebSockets closed by the server", ("reason",), kind="counter")
+WS_BYTES = REGISTRY.gauge(
+    "rawgent_ws_bytes_total", "WebSocket payload bytes before (raw) and after (wire) compression", ("stage",),
+    kind="counter")
+SSE_SUBSCRIBERS = REGISTRY.gauge("rawgent_sse_subscribers", "Open job event streams")
+SSE_DISCONNECTS = REGISTRY.gauge(
+    "rawgent_sse_slow_disconnects_total", "Event streams ended for falling behind", kind="counter")
+BUS_MESSAGES = REGISTRY.gauge(
+    "rawgent_job_update_messages_total", "Messages received on job updates channels", kind="counter")
+JOB_STATUS_WRITES = REGISTRY.gauge(
+    "rawgent_job_status_writes_total", "Status updates this process persisted (written) or dropped as malformed",
+    ("outcome",), kind="counter")
+SCHEDULER_QUEUED = REGISTRY.gauge("rawgent_scheduler_queued_jobs", "Jobs waiting for a slot in this process")
+SCHEDULER_DECISIONS = REGISTRY.gauge(
+    "rawgent_scheduler_jobs_total", "Jobs admitted or rejected by this process", ("decision",), kind="counter")
+GITHUB_REQUESTS = REGISTRY.gauge(
+    "rawgent_github_requests_total", "GitHub API responses by endpoint and status (error: no response)",
+    ("endpoint", "status"), kind="counter")
+GITHUB_RETRIES = REGISTRY.gauge(
+    "rawgent_github_retries_total", "Retried GitHub API requests", ("endpoint",), kind="counter")
+GITHUB_LATENCY = REGISTRY.histogram(
+    "rawgent_github_request_seconds", "GitHub API request latency", ("endpoint",), buckets=LATENCY_BUCKETS)
+GITHUB_RATE_REMAINING = REGISTRY.gauge(
+    "rawgent_github_rate_limit_remaining", "Requests left in the current GitHub rate limit window", ("resource",))
+GITHUB_CACHE = REGISTRY.gauge(
+    "rawgent_github_cache_lookups_total", "GitHub response cache lookups", ("result",), kind="counter")
+WEBHOOKS = REGISTRY.gauge(
+    "rawgent_webhooks_total", "GitHub webhook deliveries and what they triggered", ("outcome",), kind="counter")
+
+
+def collect_ws():
+    stats = manager.outbox_stats()
+    WS_CONNECTIONS.set(manager.get_total_connections())
+    WS_WATCHED_JOBS.set(len(manager.active_connections))
+    WS_QUEUED.set(stats["queued_now"])
+    for outcome, key in (("queued", "messages_queued"), ("sent", "messages_sent"),
+                         ("coalesced", "status_coalesced"), ("dropped", "messages_dropped")):
+        WS_MESSAGES.set(stats[key], outcome)
+    WS_DISCONNECTS.set(stats["slow_disconnects"], "slow")
+    WS_DISCONNECTS.set(stats["heartbeat_timeouts"], "heartbeat")
+    WS_BYTES.set(manager.total_traffic.raw_bytes, "raw")
+    WS_BYTES.set(manager.total_traffic.wire_bytes, "wire")
+
+    sse = event_hub.stats()
+    SSE_SUBSCRIBERS.set(sse["subscribers"])
+    SSE_DISCONNECTS.set(sse["slow_disconnects"])
+    BUS_MESSAGES.set(job_bus.received)
+    JOB_STATUS_WRITES.set(job_bus.writer.written, "written")
+    JOB_STATUS_WRITES.set(job_bus.writer.failures, "dropped")
+
+
+def collect_scheduler():
+    stats = job_scheduler.stats()
+    SCHEDULER_QUEUED.set(stats["queued"])
+    SCHEDULER_DECISIONS.set(stats["admitted"], "admitted")
+    SCHEDULER_DECISIONS.set(stats["rejected"], "rejected")
+
+
+def collect_github():
+    for endpoint, count in github_http.requests.items():
+        for status, responses in github_http.statuses.get(endpoint, {}).items():
+            GITHUB_REQUESTS.set(responses, endpoint, str(status))
+        if github_http.errors.get(endpoint):
+            GITHUB_REQUESTS.set(github_http.errors[endpoint], endpoint, "error")
+        if github_http.retries.get(endpoint):
+            GITHUB_RETRIES.set(github_http.retries[endpoint], endpoint)
+        GITHUB_LATENCY.load(github_http.latency_buckets[endpoint], github_http.latency_sum[endpoint], endpoint)
+    GITHUB_RATE_REMAINING.clear()
+    for limits in github_http.rate_limits.values():
+        if limits.get("remaining") is not None:
+            # several installations share a resource name; report the tightest
+            resource = str(limits.get("resource") or "core")
+            current = GITHUB_RATE_REMAINING.values.get((resource,))
+            if current is None or limits["remaining"] < current:
+                GITHUB_RATE_REMAINING.set(limits["remaining"], resource)
+    GITHUB_CACHE.set(github_cache.hits, "fresh")
+    GITHUB_CACHE.set(github_cache.revalidated, "revalidated")
+    GITHUB_CACHE.set(github_cache.misses, "miss")
+
+
+def collect_webhooks():
+    for outcome, value in webhook_pipeline.stats().items():
+        WEBHOOKS.set(value, outcome)
+
+
+for _collector in (collect_ws, collect_scheduler, collect_github, collect_webhooks):
+    REGISTRY.add_collector(_collector)
+
+
+# ---------- job runner timings ----------
+
+def ingest_runner_report(report: dict) -> None:
+    """observe the timings one job runner pushed when its job ended"""
+    for phase, durations in (report.get("phases") or {}).items():
+        for seconds in durations:
+            RUNNER_PHASE.observe(seconds, phase)
+    for tool, durations in (report.get("tools") or {}).items():
+        for seconds in durations:
+            RUNNER_TOOL.observe(seconds, tool)
+    RUNNER_JOBS.inc(str(report.get("outcome") or "unknown"))
+
+
+async def drain_runner_reports() -> int:
+    """
+    Take pending runner reports off the Redis list.
+
+    Every report is popped by exactly one backend process, so the runner
+    histograms of all replicas add up to every job once.
+
+    Returns:
+        number of reports ingested
+    """
+    ingested = 0
+    while ingested < RUNNER_METRICS_DRAIN_MAX:
+        batch = await redisservices.raw.lpop(RUNNER_METRICS_KEY, min(500, RUNNER_METRICS_DRAIN_MAX - ingested))
+        if not batch:
+            break
+        for payload in batch:
+            try:
+                ingest_runner_report(wire.decode(payload))
+            except (wire.WireError, TypeError, ValueError, AttributeError) as e:
+                logger.warning(f"⚠️ Dropping undecodable runner metrics: {e}")
+        ingested += len(batch)
+    return ingested
+
+
+async def render_metrics() -> str:
+    """Prometheus text exposition of this process"""
+    try:
+        await drain_runner_reports()
+    except Exception as e:
+        # the rest of the metrics are still worth serving
+        logger.error(f"❌ Could not read runner metrics: {e}")
+    return REGISTRY.render()
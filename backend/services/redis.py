@@ -1,8 +1,13 @@
 import json
 import logging
-from typing import Optional
+import re
+from typing import Any, Dict, List, Optional, Tuple
 import redis.asyncio as redis
-from core.config import REDIS_URL
+from redis.exceptions import ResponseError
+from core import wire
+from core.config import JOB_EVENTS_MAXLEN, JOB_STATE_TTL_SECONDS, JOB_STATUS_STREAM, JOB_STATUS_STREAM_MAXLEN, REDIS_URL
+from core.metrics import REDIS_OPERATION
+from core.tracing import tracer
 
 logging.basicConfig(
     level=logging.INFO,
@@ -11,10 +16,51 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+STREAM_ID = re.compile(r"^\d+-\d+$")
+
+# Append a job event to its capped stream and publish it prefixed with its
+# stream id, in one round trip. Status updates also go to the shared status
+# stream, tagged with the job and event id, for the job store writer.
+# The same script lives in job_runner/job_context.py.
+# KEYS: events stream, updates channel, status stream
+# ARGV: envelope (core.wire), maxlen, ttl, "1" for a status update, status stream maxlen, job id
+_PUBLISH_EVENT_SCRIPT = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[2], '*', 'data', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+if ARGV[4] == '1' then
+  redis.call('XADD', KEYS[3], 'MAXLEN', '~', ARGV[5], '*', 'job', ARGV[6], 'event', id, 'data', ARGV[1])
+end
+redis.call('PUBLISH', KEYS[2], id .. ' ' .. ARGV[1])
+return id
+"""
+
+
+def stream_id(event_id: str) -> Tuple[int, int]:
+    """sortable form of a stream entry id"""
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+def covered_until(backlog: List[Tuple[Optional[str], str, Optional[str]]], after: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    newest event id a replay covers, for skipping live events already sent
+    (None after a snapshot)
+
+    Args:
+        backlog: (type, encoded message, event id) sent before live events
+        after: the id the replay started after
+    """
+    if not after:
+        return None
+    covered = [event_id for _, _, event_id in backlog if event_id]
+    return max(map(stream_id, [*covered, after]))
+
 class RedisServices:
     """"""
     def __init__(self):
         self.redis:Optional[redis.Redis] = None
+        # binary-safe client for job events (envelopes may be compressed)
+        self.raw:Optional[redis.Redis] = None
 
     async def connect(self):
         """ connect with redis service """
@@ -23,22 +69,67 @@ class RedisServices:
             encoding="utf-8",
             decode_responses=True
         )
+        self.raw = await redis.from_url(REDIS_URL)
         logger.info("✅ Connected to Redis")
         logging.info("✅ Connected to Redis")
 
     async def disconnect(self):
         """ disconnect the redis service """
+        if self.raw:
+            await self.raw.close()
         if self.redis:
             await self.redis.close()
             logger.info("❌ Disconnected from Redis")
             logging.info("❌ Disconnected from Redis")
 
-    async def publish_message(self,job_id:str,msg:dict):
-        """ publish message to the job's channel for websocket broadcasting """
+    async def publish_message(self,job_id:str,msg:dict) -> str:
+        """ append message to the job's event stream and publish it for websocket broadcasting """
         channel = f"job:{job_id}:updates"
-        await self.redis.publish(channel=channel,message=json.dumps(msg))
-        logger.debug(f"📤 Published to {channel}")
-        logging.debug(f"📤 Published to {channel}")
+        if "traceparent" not in msg:
+            traceparent = tracer.current_traceparent()
+            if traceparent:
+                msg = dict(msg, traceparent=traceparent)
+        envelope = wire.encode(msg)
+        with REDIS_OPERATION.time("publish"):
+            event_id = await self.redis.eval(
+                _PUBLISH_EVENT_SCRIPT, 3, f"job:{job_id}:events", channel, JOB_STATUS_STREAM,
+                envelope, JOB_EVENTS_MAXLEN, JOB_STATE_TTL_SECONDS,
+                "1" if msg.get("type") == "status_update" else "0", JOB_STATUS_STREAM_MAXLEN, job_id,
+            )
+        logger.debug(f"📤 Published {event_id} to {channel}")
+        return event_id
+
+    async def read_events(self, job_id: str, after: str, limit: int) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+        """
+        Decoded events of a job published after `after`.
+
+        Returns:
+            None if the stream can't produce the complete delta (unknown id,
+            trimmed or expired stream, more than `limit` events); the caller
+            should fall back to a full snapshot
+        """
+        if not STREAM_ID.match(after):
+            return None
+        key = f"job:{job_id}:events"
+        try:
+            with REDIS_OPERATION.time("replay"):
+                oldest = await self.raw.xrange(key, count=1)
+                # the stream is capped: entries after `after` may be gone
+                if not oldest or stream_id(oldest[0][0].decode()) > stream_id(after):
+                    return None
+                entries = await self.raw.xrange(key, min=f"({after}", count=limit + 1)
+            if len(entries) > limit:
+                return None
+            return [(event_id.decode(), wire.decode(fields[b"data"])) for event_id, fields in entries]
+        except (ResponseError, wire.WireError) as e:
+            logger.warning(f"⚠️ Can't replay job {job_id} from {after}: {e}")
+            return None
+
+    async def last_event_id(self, job_id: str) -> Optional[str]:
+        """id of the newest event of a job"""
+        with REDIS_OPERATION.time("last_event_id"):
+            newest = await self.redis.xrevrange(f"job:{job_id}:events", count=1)
+        return newest[0][0] if newest else None
 
     async def subscribe_to_job(self,job_id:str):
         """subscribe to job's updates channel"""
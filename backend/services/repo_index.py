@@ -0,0 +1,109 @@
+import json
+import logging
+from typing import Any, Dict, Iterable, Optional
+from core.config import REPO_INDEX_TTL_SECONDS
+from services.redis import redisservices
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+# what we keep about each repository
+REPO_FIELDS = ("id", "name", "full_name", "owner", "default_branch", "private", "size")
+
+
+class RepoIndex:
+    """
+    installation -> repository metadata, shared through Redis.
+
+    Each installation is a hash `github:installation:{id}:repos` keyed by the
+    lower-cased repository name (names are unique within an installation's
+    account), so `owner/repo` resolves with one HGET instead of listing the
+    installation. Filled whenever repositories are listed and kept fresh by
+    webhooks.
+    """
+    def __init__(self, ttl: int = REPO_INDEX_TTL_SECONDS):
+        self.ttl = ttl
+
+    @staticmethod
+    def key(installation_id: str) -> str:
+        return f"github:installation:{installation_id}:repos"
+
+    @staticmethod
+    def field(repo_name: str) -> str:
+        # accepts "repo" or "owner/repo"
+        return repo_name.rsplit("/", 1)[-1].lower()
+
+    @staticmethod
+    def metadata(repo: Dict[str, Any]) -> Dict[str, Any]:
+        """the indexed fields of a GitHub repository object (or webhook stub)"""
+        full_name = repo.get("full_name") or ""
+        owner = (repo.get("owner") or {}).get("login") or full_name.split("/")[0]
+        entry = {name: repo.get(name) for name in REPO_FIELDS}
+        entry["owner"] = owner
+        entry["full_name"] = full_name or f"{owner}/{repo.get('name')}"
+        return entry
+
+    async def add(self, installation_id: str, repos: Iterable[Dict[str, Any]]) -> None:
+        """index (or refresh) repositories of an installation"""
+        mapping = {}
+        for repo in repos:
+            entry = self.metadata(repo)
+            mapping[self.field(entry["name"] or entry["full_name"])] = json.dumps(entry)
+        if not mapping or not redisservices.redis:
+            return
+        key = self.key(str(installation_id))
+        async with redisservices.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+
+    async def merge(self, installation_id: str, repos: Iterable[Dict[str, Any]]) -> None:
+        """
+        Index partial repository objects (installation_repositories webhooks
+        only carry id, name, full_name and private) without losing fields
+        already known.
+        """
+        repos = list(repos)
+        if not repos or not redisservices.redis:
+            return
+        key = self.key(str(installation_id))
+        fields = [self.field(repo["name"]) for repo in repos]
+        existing = await redisservices.redis.hmget(key, fields)
+        merged = []
+        for repo, raw in zip(repos, existing):
+            entry = json.loads(raw) if raw else {}
+            entry.update({name: value for name, value in self.metadata(repo).items() if value is not None})
+            merged.append({**entry, "owner": {"login": entry["owner"]}})
+        await self.add(installation_id, merged)
+
+    async def remove(self, installation_id: str, repo_names: Iterable[str]) -> None:
+        fields = [self.field(name) for name in repo_names]
+        if fields and redisservices.redis:
+            await redisservices.redis.hdel(self.key(str(installation_id)), *fields)
+
+    async def drop_installation(self, installation_id: str) -> None:
+        if redisservices.redis:
+            await redisservices.redis.delete(self.key(str(installation_id)))
+
+    async def lookup(self, installation_id: str, repo_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns:
+            The repository's metadata, or None when it isn't indexed (or the
+            owner in `owner/repo` doesn't match)
+        """
+        if not redisservices.redis:
+            return None
+        raw = await redisservices.redis.hget(self.key(str(installation_id)), self.field(repo_name))
+        if not raw:
+            return None
+        entry = json.loads(raw)
+        if "/" in repo_name and entry["full_name"].lower() != repo_name.lower():
+            return None
+        return entry
+
+
+repo_index = RepoIndex()
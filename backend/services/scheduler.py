@@ -0,0 +1,367 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Deque, Dict, Iterator, List, Optional, Set
+from core.config import (
+    SCHEDULER_FOLLOW_UP_SLOT_SECONDS, SCHEDULER_MAX_QUEUED, SCHEDULER_MAX_RUNNING,
+    SCHEDULER_MAX_RUNNING_PER_INSTALLATION, SCHEDULER_RETRY_AFTER_SECONDS, SCHEDULER_SLOT_TTL_SECONDS,
+)
+from core.metrics import (
+    JOB_DISPATCH_TO_START, JOB_QUEUE_TO_START, JOB_QUEUE_WAIT, JOB_RUN, JOB_TRANSITIONS, REDIS_OPERATION,
+)
+from core.tracing import tracer
+from services.redis import redisservices
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+# lower runs first
+PRIORITIES = {"interactive": 0, "webhook": 1}
+PRIORITY_NAMES = {value: name for name, value in PRIORITIES.items()}
+
+RUNNING_KEY = "jobs:running"
+SLOTS_KEY = "jobs:slots"
+
+# Take a slot if both the global and the installation cap allow it.
+# Running sets are sorted sets scored by expiry so slots of crashed jobs free themselves.
+_ADMIT_SCRIPT = """
+local now = tonumber(ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then return 0 end
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[3]) then return -1 end
+local expires = now + tonumber(ARGV[5])
+redis.call('ZADD', KEYS[1], expires, ARGV[1])
+redis.call('ZADD', KEYS[2], expires, ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[6])
+return 1
+"""
+
+
+class QueueFullError(Exception):
+    """raised when the admission queue can't take another job"""
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class PendingJob:
+    job_id: str
+    installation_id: str
+    priority: int
+    launch: Callable[[], Awaitable[None]]
+    # called with a reason when the job is dropped from the queue without starting
+    abandon: Optional[Callable[[str], Awaitable[None]]] = None
+    queued_at: float = field(default_factory=time.monotonic)
+    position: Optional[int] = None
+    # trace of the submitting request, for the job's queue_position messages
+    traceparent: Optional[str] = field(default_factory=tracer.current_traceparent)
+
+
+@dataclass
+class JobLifecycle:
+    """timestamps of a job submitted through this process, for the lifecycle metrics"""
+    priority: str
+    queued_at: float
+    launched_at: Optional[float] = None
+    running_at: Optional[float] = None
+    status: str = "queued"
+
+
+class JobScheduler:
+    """
+    Admission control between /agent/run and the dispatcher.
+
+    Running jobs are counted in Redis (`jobs:running` and
+    `jobs:running:{installation_id}`), so the global and per-installation caps
+    hold across replicas. Jobs that can't start yet wait in this process:
+    interactive before webhook-triggered, and round-robin across
+    installations within a priority so one installation's burst can't starve
+    the others. Queued jobs get `queue_position` messages on their updates
+    channel; a full queue is rejected with QueueFullError.
+
+    A slot is released when the job fails or its runner publishes
+    `runner_exit`. COMPLETED doesn't free it: the runner keeps answering
+    follow-ups (and calling the model) for FOLLOW_UP_TIMEOUT afterwards, so
+    COMPLETED only cuts the slot's expiry to the follow-up window in case the
+    exit message never arrives. The queue itself lives in this process;
+    jobs still waiting at shutdown are failed so they don't stay queued.
+
+    Every replica sees every status, but only the one a job was submitted to
+    records its lifecycle metrics, so summing them across replicas counts
+    each job once.
+    """
+    def __init__(self, max_running: int = SCHEDULER_MAX_RUNNING,
+                 max_per_installation: int = SCHEDULER_MAX_RUNNING_PER_INSTALLATION,
+                 max_queued: int = SCHEDULER_MAX_QUEUED, slot_ttl: int = SCHEDULER_SLOT_TTL_SECONDS,
+                 retry_after: int = SCHEDULER_RETRY_AFTER_SECONDS,
+                 follow_up_slot: int = SCHEDULER_FOLLOW_UP_SLOT_SECONDS):
+        self.max_running = max_running
+        self.max_per_installation = max_per_installation
+        self.max_queued = max_queued
+        self.slot_ttl = slot_ttl
+        self.retry_after = retry_after
+        self.follow_up_slot = follow_up_slot
+        # priority -> installation_id -> pending jobs (OrderedDict order is the round-robin turn)
+        self._queues: Dict[int, "OrderedDict[str, Deque[PendingJob]]"] = {
+            priority: OrderedDict() for priority in sorted(PRIORITIES.values())
+        }
+        self._queued = 0
+        self._lock = asyncio.Lock()
+        self._pump_task: Optional[asyncio.Task] = None
+        # launches in flight (the event loop only keeps weak references to tasks)
+        self._launches: Set[asyncio.Task] = set()
+        self._lifecycles: Dict[str, JobLifecycle] = {}
+        self.admitted = 0
+        self.rejected = 0
+
+    @staticmethod
+    def installation_key(installation_id: str) -> str:
+        return f"{RUNNING_KEY}:{installation_id}"
+
+    # ---------- public ----------
+
+    async def submit(self, job_id: str, installation_id: str, launch: Callable[[], Awaitable[None]],
+                     priority: str = "interactive",
+                     abandon: Optional[Callable[[str], Awaitable[None]]] = None) -> Optional[int]:
+        """
+        Start the job now if there is room, otherwise queue it.
+
+        Args:
+            abandon: called with a reason if the job is still queued when the
+                scheduler stops
+
+        Returns:
+            None when started, else the job's queue position (1-based)
+
+        Raises:
+            QueueFullError: the queue is at SCHEDULER_MAX_QUEUED
+        """
+        async with self._lock:
+            if self._queued >= self.max_queued:
+                self.rejected += 1
+                raise QueueFullError(self.retry_after)
+            job = PendingJob(job_id, str(installation_id), PRIORITIES[priority], launch, abandon)
+            self._queues[job.priority].setdefault(job.installation_id, deque()).append(job)
+            self._queued += 1
+            self._lifecycles[job_id] = JobLifecycle(priority, job.queued_at)
+        await self.pump()
+        return job.position
+
+    async def release(self, job_id: str) -> None:
+        """free a job's slot (idempotent; every replica may call it) and start waiting jobs"""
+        installation_id = await redisservices.redis.hget(SLOTS_KEY, job_id)
+        async with redisservices.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(RUNNING_KEY, job_id)
+            if installation_id:
+                pipe.zrem(self.installation_key(installation_id), job_id)
+            pipe.hdel(SLOTS_KEY, job_id)
+            await pipe.execute()
+        await self.pump()
+
+    async def on_status(self, job_id: str, status: str) -> None:
+        """job bus status hook"""
+        self._observe_status(job_id, status)
+        if status == "failed":
+            await self.release(job_id)
+        elif status == "completed":
+            await self._expire_slot(job_id, self.follow_up_slot)
+
+    async def on_exit(self, job_id: str) -> None:
+        """job bus hook for `runner_exit`: the runner is gone, follow-ups included"""
+        await self.release(job_id)
+
+    async def _expire_slot(self, job_id: str, seconds: int) -> None:
+        """bring a held slot's expiry forward to `seconds` from now (never extends it)"""
+        installation_id = await redisservices.redis.hget(SLOTS_KEY, job_id)
+        expires = time.time() + seconds
+        async with redisservices.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(RUNNING_KEY, {job_id: expires}, xx=True, lt=True)
+            if installation_id:
+                pipe.zadd(self.installation_key(installation_id), {job_id: expires}, xx=True, lt=True)
+            await pipe.execute()
+
+    def _observe_status(self, job_id: str, status: str) -> None:
+        lifecycle = self._lifecycles.get(job_id)
+        if lifecycle is None or status == lifecycle.status:
+            return
+        now = time.monotonic()
+        JOB_TRANSITIONS.inc(lifecycle.status, status)
+        lifecycle.status = status
+        if status == "running" and lifecycle.running_at is None:
+            lifecycle.running_at = now
+            JOB_QUEUE_TO_START.observe(now - lifecycle.queued_at, lifecycle.priority)
+            if lifecycle.launched_at is not None:
+                JOB_DISPATCH_TO_START.observe(now - lifecycle.launched_at)
+        elif status in ("completed", "failed"):
+            if lifecycle.running_at is not None:
+                JOB_RUN.observe(now - lifecycle.running_at, status)
+            del self._lifecycles[job_id]
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queued, "admitted": self.admitted, "rejected": self.rejected}
+
+    # ---------- lifecycle ----------
+
+    async def start(self):
+        """periodically retry queued jobs (slots can also free up by expiry or on other replicas)"""
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump_periodically())
+
+    async def stop(self):
+        if self._pump_task:
+            self._pump_task.cancel()
+            try:
+                await self._pump_task
+            except asyncio.CancelledError:
+                pass
+            self._pump_task = None
+        if self._launches:
+            await asyncio.wait(self._launches, timeout=10)
+        await self._abandon_queued("Server restarted before the job could start, please retry")
+
+    async def _abandon_queued(self, reason: str) -> None:
+        """empty the queue, failing every job in it (nothing else would ever start them)"""
+        async with self._lock:
+            pending = list(self._ordered())
+            for queues in self._queues.values():
+                queues.clear()
+            self._queued = 0
+        for job in pending:
+            self._lifecycles.pop(job.job_id, None)
+            if job.abandon is None:
+                continue
+            try:
+                await job.abandon(reason)
+            except Exception as e:
+                logger.error(f"❌ Could not fail queued job {job.job_id}: {e}")
+        if pending:
+            logger.info(f"🛑 Failed {len(pending)} queued job(s) on shutdown")
+
+    async def _pump_periodically(self):
+        while True:
+            await asyncio.sleep(5)
+            if self._queued:
+                try:
+                    await self.pump()
+                except Exception as e:
+                    logger.error(f"❌ Scheduler pump failed: {e}")
+
+    # ---------- scheduling ----------
+
+    def _ordered(self) -> Iterator[PendingJob]:
+        """queued jobs in the order they would start if slots freed one by one"""
+        for queues in self._queues.values():
+            cursors = {installation: 0 for installation in queues}
+            remaining = sum(len(jobs) for jobs in queues.values())
+            while remaining:
+                for installation, jobs in queues.items():
+                    index = cursors[installation]
+                    if index < len(jobs):
+                        cursors[installation] += 1
+                        remaining -= 1
+                        yield jobs[index]
+
+    async def _try_admit(self, job: PendingJob) -> int:
+        with REDIS_OPERATION.time("admit"):
+            return await redisservices.redis.eval(
+                _ADMIT_SCRIPT, 3, RUNNING_KEY, self.installation_key(job.installation_id), SLOTS_KEY,
+                job.job_id, self.max_running, self.max_per_installation, time.time(), self.slot_ttl,
+                job.installation_id,
+            )
+
+    async def _admit_from(self, queues: "OrderedDict[str, Deque[PendingJob]]", started: List[PendingJob]) -> bool:
+        """
+        Admit jobs of one priority, round-robin across installations.
+
+        Returns:
+            False once the global cap is reached
+        """
+        blocked = set()
+        while True:
+            # next installation in turn that isn't at its own cap
+            installation = next((i for i in queues if i not in blocked), None)
+            if installation is None:
+                return True
+            job = queues[installation][0]
+            result = await self._try_admit(job)
+            if result == 0:
+                return False
+            if result == -1:
+                blocked.add(installation)
+                continue
+            queues[installation].popleft()
+            if queues[installation]:
+                queues.move_to_end(installation)
+            else:
+                del queues[installation]
+            self._queued -= 1
+            job.position = None
+            started.append(job)
+
+    async def pump(self) -> None:
+        """start as many queued jobs as the caps allow, then publish positions"""
+        started: List[PendingJob] = []
+        changed: List[PendingJob] = []
+        async with self._lock:
+            for queues in self._queues.values():
+                if not await self._admit_from(queues, started):
+                    break
+            for position, job in enumerate(self._ordered(), start=1):
+                if job.position != position:
+                    job.position = position
+                    changed.append(job)
+
+        for job in started:
+            self.admitted += 1
+            task = asyncio.create_task(self._launch(job))
+            self._launches.add(task)
+            task.add_done_callback(self._launches.discard)
+        for job in changed:
+            await self._publish_position(job)
+
+    async def _launch(self, job: PendingJob) -> None:
+        now = time.monotonic()
+        waited = now - job.queued_at
+        JOB_QUEUE_WAIT.observe(waited, PRIORITY_NAMES[job.priority])
+        self._track_launch(job.job_id, now)
+        logger.info(f"🚦 Starting job {job.job_id} (installation {job.installation_id}, waited {waited:.2f}s)")
+        try:
+            await job.launch()
+        except Exception as e:
+            logger.error(f"❌ Launch of job {job.job_id} failed: {e}")
+            await self.release(job.job_id)
+
+    def _track_launch(self, job_id: str, now: float) -> None:
+        lifecycle = self._lifecycles.get(job_id)
+        if lifecycle is not None:
+            lifecycle.launched_at = now
+        # jobs that never reported a terminal status (their slot expired too)
+        stale = [
+            stale_id for stale_id, tracked in self._lifecycles.items()
+            if tracked.launched_at is not None and now - tracked.launched_at > self.slot_ttl
+        ]
+        for stale_id in stale:
+            del self._lifecycles[stale_id]
+
+    async def _publish_position(self, job: PendingJob) -> None:
+        await redisservices.publish_message(job.job_id, {
+            "type": "queue_position",
+            "content": {"position": job.position, "queued": self._queued},
+            "job_id": job.job_id,
+            "timestamp": datetime.now().isoformat(),
+            # pump() may run while another job's span is current
+            "traceparent": job.traceparent,
+        })
+
+
+job_scheduler = JobScheduler()
@@ -0,0 +1,96 @@
+import hashlib
+from typing import Any, Dict, Optional, Set
+from services.job_store import JOB_FIELDS
+
+# list fields that can be paged by cursor
+PAGED_FIELDS = ("messages", "file_changes")
+MAX_PAGE_LIMIT = 200
+
+
+class StatusQueryError(ValueError):
+    """invalid fields / cursor / limit"""
+
+
+class StatusView:
+    """
+    The part of a job status a client asked for.
+
+    * `fields`: comma separated top-level fields (job_id is always included);
+      list fields also take sub-fields, e.g. `file_changes.file_path` returns
+      file changes without their contents
+    * `<list>_cursor` / `<list>_limit`: page `messages` or `file_changes`.
+      Both lists only grow at the end, so the cursor is the index to resume
+      from; the response carries `next_cursor` and `total` per paged list.
+
+    No parameters means the full JobStatusResponse, as before.
+    """
+    def __init__(self, fields: Optional[str] = None, cursors: Optional[Dict[str, Optional[str]]] = None,
+                 limits: Optional[Dict[str, Optional[int]]] = None):
+        self.fields: Optional[Set[str]] = None
+        self.subfields: Dict[str, Set[str]] = {}
+        if fields:
+            self.fields = {"job_id"}
+            for name in (part.strip() for part in fields.split(",")):
+                if not name:
+                    continue
+                top, _, sub = name.partition(".")
+                if top not in JOB_FIELDS:
+                    raise StatusQueryError(f"unknown field: {top}")
+                if sub and top not in PAGED_FIELDS:
+                    raise StatusQueryError(f"{top} has no sub-fields")
+                self.fields.add(top)
+                if sub:
+                    self.subfields.setdefault(top, set()).add(sub)
+
+        self.pages: Dict[str, Dict[str, int]] = {}
+        for name in PAGED_FIELDS:
+            cursor = (cursors or {}).get(name)
+            limit = (limits or {}).get(name)
+            if cursor is None and limit is None:
+                continue
+            try:
+                start = int(cursor or 0)
+            except ValueError:
+                raise StatusQueryError(f"invalid {name} cursor") from None
+            if start < 0:
+                raise StatusQueryError(f"invalid {name} cursor")
+            if limit is not None and not 1 <= limit <= MAX_PAGE_LIMIT:
+                raise StatusQueryError(f"{name} limit must be between 1 and {MAX_PAGE_LIMIT}")
+            self.pages[name] = {"start": start, "limit": limit or MAX_PAGE_LIMIT}
+
+    @property
+    def is_full(self) -> bool:
+        return self.fields is None and not self.pages
+
+    def etag(self, seq: int) -> str:
+        """strong ETag: the job's version plus which view of it this is"""
+        if self.is_full:
+            return f'"{seq}"'
+        view = repr((
+            sorted(self.fields or ()),
+            sorted((name, sorted(sub)) for name, sub in self.subfields.items()),
+            sorted((name, page["start"], page["limit"]) for name, page in self.pages.items()),
+        ))
+        return f'"{seq}-{hashlib.sha256(view.encode()).hexdigest()[:16]}"'
+
+    def render(self, status: Dict[str, Any]) -> Dict[str, Any]:
+        """select and page a status dumped in JSON mode"""
+        if self.is_full:
+            return status
+        names = self.fields if self.fields is not None else status.keys()
+        out: Dict[str, Any] = {}
+        pages: Dict[str, Dict[str, Any]] = {}
+        for name in names:
+            value = status.get(name)
+            if name in self.pages and isinstance(value, list):
+                page = self.pages[name]
+                end = page["start"] + page["limit"]
+                pages[name] = {"next_cursor": str(end) if end < len(value) else None, "total": len(value)}
+                value = value[page["start"]:end]
+            if name in self.subfields and isinstance(value, list):
+                keep = self.subfields[name]
+                value = [{key: item.get(key) for key in keep} for item in value]
+            out[name] = value
+        if pages:
+            out["page"] = pages
+        return out
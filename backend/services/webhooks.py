@@ -0,0 +1,326 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import socket
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+from redis.exceptions import ResponseError
+from core.config import (
+    GITHUB_WEBHOOK_SECRET, WEBHOOK_BATCH_SIZE, WEBHOOK_BATCH_WINDOW_SECONDS, WEBHOOK_CLAIM_IDLE_SECONDS,
+    WEBHOOK_CONSUMER_GROUP, WEBHOOK_DEDUPE_TTL_SECONDS, WEBHOOK_JOB_LABEL, WEBHOOK_QUEUE_KEY,
+)
+from models.agent_model import RunAgentRequest
+from services.github_cache import github_cache
+from services.job import schedule_agent_job
+from services.redis import redisservices
+from services.repo_index import repo_index
+from services.scheduler import QueueFullError
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
+
+logger = logging.getLogger(__name__)
+
+# events that change what /installation-repos and /branches return
+CACHE_INVALIDATING_EVENTS = {"installation", "installation_repositories", "repository", "create", "delete", "push"}
+
+# pause after an empty read, for servers that don't honour BLOCK (fakeredis)
+EMPTY_READ_PAUSE_SECONDS = 0.05
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """check X-Hub-Signature-256 (sha256=<hex hmac of the raw body>)"""
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256="):])
+
+
+async def update_repo_index(event: str, installation_id: str, body: dict):
+    """keep the installation -> repo metadata index in step with GitHub"""
+    action = body.get("action")
+    if event == "installation":
+        if action in ("deleted", "suspend"):
+            await repo_index.drop_installation(installation_id)
+        elif action == "created":
+            await repo_index.merge(installation_id, body.get("repositories") or [])
+    elif event == "installation_repositories":
+        await repo_index.merge(installation_id, body.get("repositories_added") or [])
+        await repo_index.remove(installation_id, [repo["name"] for repo in body.get("repositories_removed") or []])
+    elif event == "repository":
+        repo = body.get("repository") or {}
+        if action in ("deleted", "transferred"):
+            await repo_index.remove(installation_id, [repo["name"]])
+        elif action == "renamed":
+            old_name = ((body.get("changes") or {}).get("repository") or {}).get("name", {}).get("from")
+            if old_name:
+                await repo_index.remove(installation_id, [old_name])
+            await repo_index.add(installation_id, [repo])
+        elif repo:
+            # created, edited (default branch), privatized, publicized, ...
+            await repo_index.add(installation_id, [repo])
+
+
+class WebhookPipeline:
+    """
+    GitHub webhook ingestion.
+
+    The route only verifies the signature on the raw body, claims the
+    delivery id (SET NX, so redeliveries are dropped) and appends the event
+    to a Redis stream, then answers 202; nothing is parsed or awaited on
+    GitHub's clock.
+
+    Every backend process reads the stream as one consumer of a shared
+    consumer group, in batches: it waits for one event, lets a short window
+    fill, and takes the rest of the burst. Entries are acked (and deleted)
+    only after the batch was processed; entries a crashed consumer left
+    unacked are claimed by another one after WEBHOOK_CLAIM_IDLE_SECONDS, so
+    a delivery is handled at least once.
+    Events are grouped per repository and handled in order within a group;
+    an installation's response cache is invalidated once per batch however
+    many events touched it, and a pull request labeled several times starts
+    one job.
+    """
+    def __init__(self, secret: Optional[str] = GITHUB_WEBHOOK_SECRET, queue_key: str = WEBHOOK_QUEUE_KEY,
+                 batch_window: float = WEBHOOK_BATCH_WINDOW_SECONDS, batch_size: int = WEBHOOK_BATCH_SIZE,
+                 group: str = WEBHOOK_CONSUMER_GROUP, claim_idle: int = WEBHOOK_CLAIM_IDLE_SECONDS):
+        self.secret = secret
+        self.queue_key = queue_key
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self.group = group
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.claim_idle = claim_idle
+        self._task: Optional[asyncio.Task] = None
+        # checked by the loop as well, in case a client swallows the cancellation
+        self._stopping = False
+
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.processed = 0
+        self.batches = 0
+        self.invalidations = 0
+        self.jobs_started = 0
+        self.failures = 0
+
+    @staticmethod
+    def delivery_key(delivery_id: str) -> str:
+        return f"webhook:delivery:{delivery_id}"
+
+    async def accept(self, delivery_id: str, event: str, body: bytes) -> bool:
+        """
+        Queue a verified delivery.
+
+        Returns:
+            False if this delivery was already accepted
+        """
+        key = self.delivery_key(delivery_id)
+        if not await redisservices.redis.set(key, 1, nx=True, ex=WEBHOOK_DEDUPE_TTL_SECONDS):
+            self.duplicates += 1
+            return False
+        try:
+            await redisservices.redis.xadd(self.queue_key, {
+                "delivery": delivery_id,
+                "event": event,
+                "payload": body.decode(),
+            })
+        except Exception:
+            # let a redelivery through
+            await redisservices.redis.delete(key)
+            raise
+        self.accepted += 1
+        return True
+
+    async def start(self):
+        self._stopping = False
+        if self._task is None or self._task.done():
+            await self._ensure_group()
+            self._task = asyncio.create_task(self._consume())
+
+    async def _ensure_group(self):
+        try:
+            await redisservices.redis.xgroup_create(self.queue_key, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def stop(self):
+        self._stopping = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _consume(self):
+        logger.info(f"✅ Webhook consumer {self.consumer} reading {self.queue_key} (group {self.group})")
+        while not self._stopping:
+            try:
+                entries = await self._next_batch()
+                if not entries:
+                    await asyncio.sleep(EMPTY_READ_PAUSE_SECONDS)
+                    continue
+                batch = self._decode(entries)
+                if batch:
+                    await self.process(batch)
+                await self._ack([entry_id for entry_id, _ in entries])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # unacked entries are claimed again once they have been idle long enough
+                logger.error(f"❌ Webhook consumer failed: {e}")
+                await asyncio.sleep(1)
+
+    async def _next_batch(self) -> List[Tuple[str, Dict[str, str]]]:
+        """stream entries to handle next: ones abandoned by a crashed consumer first, then new ones"""
+        claimed = await redisservices.redis.xautoclaim(
+            self.queue_key, self.group, self.consumer, min_idle_time=self.claim_idle * 1000,
+            start_id="0-0", count=self.batch_size,
+        )
+        # deleted entries come back as None
+        entries = [entry for entry in claimed[1] if entry[1]]
+        if entries:
+            logger.info(f"♻️ Claimed {len(entries)} unacked webhook(s)")
+            return entries
+
+        first = await redisservices.redis.xreadgroup(
+            self.group, self.consumer, {self.queue_key: ">"}, count=1, block=5000)
+        if not first:
+            return []
+        # let the rest of a burst (a push and its create, a bulk label) arrive
+        await asyncio.sleep(self.batch_window)
+        entries = list(first[0][1])
+        if self.batch_size > 1:
+            rest = await redisservices.redis.xreadgroup(
+                self.group, self.consumer, {self.queue_key: ">"}, count=self.batch_size - 1)
+            if rest:
+                entries.extend(rest[0][1])
+        return entries
+
+    def _decode(self, entries: List[Tuple[str, Dict[str, str]]]) -> List[Dict[str, Any]]:
+        batch = []
+        for entry_id, fields in entries:
+            try:
+                batch.append({
+                    "delivery": fields.get("delivery"),
+                    "event": fields["event"],
+                    "body": json.loads(fields["payload"]),
+                })
+            except (ValueError, KeyError) as e:
+                # acked with the rest: retrying can't fix it
+                self.failures += 1
+                logger.warning(f"⚠️ Dropping undecodable webhook {entry_id}: {e}")
+        return batch
+
+    async def _ack(self, entry_ids: List[str]) -> None:
+        async with redisservices.redis.pipeline(transaction=True) as pipe:
+            pipe.xack(self.queue_key, self.group, *entry_ids)
+            pipe.xdel(self.queue_key, *entry_ids)
+            await pipe.execute()
+
+    async def process(self, batch: List[Dict[str, Any]]) -> None:
+        """handle one batch of deliveries"""
+        self.batches += 1
+        groups: "OrderedDict[Tuple[str, str], List[Dict[str, Any]]]" = OrderedDict()
+        stale_installations: Set[str] = set()
+        for item in batch:
+            body = item["body"]
+            installation_id = str((body.get("installation") or {}).get("id") or "")
+            if not installation_id:
+                continue
+            repo = (body.get("repository") or {}).get("full_name") or ""
+            groups.setdefault((installation_id, repo), []).append(item)
+            if self._invalidates_cache(item["event"], body):
+                stale_installations.add(installation_id)
+
+        for installation_id in stale_installations:
+            try:
+                await github_cache.invalidate_installation(installation_id)
+                self.invalidations += 1
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"❌ Cache invalidation failed for installation {installation_id}: {e}")
+
+        # repositories are independent; events of one repository stay in order
+        await asyncio.gather(*(
+            self._process_group(installation_id, items)
+            for (installation_id, _), items in groups.items()
+        ))
+        self.processed += len(batch)
+        logger.info(
+            f"🔔 Handled {len(batch)} webhook(s) for {len(groups)} repositories, "
+            f"{len(stale_installations)} cache invalidation(s)"
+        )
+
+    @staticmethod
+    def _invalidates_cache(event: str, body: dict) -> bool:
+        if event not in CACHE_INVALIDATING_EVENTS:
+            return False
+        # a push only changes branches when it creates or deletes one
+        return event != "push" or bool(body.get("created") or body.get("deleted"))
+
+    async def _process_group(self, installation_id: str, items: List[Dict[str, Any]]) -> None:
+        started_prs: Set[int] = set()
+        for item in items:
+            event, body = item["event"], item["body"]
+            try:
+                if event in CACHE_INVALIDATING_EVENTS:
+                    await update_repo_index(event, installation_id, body)
+                elif event == "pull_request" and self._requests_job(body):
+                    number = body["pull_request"]["number"]
+                    if number not in started_prs:
+                        started_prs.add(number)
+                        await self._start_pr_job(installation_id, body)
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"❌ Webhook {item.get('delivery')} ({event}) failed: {e}")
+
+    @staticmethod
+    def _requests_job(body: dict) -> bool:
+        return body.get("action") == "labeled" and (body.get("label") or {}).get("name") == WEBHOOK_JOB_LABEL
+
+    async def _start_pr_job(self, installation_id: str, body: dict) -> None:
+        pr = body["pull_request"]
+        repo = body["repository"]["full_name"]
+        head = pr.get("head") or {}
+        if (head.get("repo") or {}).get("full_name") != repo:
+            logger.info(f"⏭️ Not starting a job for {repo}#{pr['number']}: branch is on a fork")
+            return
+        prompt = pr.get("title") or ""
+        if pr.get("body"):
+            prompt = f"{prompt}\n\n{pr['body']}"
+        try:
+            job_id, position = await schedule_agent_job(RunAgentRequest(
+                prompt=prompt,
+                repo_name=repo,
+                installation_id=int(installation_id),
+                branches=head["ref"],
+            ), priority="webhook")
+        except QueueFullError:
+            logger.warning(f"⚠️ Queue full, no job for {repo}#{pr['number']}")
+            return
+        self.jobs_started += 1
+        logger.info(f"🚀 Job {job_id} for {repo}#{pr['number']} (queue position {position})")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "batches": self.batches,
+            "cache_invalidations": self.invalidations,
+            "jobs_started": self.jobs_started,
+            "failures": self.failures,
+        }
+
+
+webhook_pipeline = WebhookPipeline()
@@ -1,8 +1,16 @@
 import asyncio
 from datetime import datetime
+import json
 import logging
-from typing import Dict, List
+import time
+import zlib
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
 from fastapi import WebSocket
+from core.config import (
+    WS_COMPRESS_LEVEL, WS_COMPRESS_MIN_BYTES, WS_SEND_QUEUE_SIZE, WS_SEND_TIMEOUT_SECONDS,
+)
+from services.redis import covered_until, stream_id
 
 logging.basicConfig(
     level=logging.INFO,
@@ -11,6 +19,74 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+ConnectionKey = Tuple[str, WebSocket]
+
+# offered by clients that can inflate binary frames; messages of at least
+# WS_COMPRESS_MIN_BYTES then go out as raw deflate (no zlib header), anything
+# smaller (pings, agent messages, small statuses) stays a text frame
+COMPRESSION_SUBPROTOCOL = "job-events.deflate"
+
+
+class Outbox:
+    """
+    Bounded send queue of one connection, drained by a writer task that only
+    exists while there is something to send.
+
+    * agent/user messages keep their order
+    * a new status_update replaces one still waiting (fields are merged, so
+      partial updates lose nothing) and moves to the tail
+    * at most one ping waits at a time
+    """
+    __slots__ = ("websocket", "job_id", "items", "status_item", "ping_pending", "writer", "held", "compress")
+
+    def __init__(self, websocket: WebSocket, job_id: str, compress: bool = False):
+        self.websocket = websocket
+        self.job_id = job_id
+        # [message type, encoded message, deflated message or None]
+        self.items: Deque[list] = deque()
+        self.status_item: Optional[list] = None
+        self.ping_pending = False
+        self.writer: Optional[asyncio.Task] = None
+        # live messages kept back while the connection replays missed events:
+        # (type, encoded message, event id)
+        self.held: Optional[List[Tuple[Optional[str], str, Optional[str]]]] = None
+        self.compress = compress
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @staticmethod
+    def merge_status(older: str, newer: str) -> str:
+        """merge two status_update messages, newer fields win"""
+        old_message, new_message = json.loads(older), json.loads(newer)
+        try:
+            content = {**json.loads(old_message["content"]), **json.loads(new_message["content"])}
+        except (KeyError, TypeError, ValueError):
+            return newer
+        new_message["content"] = json.dumps(content)
+        return json.dumps(new_message)
+
+
+class JobTraffic:
+    """bytes and compression work spent sending one job's messages"""
+    __slots__ = ("messages", "raw_bytes", "wire_bytes", "compressed", "compress_seconds")
+
+    def __init__(self):
+        self.messages = 0
+        self.raw_bytes = 0
+        self.wire_bytes = 0
+        self.compressed = 0
+        self.compress_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "messages": self.messages,
+            "raw_bytes": self.raw_bytes,
+            "wire_bytes": self.wire_bytes,
+            "compressed_messages": self.compressed,
+            "compress_cpu_ms": round(self.compress_seconds * 1000, 3),
+        }
+
 
 class JobConnectionManager:
     """
@@ -19,182 +95,423 @@ class JobConnectionManager:
     2.track the lifesycle
     3.handle background task
 
+    Heartbeats run on one hashed timer wheel instead of a task per socket:
+    the wheel has one bucket per tick, a connection sits in the bucket of its
+    next ping, and each tick pings (one encoded message, sent in a batch) and
+    times out only the connections in that bucket. Work per tick is
+    O(connections / interval) and there is a single background task.
+
+    All state is touched from the event loop only, between awaits, so the
+    per-job connection sets need no lock.
     """
-    def __init__(self, heartbeat_timeout:int=60, heartbeat_interval:int=10):
+    def __init__(self, heartbeat_timeout:int=60, heartbeat_interval:int=10, tick:float=1.0,
+                 send_queue_size:int=WS_SEND_QUEUE_SIZE, send_timeout:float=WS_SEND_TIMEOUT_SECONDS,
+                 compress_min_bytes:int=WS_COMPRESS_MIN_BYTES, compress_level:int=WS_COMPRESS_LEVEL):
         """
         Args:
             heartbeat_interval: sets interval between every ping messages (10 seconds)
             heartbeat_timeout: seconds between dead connections (60 seconds)
+            tick: timer wheel resolution in seconds
+            send_queue_size: queued messages after which a client counts as too slow
+            send_timeout: seconds a single send may take before the client counts as too slow
+            compress_min_bytes: smallest message deflated for clients that negotiated it
+            compress_level: zlib level
         """
 
         # storing every connctions
-        self.active_connections:Dict[str,List[WebSocket]] = {}
-        
-        # store the last heartbeat for connection
-        self.last_heartbeat:Dict[str,float] = {}
+        self.active_connections:Dict[str,Set[WebSocket]] = {}
 
-        # run background task for for check connection
-        self.heartbeat_task:Dict[str,asyncio.Task] = {}
+        # store the last heartbeat (pong) for connection
+        self.last_heartbeat:Dict[ConnectionKey,float] = {}
 
         self.heartbeat_interval = heartbeat_interval
         self.heartbeat_timeout = heartbeat_timeout
+        self.tick = tick
+
+        # timer wheel: one bucket of connections per tick, one turn per ping interval
+        self._wheel_size = max(1, round(heartbeat_interval / tick))
+        self._wheel: List[Set[ConnectionKey]] = [set() for _ in range(self._wheel_size)]
+        self._bucket_of: Dict[ConnectionKey, int] = {}
+        self._cursor = 0
 
-        self._lock = asyncio.Lock()
+        # the wheel task is started with the first connection so the manager
+        # can be created outside a running event loop
+        self.wheel_task: Optional[asyncio.Task] = None
 
-        # start background task to monitor connections
-        self.monitor_task = asyncio.create_task(self._monitor_connection())
+        # per-connection send queues; nothing awaits a socket except its writer
+        self._outboxes: Dict[ConnectionKey, Outbox] = {}
+        self.send_queue_size = send_queue_size
+        self.send_timeout = send_timeout
 
-    async def connect(self,websocket:WebSocket,job_id:str):
+        self.pings_sent = 0
+        self.timeouts = 0
+        self.messages_queued = 0
+        self.messages_sent = 0
+        self.status_coalesced = 0
+        self.messages_dropped = 0
+        self.slow_disconnects = 0
+        self.max_queue_depth = 0
+
+        self.compress_min_bytes = compress_min_bytes
+        self.compress_level = compress_level
+        # per job while it has viewers, and across all jobs
+        self.traffic: Dict[str, JobTraffic] = {}
+        self.total_traffic = JobTraffic()
+
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def _schedule(self, key: ConnectionKey):
+        """
+        put a connection one ping interval ahead: a full turn of the wheel is
+        one interval, so that is the bucket under the cursor (already
+        processed for this tick)
+        """
+        self._wheel[self._cursor].add(key)
+        self._bucket_of[key] = self._cursor
+
+    async def connect(self,websocket:WebSocket,job_id:str,hold:bool=False):
         """
         accept all the connections
 
+        Args:
+            hold: keep live messages back until release(), so a replay or
+                snapshot sent first can't be overtaken
         """
         try:
-            # accept connections
-            await websocket.accept()
+            # accept connections, agreeing to compression if the client offers it
+            compress = COMPRESSION_SUBPROTOCOL in websocket.scope.get("subprotocols", ())
+            await websocket.accept(subprotocol=COMPRESSION_SUBPROTOCOL if compress else None)
+
+            if self.wheel_task is None or self.wheel_task.done():
+                self.wheel_task = asyncio.create_task(self._run_wheel())
 
             # store all the connections in connections list
-            async with self._lock:
-                if job_id not in self.active_connections:
-                    self.active_connections[job_id] = []
-                self.active_connections[job_id].append(websocket)
+            self.active_connections.setdefault(job_id, set()).add(websocket)
 
             # start the heartbeat
             connection_key = (job_id,websocket)
-            self.last_heartbeat[connection_key] = asyncio.get_event_loop().time()
+            outbox = Outbox(websocket, job_id, compress)
+            self.traffic.setdefault(job_id, JobTraffic())
+            if hold:
+                outbox.held = []
+            self._outboxes[connection_key] = outbox
+            self.last_heartbeat[connection_key] = self._now()
+            self._schedule(connection_key)
 
-            # start the hearbeat background task
-            heartbeat_background_task = asyncio.create_task(
-                self._heartbeat_send(websocket,job_id)
-            )
-            self.heartbeat_task[connection_key] = heartbeat_background_task
-            
         except Exception as e:
-            logging.error(f"❌ Error connecting to job {job_id}: {e}")
             logger.error(f"❌ Error connecting to job {job_id}: {e}")
             raise
 
     async def disconnect(self,websocket:WebSocket,job_id:str):
-        """remove connections and cleanup resourses"""
-        try:
-           async with self._lock:
-              # Remove from active connections
-              if job_id in self.active_connections:
-                 if websocket in self.active_connections:
-                    self.active_connections[job_id].remove(websocket)
+        """remove connections and cleanup resourses (safe to call more than once)"""
+        self._remove(websocket, job_id)
+        logger.info(f"🔌 WebSocket disconnected from job {job_id}")
+
+    def _remove(self, websocket: WebSocket, job_id: str):
+        connections = self.active_connections.get(job_id)
+        if connections is not None:
+            connections.discard(websocket)
             # Remove job entry if no more connections
-                 if not self.active_connections[job_id]:
-                    del self.active_connections[job_id]
-
-            # Clean up heartbeat tracking
-              connection_key = (job_id,websocket)
-              if connection_key in self.last_heartbeat:
-                 del self.last_heartbeat[connection_key]
-              if connection_key in self.heartbeat_task:
-                 self.heartbeat_task[connection_key].cancel()
-                 del self.heartbeat_task[connection_key]
-           logging.info(f"🔌 WebSocket disconnected from job {job_id}")
-           logger.info(f"🔌 WebSocket disconnected from job {job_id}")
-        except Exception as e:
-          logging.error(f"🔌 WebSocket not disconnected from job {job_id}")
-          logger.error(f"🔌 WebSocket not disconnected from job {job_id}")
+            if not connections:
+                del self.active_connections[job_id]
+                self._log_traffic(job_id)
+
+        # Clean up heartbeat tracking
+        connection_key = (job_id,websocket)
+        self.last_heartbeat.pop(connection_key, None)
+        bucket = self._bucket_of.pop(connection_key, None)
+        if bucket is not None:
+            self._wheel[bucket].discard(connection_key)
+        outbox = self._outboxes.pop(connection_key, None)
+        if outbox is not None:
+            self.messages_dropped += len(outbox) + len(outbox.held or ())
+            outbox.items.clear()
+            if outbox.writer and outbox.writer is not asyncio.current_task():
+                outbox.writer.cancel()
+
+    # ---------- sending ----------
+
+    def send(self, websocket: WebSocket, job_id: str, text: str, message_type: Optional[str] = None,
+             event_id: Optional[str] = None, deflated: Optional[bytes] = None) -> bool:
+        """
+        Queue an encoded message for one connection (never waits on the socket).
+
+        Args:
+            deflated: the message already compressed (shared by a broadcast)
 
-    async def _heartbeat_send(self,websocket:WebSocket,job_id:str):
+        Returns:
+            False if the connection is gone or was dropped as too slow
+        """
+        key = (job_id, websocket)
+        outbox = self._outboxes.get(key)
+        if outbox is None:
+            return False
+
+        if outbox.held is not None and message_type != "ping":
+            outbox.held.append((message_type, text, event_id))
+            if len(outbox.held) > self.send_queue_size:
+                self._drop_slow(outbox, f"{len(outbox.held)} messages behind while catching up")
+                return False
+            return True
+
+        if message_type == "ping":
+            if outbox.ping_pending:
+                return True
+            outbox.ping_pending = True
+            outbox.items.append([message_type, text, None])
+        elif message_type == "status_update" and outbox.status_item is not None:
+            # the client hasn't received the previous status yet: send one merged status
+            outbox.items.remove(outbox.status_item)
+            outbox.status_item = [message_type, Outbox.merge_status(outbox.status_item[1], text), None]
+            outbox.items.append(outbox.status_item)
+            self.status_coalesced += 1
+        else:
+            item = [message_type, text, deflated]
+            outbox.items.append(item)
+            if message_type == "status_update":
+                outbox.status_item = item
+
+        self.messages_queued += 1
+        depth = len(outbox)
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        if depth > self.send_queue_size:
+            self._drop_slow(outbox, f"{depth} messages behind")
+            return False
+
+        if outbox.writer is None:
+            outbox.writer = asyncio.create_task(self._write(outbox))
+        return True
+
+    def release(self, websocket: WebSocket, job_id: str,
+                backlog: List[Tuple[Optional[str], str, Optional[str]]], after: Optional[str] = None):
+        """
+        Queue the replayed events or snapshot of a held connection, then the
+        live messages that arrived meanwhile and aren't already covered.
+
+        Args:
+            backlog: (type, encoded message, event id) to send first
+            after: id of the last event the backlog covers
+        """
+        outbox = self._outboxes.get((job_id, websocket))
+        if outbox is None or outbox.held is None:
+            return
+        held, outbox.held = outbox.held, None
+        last = covered_until(backlog, after)
+
+        for message_type, text, event_id in backlog:
+            self.send(websocket, job_id, text, message_type, event_id)
+        for message_type, text, event_id in held:
+            if last is not None and event_id and stream_id(event_id) <= last:
+                continue
+            self.send(websocket, job_id, text, message_type, event_id)
+
+    async def _write(self, outbox: Outbox):
+        """drain one connection's queue, then exit"""
+        try:
+            while outbox.items:
+                item = outbox.items.popleft()
+                if item is outbox.status_item:
+                    outbox.status_item = None
+                elif item[0] == "ping":
+                    outbox.ping_pending = False
+                message_type, text, deflated = item
+                raw_size = len(text.encode()) if not text.isascii() else len(text)
+                if outbox.compress and raw_size >= self.compress_min_bytes:
+                    if deflated is None:
+                        deflated = self._deflate(outbox.job_id, text)
+                    wire_size = len(deflated)
+                else:
+                    deflated, wire_size = None, raw_size
+                try:
+                    async with asyncio.timeout(self.send_timeout):
+                        if deflated is not None:
+                            await outbox.websocket.send_bytes(deflated)
+                        else:
+                            await outbox.websocket.send_text(text)
+                except TimeoutError:
+                    self._drop_slow(outbox, f"send took over {self.send_timeout}s")
+                    return
+                except Exception as e:
+                    logger.warning(f"💔 Send failed for job {outbox.job_id}: {e}")
+                    self._remove(outbox.websocket, outbox.job_id)
+                    return
+                self.messages_sent += 1
+                if message_type == "ping":
+                    self.pings_sent += 1
+                self._count(outbox.job_id, raw_size, wire_size)
+        finally:
+            outbox.writer = None
+
+    def _deflate(self, job_id: str, text: str) -> bytes:
+        """raw deflate of one message, timed against the job"""
+        started = time.process_time()
+        compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        deflated = compressor.compress(text.encode()) + compressor.flush()
+        elapsed = time.process_time() - started
+        for traffic in (self.traffic.get(job_id), self.total_traffic):
+            if traffic is not None:
+                traffic.compressed += 1
+                traffic.compress_seconds += elapsed
+        return deflated
+
+    def _count(self, job_id: str, raw_size: int, wire_size: int):
+        for traffic in (self.traffic.get(job_id), self.total_traffic):
+            if traffic is not None:
+                traffic.messages += 1
+                traffic.raw_bytes += raw_size
+                traffic.wire_bytes += wire_size
+
+    def _log_traffic(self, job_id: str):
+        traffic = self.traffic.pop(job_id, None)
+        if traffic and traffic.messages:
+            logger.info(
+                f"📦 Job {job_id} sent {traffic.messages} messages, "
+                f"{traffic.raw_bytes} -> {traffic.wire_bytes} bytes, "
+                f"{traffic.compressed} compressed in {traffic.compress_seconds * 1000:.1f} ms CPU"
+            )
+
+    def traffic_stats(self) -> Dict[str, Dict[str, float]]:
+        """bytes sent and compression CPU, overall and per job being watched"""
+        return {
+            "total": self.total_traffic.as_dict(),
+            "jobs": {job_id: traffic.as_dict() for job_id, traffic in self.traffic.items()},
+        }
+
+    def _drop_slow(self, outbox: Outbox, reason: str):
+        logger.warning(f"🐢 Disconnecting slow client of job {outbox.job_id} ({reason})")
+        self.slow_disconnects += 1
+        self._remove(outbox.websocket, outbox.job_id)
+        # 1013: try again later
+        asyncio.create_task(self._close_quietly(outbox.websocket, code=1013))
+
+    def outbox_stats(self) -> Dict[str, int]:
+        """send queue depth and counters"""
+        depths = [len(outbox) for outbox in self._outboxes.values()]
+        return {
+            "connections": len(depths),
+            "queued_now": sum(depths),
+            "deepest_queue_now": max(depths, default=0),
+            "max_queue_depth": self.max_queue_depth,
+            "messages_queued": self.messages_queued,
+            "messages_sent": self.messages_sent,
+            "status_coalesced": self.status_coalesced,
+            "messages_dropped": self.messages_dropped,
+            "slow_disconnects": self.slow_disconnects,
+            "heartbeat_timeouts": self.timeouts,
+            "pings_sent": self.pings_sent,
+        }
+
+    async def _run_wheel(self):
+        """ ping and time out the connections of one bucket per tick """
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
         try:
-          while True:
-              await asyncio.sleep(self.heartbeat_interval)
-              try:
-                await websocket.send_json({
-                   "type":"ping",
-                   "timestamp":datetime.now().isoformat()
-                })
-                logging.debug(f"💓 Sent ping to job {job_id}")
-                logger.debug(f"💓 Sent ping to job {job_id}")
-              except Exception as e:
-                logging.warning(f"💔 Heartbeat failed for job {job_id}: {e}")
-                logger.warning(f"💔 Heartbeat failed for job {job_id}: {e}")
-                break
+            while True:
+                next_tick += self.tick
+                await asyncio.sleep(max(0.0, next_tick - loop.time()))
+                self._cursor = (self._cursor + 1) % self._wheel_size
+                due = self._wheel[self._cursor]
+                self._wheel[self._cursor] = set()
+                if due:
+                    self._process_bucket(due)
         except asyncio.CancelledError:
-          logging.debug(f"Heartbeat cancelled for job {job_id}")
-          logger.debug(f"Heartbeat cancelled for job {job_id}")
-
-    async def _monitor_connection(self):
-       """ monitor all the dead connections """
-       try:
-         while True:
-            await asyncio.sleep(10)
-            current_time = asyncio.get_event_loop().time()
-            dead_connections = []
-
-            # find connections that are not responding
-            async with self._lock:
-               for (job_id,websocket) , last_beat in list(self.last_heartbeat.items()):
-                  if current_time - last_beat > self.heartbeat_timeout:
-                     dead_connections.append((job_id,websocket))
-
-            # cleanup dead connections
-            for job_id , websocket in dead_connections:
-               logging.warning({
-                  f"⚠️ Connection for job {job_id} timed out "
-                  f"(no response for {self.heartbeat_timeout}s)"
-               })
-               logger.warning({
-                  f"⚠️ Connection for job {job_id} timed out "
-                  f"(no response for {self.heartbeat_timeout}s)"
-               })
-               await self.disconnect(websocket=websocket,job_id=job_id)
-
-       except asyncio.CancelledError:
-         logging.info("Connection monitor stopped")
-         logger.info("Connection monitor stopped")
+            logger.info("Connection heartbeat wheel stopped")
+
+    def _process_bucket(self, due: Set[ConnectionKey]):
+        now = self._now()
+        alive: List[ConnectionKey] = []
+        for key in due:
+            self._bucket_of.pop(key, None)
+            last_beat = self.last_heartbeat.get(key)
+            if last_beat is None:
+                continue
+            if now - last_beat > self.heartbeat_timeout:
+                job_id, websocket = key
+                logger.warning(
+                    f"⚠️ Connection for job {job_id} timed out "
+                    f"(no response for {self.heartbeat_timeout}s)"
+                )
+                self.timeouts += 1
+                self._remove(websocket, job_id)
+                asyncio.create_task(self._close_quietly(websocket))
+                continue
+            alive.append(key)
+            self._schedule(key)
+
+        if not alive:
+            return
+        # one encoded ping for the whole bucket, queued behind pending messages
+        ping = json.dumps({"type":"ping","timestamp":datetime.now().isoformat()})
+        for job_id, websocket in alive:
+            self.send(websocket, job_id, ping, "ping")
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket, code: int = 1000):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
 
     async def update_heartbeat(self, websocket: WebSocket, job_id: str):
         """Update heartbeat timestamp when client sends pong"""
         connection_key = (job_id, websocket)
         if connection_key in self.last_heartbeat:
-            self.last_heartbeat[connection_key] = asyncio.get_event_loop().time()
-            logging.debug(f"💚 Received pong from job {job_id}")
+            self.last_heartbeat[connection_key] = self._now()
             logger.debug(f"💚 Received pong from job {job_id}")
 
+    def broadcast(self, job_id: str, text: str, message_type: Optional[str] = None,
+                  event_id: Optional[str] = None) -> int:
+        """
+        queue an already encoded message for every local socket of a job
+
+        Returns:
+            number of sockets it was queued for
+        """
+        websockets = list(self.active_connections.get(job_id, ()))
+        # compress once for every socket that negotiated it
+        deflated = None
+        if len(text) >= self.compress_min_bytes and any(
+            self._outboxes[(job_id, websocket)].compress
+            for websocket in websockets if (job_id, websocket) in self._outboxes
+        ):
+            deflated = self._deflate(job_id, text)
+        return sum(
+            self.send(websocket, job_id, text, message_type, event_id, deflated)
+            for websocket in websockets
+        )
+
     def get_job_connections(self, job_id: str) -> int:
         """Get number of active connections for a job"""
-        return len(self.active_connections.get(job_id, []))
-    
+        return len(self.active_connections.get(job_id, ()))
+
     def get_all_jobs(self) -> List[str]:
         """Get list of all jobs with active connections"""
         return list(self.active_connections.keys())
-    
+
     def get_total_connections(self) -> int:
         """Get total number of active connections across all jobs"""
         return sum(len(conns) for conns in self.active_connections.values())
-    
+
     async def shutdown(self):
        """ shutdown all connections """
-       logging.info("🛑 Shutting down WebSocket manager...")
        logger.info("🛑 Shutting down WebSocket manager...")
 
-     # cancel monitor
-       self.monitor_task.cancel()
-
-     # cancel all heartbeat task
-       for task in self.heartbeat_task.values():
-          task.cancel()
-
-     # Close all connections
+       # stop the heartbeat wheel
+       if self.wheel_task:
+          self.wheel_task.cancel()
+          self.wheel_task = None
 
+       # Close all connections
        for job_id, connections in list(self.active_connections.items()):
-          for websocket in connections:
-             try:
-                await websocket.close()
-             except:
-               pass
-             await self.disconnect(websocket, job_id)
-
-       logging.info("✅ WebSocket manager shutdown complete")
+          for websocket in list(connections):
+             await self._close_quietly(websocket)
+             self._remove(websocket, job_id)
+
        logger.info("✅ WebSocket manager shutdown complete")
 
 # Global manager instance
 manager = JobConnectionManager(
     heartbeat_interval=30,  # Ping every 30 seconds
     heartbeat_timeout=60    # Consider dead after 60 seconds
-)       
\ No newline at end of file
+)
@@ -0,0 +1,187 @@
+"""
+GitHubHTTPClient against httpx.MockTransport: retries, jitter and rate limit
+throttling. Sleeps are recorded instead of waited.
+
+    cd backend && python -m pytest tests
+"""
+import asyncio
+import time
+import httpx
+import pytest
+from github import http_client
+from github.http_client import GitHubHTTPClient, GitHubRateLimitError
+
+APP_JWT = "Bearer eyJhbGciOiJSUzI1NiJ9.eyJpc3MiOiIxIn0.c2ln"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+
+    async def fake_sleep(delay):
+        recorded.append(delay)
+
+    monkeypatch.setattr(http_client.asyncio, "sleep", fake_sleep)
+    return recorded
+
+
+def make_client(responses, max_retries=3, rate_limit_reserve=10):
+    """client whose transport answers with `responses` in order and records the requests"""
+    sent = []
+    queue = list(responses)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(request)
+        response = queue.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    client = GitHubHTTPClient(base_url="https://api.test", max_retries=max_retries,
+                              rate_limit_reserve=rate_limit_reserve, transport=httpx.MockTransport(handler))
+    return client, sent
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_get_retries_server_errors_with_full_jitter(sleeps, monkeypatch):
+    bounds = []
+
+    def uniform(low, high):
+        bounds.append((low, high))
+        return high / 2
+
+    monkeypatch.setattr(http_client.random, "uniform", uniform)
+    client, sent = make_client([httpx.Response(502), httpx.Response(503), httpx.Response(200, json={"ok": True})])
+
+    response = run(client.get("/repos/o/r"))
+
+    assert response.status_code == 200
+    assert len(sent) == 3
+    # full jitter: uniform between 0 and the doubling cap
+    assert bounds == [(0, 0.5), (0, 1.0)]
+    assert sleeps == [0.25, 0.5]
+    assert client.retries["GET /repos/{owner}/{repo}"] == 2
+    assert client.statuses["GET /repos/{owner}/{repo}"] == {502: 1, 503: 1, 200: 1}
+
+
+def test_jitter_stays_under_the_cap(sleeps):
+    client, _ = make_client([httpx.Response(500)] * 8 + [httpx.Response(200)], max_retries=8)
+
+    run(client.get("/user"))
+
+    assert len(sleeps) == 8
+    for attempt, delay in enumerate(sleeps):
+        assert 0 <= delay <= min(http_client.MAX_BACKOFF_SECONDS, 0.5 * 2 ** attempt)
+
+
+def test_retry_after_is_honoured_and_capped(sleeps):
+    client, _ = make_client([
+        httpx.Response(429, headers={"Retry-After": "3"}),
+        httpx.Response(403, headers={"Retry-After": "120"}),
+        httpx.Response(200),
+    ])
+
+    assert run(client.get("/user")).status_code == 200
+    assert sleeps == [3.0, http_client.MAX_BACKOFF_SECONDS]
+
+
+def test_gives_up_after_max_retries(sleeps):
+    client, sent = make_client([httpx.Response(500)] * 3, max_retries=2)
+
+    assert run(client.get("/user")).status_code == 500
+    assert len(sent) == 3
+
+
+def test_client_errors_are_not_retried(sleeps):
+    client, sent = make_client([httpx.Response(404)])
+
+    assert run(client.get("/repos/o/missing")).status_code == 404
+    assert len(sent) == 1 and sleeps == []
+
+
+def test_post_is_sent_once_unless_retry_is_requested(sleeps):
+    client, sent = make_client([httpx.Response(502)])
+    assert run(client.post("https://github.test/login/oauth/access_token", json={"code": "c"})).status_code == 502
+    assert len(sent) == 1 and sleeps == []
+
+    client, sent = make_client([httpx.ConnectError("reset")])
+    with pytest.raises(httpx.ConnectError):
+        run(client.post("https://github.test/login/oauth/access_token", json={"code": "c"}))
+    assert len(sent) == 1
+
+    client, sent = make_client([httpx.Response(502), httpx.Response(201)])
+    assert run(client.post("/app/installations/1/access_tokens", retry=True)).status_code == 201
+    assert len(sent) == 2
+
+
+def test_transport_errors_on_get_are_retried(sleeps):
+    client, sent = make_client([httpx.ConnectError("reset"), httpx.Response(200)])
+
+    assert run(client.get("/user")).status_code == 200
+    assert len(sent) == 2
+    assert client.errors["GET /user"] == 1
+
+
+def rate_limited(remaining, reset_in):
+    return httpx.Response(200, headers={
+        "X-RateLimit-Limit": "5000",
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(int(time.time() + reset_in)),
+        "X-RateLimit-Resource": "core",
+    })
+
+
+def test_low_budget_spreads_calls_until_reset(sleeps):
+    client, _ = make_client([rate_limited(4, 100), httpx.Response(200)], rate_limit_reserve=10)
+
+    run(client.get("/user", installation_id="7"))
+    assert sleeps == []
+    assert client.rate_limits["installation:7"]["remaining"] == 4
+
+    run(client.get("/user", installation_id="7"))
+    # 4 calls left for ~100s: one every ~25s, capped per call
+    assert sleeps == [http_client.MAX_THROTTLE_SECONDS]
+    assert client.rate_limits["installation:7"]["remaining"] == 3
+
+
+def test_budget_above_reserve_is_not_throttled(sleeps):
+    client, _ = make_client([rate_limited(500, 100), httpx.Response(200)], rate_limit_reserve=10)
+
+    run(client.get("/user", installation_id="7"))
+    run(client.get("/user", installation_id="7"))
+    assert sleeps == []
+
+
+def test_exhausted_budget_raises_when_reset_is_far(sleeps):
+    client, sent = make_client([rate_limited(0, 600)])
+
+    run(client.get("/user", installation_id="7"))
+    with pytest.raises(GitHubRateLimitError) as raised:
+        run(client.get("/user", installation_id="7"))
+    assert raised.value.rate_key == "installation:7"
+    assert len(sent) == 1
+
+
+def test_exhausted_budget_waits_for_a_near_reset(sleeps):
+    client, sent = make_client([rate_limited(0, 5), httpx.Response(200)])
+
+    run(client.get("/user", installation_id="7"))
+    run(client.get("/user", installation_id="7"))
+    assert len(sleeps) == 1 and 3 < sleeps[0] <= 5
+    assert len(sent) == 2
+
+
+def test_app_jwt_calls_use_the_app_budget(sleeps):
+    client, _ = make_client([rate_limited(0, 600), httpx.Response(201)])
+
+    run(client.post("/app/installations/7/access_tokens", installation_id="7",
+                    headers={"Authorization": APP_JWT}, retry=True))
+    assert list(client.rate_limits) == [GitHubHTTPClient.rate_key_for({"Authorization": APP_JWT}, "7")]
+    assert next(iter(client.rate_limits)).startswith("app:")
+
+    # the installation's own budget is untouched
+    run(client.get("/user", installation_id="7", headers={"Authorization": "token ghs_x"}))
+    assert sleeps == []
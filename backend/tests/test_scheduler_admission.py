@@ -0,0 +1,74 @@
+"""
+Admission control through /agent/run against fakeredis: a full queue is
+rejected with 429 and Retry-After, and the rejected job is marked FAILED.
+
+    cd backend && python -m pytest tests
+"""
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from models.agent_model import JobStatus
+from routes import agent_runner_routes
+from services import job as job_service
+from services.job_store import job_store
+from services.redis import redisservices
+from services.scheduler import JobScheduler
+
+MAX_QUEUED = 2
+RETRY_AFTER = 7
+
+
+@pytest.fixture
+def client(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redisservices, "redis", fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(redisservices, "raw", fakeredis.aioredis.FakeRedis(server=server))
+
+    async def resolve_repo(installation_id: str, repo_name: str) -> dict:
+        return {"name": "calc", "full_name": "owner/calc", "owner": "owner", "default_branch": "main"}
+
+    monkeypatch.setattr(job_service, "resolve_repo", resolve_repo)
+    # no slots at all: every job waits in the queue
+    monkeypatch.setattr(job_service, "job_scheduler",
+                        JobScheduler(max_running=0, max_queued=MAX_QUEUED, retry_after=RETRY_AFTER))
+
+    app = FastAPI()
+    app.include_router(agent_runner_routes.router)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def run_agent(client: TestClient):
+    return client.post("/agent/run", json={
+        "prompt": "fix the bug", "repo_name": "calc", "installation_id": 1, "branches": "main",
+    })
+
+
+def test_full_queue_is_rejected_with_retry_after(client):
+    for position in range(1, MAX_QUEUED + 1):
+        response = run_agent(client)
+        assert response.status_code == 200
+        assert response.json()["queue_position"] == position
+
+    response = run_agent(client)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(RETRY_AFTER)
+    assert job_service.job_scheduler.stats() == {"queued": MAX_QUEUED, "admitted": 0, "rejected": 1}
+
+
+def test_rejected_job_is_marked_failed(client):
+    queued = [run_agent(client).json()["job_id"] for _ in range(MAX_QUEUED)]
+    assert run_agent(client).status_code == 429
+
+    keys = client.portal.call(redisservices.redis.keys, "job:*:state")
+    rejected = {key.split(":")[1] for key in keys} - set(queued)
+    assert len(rejected) == 1
+    job_id = rejected.pop()
+    job_store.invalidate(job_id)
+    status = client.portal.call(job_store.get, job_id)
+    assert status.status == JobStatus.FAILED
+    assert status.error == "Too many jobs queued, try again later"
+    for job_id in queued:
+        assert client.portal.call(job_store.get, job_id).status == JobStatus.QUEUED
@@ -0,0 +1,222 @@
+"""
+Offline end-to-end benchmark for the job runner and backend.
+
+Runs without Gemini, Cloud Run, GitHub or Redis:
+  * agents answer from a scripted fake model (benchmarks/fake_model.py)
+  * the repository is cloned from a local bare repo
+  * Redis is an in-process fakeredis server shared by runner and backend
+
+Modes:
+  runner  - call run_agent_async directly
+  full    - POST /agent/run and follow /ws/status/{job_id} through the FastAPI
+            test client; the job dispatcher is replaced by an in-process one
+
+Usage:
+  python benchmarks/bench_e2e.py --mode full --runs 20 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "job_runner"), os.path.join(ROOT, "backend"), os.path.dirname(os.path.abspath(__file__))]
+
+os.environ.setdefault("REDIS_URL", "redis://fake")
+os.environ.setdefault("FOLLOW_UP_TIMEOUT", "0")
+os.environ.setdefault("GCP_PROJECT_ID", "offline")
+os.environ.setdefault("GCP_REGION", "offline")
+os.environ.setdefault("CLOUD_RUN_JOB", "offline")
+
+import fakeredis  # noqa: E402
+from fake_model import BUGGY_SOURCE, current_workspace, install_fake_models  # noqa: E402
+import main as job_runner  # noqa: E402
+from job_context import JobContext  # noqa: E402
+from job_runner_models import JobSpec  # noqa: E402
+from phase_timer import PhaseTimer  # noqa: E402
+
+PROMPT = "Fix this bug: add(2, 2) returns 0 in calc.py"
+BRANCH = "main"
+REPO = "bench/calc"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def make_bare_repo(base_dir: str) -> str:
+    """create a small repo with a bug and return a file:// URL to its bare clone"""
+    work = os.path.join(base_dir, "work")
+    bare = os.path.join(base_dir, "calc.git")
+    os.makedirs(os.path.join(work, "tests"))
+    with open(os.path.join(work, "calc.py"), "w") as f:
+        f.write(BUGGY_SOURCE)
+    with open(os.path.join(work, "tests", "test_calc.py"), "w") as f:
+        f.write("from calc import add\n\ndef test_add():\n    assert add(2, 2) == 4\n")
+    with open(os.path.join(work, "README.md"), "w") as f:
+        f.write("# calc\n")
+    git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@localhost", "-c", f"init.defaultBranch={BRANCH}"]
+    subprocess.run(git + ["init", "-q"], cwd=work, check=True)
+    subprocess.run(git + ["add", "-A"], cwd=work, check=True)
+    subprocess.run(git + ["commit", "-qm", "initial"], cwd=work, check=True)
+    subprocess.run(["git", "clone", "-q", "--bare", work, bare], check=True)
+    return f"file://{bare}"
+
+
+async def run_job_in_process(clone_url: str, job_id: str, timings: Dict[str, PhaseTimer]) -> None:
+    """what the Cloud Run job does: clone, run the agent, publish updates"""
+    spec = JobSpec(
+        job_id=job_id, prompt=PROMPT, repo=REPO, branch=BRANCH,
+        token="offline-token", clone_url=clone_url,
+    )
+    ctx = JobContext(spec, job_runner.redis_client)
+    timings[job_id] = ctx.timer
+    current_workspace.set(ctx.workspace)
+    if not await job_runner.run_job(ctx, follow_up_timeout=0):
+        raise RuntimeError(f"job {job_id} failed, see log")
+
+
+async def bench_runner(clone_url: str, runs: int, server: "fakeredis.FakeServer") -> List[Dict[str, float]]:
+    job_runner.redis_client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    results = []
+    for _ in range(runs):
+        timings: Dict[str, PhaseTimer] = {}
+        job_id = str(uuid.uuid4())
+        started = time.perf_counter()
+        await run_job_in_process(clone_url, job_id, timings)
+        totals = timings[job_id].totals()
+        totals["end_to_end"] = time.perf_counter() - started
+        results.append(totals)
+    return results
+
+
+def bench_full(clone_url: str, runs: int, server: "fakeredis.FakeServer") -> List[Dict[str, float]]:
+    from fastapi.testclient import TestClient
+    import server as backend_server
+    from services import job as job_service
+    from services.redis import redisservices
+    from services.dispatcher import JobDispatcher, set_dispatcher
+    from services.ws import manager as ws_manager
+
+    timings: Dict[str, PhaseTimer] = {}
+
+    async def connect_fake_redis():
+        redisservices.redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+        redisservices.raw = fakeredis.aioredis.FakeRedis(server=server)
+        job_runner.redis_client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+
+    async def offline_token(installation_id: str) -> str:
+        return "offline-token"
+
+    async def offline_repo(installation_id: str, repo_name: str) -> dict:
+        owner, name = REPO.split("/")
+        return {"name": name, "full_name": REPO, "owner": owner, "default_branch": BRANCH}
+
+    class InProcessDispatcher(JobDispatcher):
+        """stands in for Cloud Run: starts the job on the app's event loop"""
+        name = "in_process"
+
+        async def dispatch(self, spec: dict) -> None:
+            job_id = spec["job_id"]
+
+            async def start():
+                # wait until the WebSocket is registered so no update is missed
+                for _ in range(200):
+                    if ws_manager.get_job_connections(job_id):
+                        break
+                    await asyncio.sleep(0.01)
+                await run_job_in_process(clone_url, job_id, timings)
+
+            asyncio.get_running_loop().create_task(start())
+
+    redisservices.connect = connect_fake_redis
+    job_service.mint_installation_token = offline_token
+    job_service.resolve_repo = offline_repo
+    set_dispatcher(InProcessDispatcher())
+
+    results = []
+    with TestClient(backend_server.app) as client:
+        for _ in range(runs):
+            started = time.perf_counter()
+            response = client.post("/agent/run", json={
+                "prompt": PROMPT, "repo_name": REPO, "installation_id": 1, "branches": BRANCH,
+            })
+            response.raise_for_status()
+            dispatched = time.perf_counter() - started
+            job_id = response.json()["job_id"]
+
+            with client.websocket_connect(f"/ws/status/{job_id}") as ws:
+                while True:
+                    message = ws.receive_json()
+                    if message.get("type") != "status_update":
+                        continue
+                    content = message.get("content")
+                    status = json.loads(content) if isinstance(content, str) else message.get("data", {})
+                    if status.get("status") in ("completed", "failed"):
+                        break
+
+            totals = timings[job_id].totals()
+            totals["api:/agent/run"] = dispatched
+            totals["end_to_end"] = time.perf_counter() - started
+            results.append(totals)
+    return results
+
+
+def report(results: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    phases = sorted({phase for result in results for phase in result}, key=lambda p: (p == "end_to_end", p))
+    summary = {}
+    print(f"\n{'phase':<28}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for phase in phases:
+        values = [result.get(phase, 0.0) * 1000 for result in results]
+        summary[phase] = {
+            "mean_ms": sum(values) / len(values),
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+        }
+        stats = summary[phase]
+        print(f"{phase:<28}{stats['mean_ms']:>10.1f}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["runner", "full"], default="full")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake model latency per call (seconds)")
+    parser.add_argument("--json", help="write the summary to this file")
+    args = parser.parse_args()
+
+    install_fake_models(latency=args.latency)
+    server = fakeredis.FakeServer()
+    base_dir = tempfile.mkdtemp(prefix="bench-repo-")
+    try:
+        clone_url = make_bare_repo(base_dir)
+        if args.mode == "runner":
+            results = asyncio.run(bench_runner(clone_url, args.runs, server))
+        else:
+            results = bench_full(clone_url, args.runs, server)
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+    print(f"{args.mode} mode, {args.runs} run(s), fake model latency {args.latency * 1000:.0f} ms")
+    summary = report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"mode": args.mode, "runs": args.runs, "latency": args.latency, "phases": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Wire format benchmark: job event encode/decode throughput and size.
+
+Compares, per message kind, the previous format (status fields JSON-encoded
+into `content`, then the whole message JSON-encoded; the backend parsed it
+twice) with the envelope of core/wire.py (one orjson pass, zstd for large
+bodies). Each side covers the full path of one message:
+
+  encode  - what the runner does before PUBLISH
+  decode  - what the backend does on receipt: parse, get the status fields,
+            produce the text sent to browsers
+
+Usage:
+  python benchmarks/bench_wire.py --files 20 --file-kb 8
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from core import wire  # noqa: E402
+
+
+def sample_messages(files: int, file_kb: int) -> Dict[str, dict]:
+    now = datetime.now().isoformat()
+    rng = random.Random(1)
+    words = ["value", "total", "items", "result", "config", "index", "buffer", "path", "count", "name"]
+
+    def source() -> str:
+        lines = []
+        while sum(map(len, lines)) < file_kb * 1024:
+            a, b = rng.sample(words, 2)
+            lines.append(f"    {a}_{rng.randrange(1000)} = {b}.get('{rng.getrandbits(32):x}', {rng.randrange(10**6)})\n")
+        return "".join(lines)
+
+    status = {
+        "status": "running",
+        "current_step": "Running the coder agent",
+        "messages": [{"role": "agent", "content": f"step {i} done", "timestamp": now} for i in range(5)],
+    }
+    changes = []
+    for i in range(files):
+        original = source()
+        changes.append({
+            "file_path": f"src/module_{i}.py",
+            "original_content": original,
+            "modified_content": original.replace("value_", "amount_"),
+            "change_type": "modified",
+            "language": "python",
+        })
+    large = dict(status, status="completed", file_changes=changes)
+    return {
+        "agent_message": {"type": "agent_message", "content": "Looking at calc.py now.", "job_id": "bench", "timestamp": now},
+        "status_update": {"type": "status_update", "content": status, "job_id": "bench", "timestamp": now},
+        "file_changes": {"type": "status_update", "content": large, "job_id": "bench", "timestamp": now},
+    }
+
+
+def legacy_encode(message: dict) -> bytes:
+    content = message["content"]
+    return json.dumps(dict(message, content=content if isinstance(content, str) else json.dumps(content))).encode()
+
+
+def legacy_decode(payload: bytes) -> str:
+    raw = payload.decode()
+    data = json.loads(raw)
+    if data["type"] == "status_update":
+        json.loads(data["content"])
+    # the raw text went to browsers as-is
+    return raw
+
+
+def envelope_decode(payload: bytes) -> str:
+    event_id, envelope = wire.split_event(payload)
+    return wire.client_text(wire.decode(envelope), event_id)
+
+
+def rate(fn: Callable, arg, min_seconds: float) -> float:
+    """calls per second"""
+    calls, started = 0, time.perf_counter()
+    while True:
+        for _ in range(100):
+            fn(arg)
+        calls += 100
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return calls / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20, help="file changes in the large status update")
+    parser.add_argument("--file-kb", type=int, default=8, help="size of each file version (KiB)")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent per measurement")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    print(f"zstd: {'on' if wire.zstandard else 'not installed'}, threshold {wire.WIRE_COMPRESS_MIN_BYTES} bytes")
+    print(f"{'message':<15}{'format':<10}{'bytes':>10}{'encode/s':>12}{'decode/s':>12}{'enc MB/s':>10}{'dec MB/s':>10}")
+    results: List[Dict] = []
+    for kind, message in sample_messages(args.files, args.file_kb).items():
+        legacy = legacy_encode(message)
+        # published with a stream id prefix, as the Lua script does
+        envelope = b"1700000000000-0 " + wire.encode(message)
+        logical = len(legacy)
+        for name, encode, decode, payload in (
+            ("legacy", legacy_encode, legacy_decode, legacy),
+            ("envelope", wire.encode, envelope_decode, envelope),
+        ):
+            encode_rate = rate(encode, message, args.seconds)
+            decode_rate = rate(decode, payload, args.seconds)
+            result = {
+                "message": kind, "format": name, "bytes": len(payload),
+                "encode_per_s": encode_rate, "decode_per_s": decode_rate,
+                # throughput in terms of the uncompressed message
+                "encode_mb_s": encode_rate * logical / 1e6, "decode_mb_s": decode_rate * logical / 1e6,
+            }
+            results.append(result)
+            print(f"{kind:<15}{name:<10}{len(payload):>10}{encode_rate:>12.0f}{decode_rate:>12.0f}"
+                  f"{result['encode_mb_s']:>10.1f}{result['decode_mb_s']:>10.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
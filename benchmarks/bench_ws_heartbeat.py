@@ -0,0 +1,158 @@
+"""
+WebSocket heartbeat benchmark for JobConnectionManager.
+
+Registers N in-memory sockets (no network) and measures, over a window of
+several ping intervals, the process CPU time, the number of asyncio tasks and
+the pings delivered. Compares the timer-wheel manager with the previous
+design (one heartbeat task per socket plus a monitor that scans every
+connection under a lock).
+
+Intervals are scaled down (default: ping every 2s, 0.1s ticks) so a run
+covers several full rounds quickly.
+
+Usage:
+  python benchmarks/bench_ws_heartbeat.py --sockets 1000 5000 10000 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from services.ws import JobConnectionManager  # noqa: E402
+
+
+class FakeSocket:
+    """answers every ping with a pong, like the frontend"""
+    def __init__(self, manager, job_id: str):
+        self.manager = manager
+        self.job_id = job_id
+        self.received = 0
+        self.scope = {"subprotocols": []}
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, text: str):
+        self.received += 1
+        await self.manager.update_heartbeat(self, self.job_id)
+
+    async def send_json(self, data: dict):
+        await self.send_text(json.dumps(data))
+
+
+class TaskPerSocketManager:
+    """the previous design, reduced to its heartbeat behaviour"""
+    def __init__(self, heartbeat_interval: float, heartbeat_timeout: float, scan_interval: float):
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.scan_interval = scan_interval
+        self.last_heartbeat: Dict[tuple, float] = {}
+        self.heartbeat_task: Dict[tuple, asyncio.Task] = {}
+        self._lock = asyncio.Lock()
+        self.monitor_task = None
+        self.pings_sent = 0
+
+    async def connect(self, websocket, job_id):
+        await websocket.accept()
+        if self.monitor_task is None:
+            self.monitor_task = asyncio.create_task(self._monitor())
+        key = (job_id, websocket)
+        self.last_heartbeat[key] = asyncio.get_running_loop().time()
+        self.heartbeat_task[key] = asyncio.create_task(self._heartbeat(websocket, job_id))
+
+    async def _heartbeat(self, websocket, job_id):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await websocket.send_json({"type": "ping", "timestamp": datetime.now().isoformat()})
+            self.pings_sent += 1
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(self.scan_interval)
+            now = asyncio.get_running_loop().time()
+            async with self._lock:
+                dead = [key for key, beat in self.last_heartbeat.items() if now - beat > self.heartbeat_timeout]
+            for key in dead:
+                self.last_heartbeat.pop(key, None)
+
+    async def update_heartbeat(self, websocket, job_id):
+        key = (job_id, websocket)
+        if key in self.last_heartbeat:
+            self.last_heartbeat[key] = asyncio.get_running_loop().time()
+
+    async def shutdown(self):
+        for task in [*self.heartbeat_task.values(), self.monitor_task]:
+            if task:
+                task.cancel()
+
+
+async def run(kind: str, sockets: int, jobs: int, interval: float, tick: float, rounds: int) -> Dict[str, float]:
+    if kind == "wheel":
+        manager = JobConnectionManager(heartbeat_interval=interval, heartbeat_timeout=interval * 2, tick=tick)
+    else:
+        # the old monitor scanned a third of the ping interval (10s of 30s)
+        manager = TaskPerSocketManager(interval, interval * 2, interval / 3)
+
+    connect_started = time.perf_counter()
+    for index in range(sockets):
+        job_id = f"job-{index % jobs}"
+        await manager.connect(FakeSocket(manager, job_id), job_id)
+    connect_seconds = time.perf_counter() - connect_started
+
+    # settle, then measure a window that doesn't start on a ping boundary
+    await asyncio.sleep(interval * 1.5)
+    pings_before = manager.pings_sent
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    await asyncio.sleep(interval * rounds)
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+    pings = manager.pings_sent - pings_before
+    tasks = len(asyncio.all_tasks())
+    await manager.shutdown()
+    return {
+        "connect_ms": connect_seconds * 1000,
+        "cpu_pct": 100 * cpu / wall,
+        "cpu_us_per_ping": 1e6 * cpu / pings if pings else 0.0,
+        "pings": pings,
+        "expected_pings": sockets * rounds,
+        "tasks": tasks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sockets", type=int, nargs="+", default=[1000, 5000, 10000])
+    parser.add_argument("--jobs", type=int, default=100, help="jobs the sockets are spread over")
+    parser.add_argument("--interval", type=float, default=2.0, help="ping interval (seconds)")
+    parser.add_argument("--tick", type=float, default=0.1, help="timer wheel tick (seconds)")
+    parser.add_argument("--rounds", type=int, default=3, help="ping intervals measured")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    results: List[Dict] = []
+    print(f"{'manager':<10}{'sockets':>9}{'tasks':>8}{'cpu %':>8}{'us/ping':>9}{'pings':>9}{'expected':>10}{'connect ms':>12}")
+    for sockets in args.sockets:
+        for kind in ("task", "wheel"):
+            result = asyncio.run(run(kind, sockets, args.jobs, args.interval, args.tick, args.rounds))
+            result.update({"manager": kind, "sockets": sockets})
+            results.append(result)
+            print(f"{kind:<10}{sockets:>9}{result['tasks']:>8}{result['cpu_pct']:>8.1f}"
+                  f"{result['cpu_us_per_ping']:>9.1f}{result['pings']:>9}{result['expected_pings']:>10}"
+                  f"{result['connect_ms']:>12.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Scripted stand-in for Gemini used by the offline benchmarks.
+
+Each agent gets its own fake model name ("fake/<agent>") through the model
+tiering config, so the script can answer per agent: the root agent hands off
+to the bug fix workflow, fix_code edits a file in the workspace and the other
+sub-agents answer with canned text after a configurable latency.
+"""
+import asyncio
+import os
+from contextvars import ContextVar
+from typing import AsyncGenerator, Dict
+from google.adk.models import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from Raw_Gent.model_tiers import DEFAULT_MODEL_TIERS, register_model_backend, set_model_tiers
+
+AGENTS = ("Raw_Gent", "analyze_code", "fix_code", "test_code", "review_code")
+
+# Workspace of the job running in the current asyncio context
+current_workspace: ContextVar[str] = ContextVar("bench_workspace", default="")
+
+BUGGY_SOURCE = "def add(a, b):\n    return a - b\n"
+FIXED_SOURCE = "def add(a, b):\n    return a + b\n"
+
+CANNED_REPLIES: Dict[str, str] = {
+    "analyze_code": "ROOT CAUSE: add() subtracts instead of adding (calc.py line 2).",
+    "fix_code": "FIX: return a + b in calc.add.",
+    "test_code": "TEST RESULTS: 1 passed, 0 failed.",
+    "review_code": "REVIEW: fix is minimal and correct. Approved.",
+}
+
+
+def _text(text: str) -> LlmResponse:
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+class ScriptedLlm(BaseLlm):
+    """BaseLlm that replays a fixed script for one agent instead of calling a model"""
+    agent_name: str
+    latency: float = 0.0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.latency)
+
+        if self.agent_name == "Raw_Gent":
+            already_routed = any(
+                part.function_response
+                for content in llm_request.contents or []
+                for part in content.parts or []
+            )
+            if already_routed:
+                yield _text("Routed to bug_fix_workflow.")
+                return
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(
+                function_call=types.FunctionCall(
+                    name="transfer_to_agent", args={"agent_name": "bug_fix_workflow"}
+                )
+            )]))
+            return
+
+        if self.agent_name == "fix_code" and current_workspace.get():
+            with open(os.path.join(current_workspace.get(), "calc.py"), "w", encoding="utf-8") as f:
+                f.write(FIXED_SOURCE)
+
+        yield _text(CANNED_REPLIES.get(self.agent_name, "OK"))
+
+
+def install_fake_models(latency: float = 0.0) -> None:
+    """Point every agent at its scripted fake model"""
+    for agent in AGENTS:
+        register_model_backend(
+            f"fake/{agent}",
+            lambda model_name, agent=agent: ScriptedLlm(model=model_name, agent_name=agent, latency=latency),
+        )
+    config = dict(DEFAULT_MODEL_TIERS)
+    config["agents"] = {agent: {size: f"fake/{agent}" for size in ("small", "medium", "large")} for agent in AGENTS}
+    config["fallbacks"] = {}
+    set_model_tiers(config)
@@ -8,8 +8,32 @@ import {
 } from "../schemas/run_agent.schemas";
 import { useCallback, useEffect, useRef, useState } from "react";
 
+// large messages (file contents) arrive as raw deflate binary frames when the
+// server accepts this subprotocol; everything else stays text
+const COMPRESSION_SUBPROTOCOL = "job-events.deflate";
+// browsers that have DecompressionStream but not its "deflate-raw" format throw here
+const canInflate = (() => {
+  try {
+    new DecompressionStream("deflate-raw");
+    return true;
+  } catch {
+    return false;
+  }
+})();
+
+async function frameText(data: string | ArrayBuffer): Promise<string> {
+  if (typeof data === "string") return data;
+  const stream = new Blob([data]).stream().pipeThrough(new DecompressionStream("deflate-raw"));
+  return new Response(stream).text();
+}
+
 export function useWebsocket(job_id: string | null) {
   const wsRef = useRef<WebSocket | null>(null);
+  // newest event seen, so a reconnect only replays what was missed
+  const lastEventIdRef = useRef<string | null>(null);
+  const reconnectTimerRef = useRef<ReturnType<typeof setTimeout> | null>(null);
+  const closingRef = useRef(false);
+  const finishedRef = useRef(false);
   const [isConnected, setisConnected] = useState(false);
   const [messages, setMessages] = useState<AgentMessage[]>([]);
   const [jobStatus, setJobStatus] = useState<JobStatusResponse | null>(null);
@@ -18,7 +42,17 @@ export function useWebsocket(job_id: string | null) {
 
     const wsURL = import.meta.env.VITE_WS_URL;
 
-    const ws = new WebSocket(`${wsURL}/ws/status/${job_id}`);
+    const resume = lastEventIdRef.current
+      ? `?last_event_id=${encodeURIComponent(lastEventIdRef.current)}`
+      : "";
+    const ws = new WebSocket(
+      `${wsURL}/ws/status/${job_id}${resume}`,
+      canInflate ? [COMPRESSION_SUBPROTOCOL] : [],
+    );
+    ws.binaryType = "arraybuffer";
+    closingRef.current = false;
+    // inflating is async: handle frames one after another to keep their order
+    let pending: Promise<void> = Promise.resolve();
 
     wsRef.current = ws;
 
@@ -27,8 +61,8 @@ export function useWebsocket(job_id: string | null) {
       setisConnected(true);
     };
 
-    ws.onmessage = (event) => {
-      const raw = JSON.parse(event.data);
+    const handleMessage = (text: string) => {
+      const raw = JSON.parse(text);
       console.log(`"message recieved:"${raw}`);
       if (raw?.type === "ping") {
         ws.send(
@@ -50,6 +84,7 @@ export function useWebsocket(job_id: string | null) {
 
       // After safeParse — message is fully typed as WebScoketMessageResponse
       const message: WebScoketMessageResponse = result.data;
+      if (message.event_id) lastEventIdRef.current = message.event_id;
 
       switch (message.type) {
         case "status_update": {
@@ -58,6 +93,7 @@ export function useWebsocket(job_id: string | null) {
             JSON.parse(message.content),
           );
           if (statusResult.success) {
+            finishedRef.current = ["completed", "failed"].includes(statusResult.data.status);
             setJobStatus(statusResult.data);
             setMessages(statusResult.data.messages);
           }
@@ -84,6 +120,15 @@ export function useWebsocket(job_id: string | null) {
           break;
         }
 
+        case "queue_position": {
+          // content is a JSON string: { position, queued }
+          const { position } = JSON.parse(message.content);
+          setJobStatus((prev) =>
+            prev ? { ...prev, current_step: `Waiting in queue (position ${position})` } : prev,
+          );
+          break;
+        }
+
         case "error": {
           console.error("❌ Server error:", message.content);
           break;
@@ -91,18 +136,35 @@ export function useWebsocket(job_id: string | null) {
       }
     };
 
+    ws.onmessage = (event) => {
+      pending = pending
+        .then(() => frameText(event.data))
+        .then(handleMessage)
+        .catch((error) => console.warn("⚠️ Unreadable message:", error));
+    };
+
     ws.onerror = () => setisConnected(false);
 
     // ✅ ws.onclose not ws.close (bug in your version)
     ws.onclose = () => {
       setisConnected(false);
       wsRef.current = null;
+      // dropped (network, slow client, server restart): resume from the last event
+      if (!closingRef.current && !finishedRef.current) {
+        reconnectTimerRef.current = setTimeout(connect, 1000);
+      }
     };
   }, [job_id]);
 
   useEffect(() => {
+    lastEventIdRef.current = null;
+    finishedRef.current = false;
     connect();
-    return () => wsRef.current?.close();
+    return () => {
+      closingRef.current = true;
+      if (reconnectTimerRef.current) clearTimeout(reconnectTimerRef.current);
+      wsRef.current?.close();
+    };
   }, [connect]);
 
   const onSendMessage = useCallback(
@@ -122,6 +184,8 @@ export function useWebsocket(job_id: string | null) {
   );
 
   const disconnect = useCallback(() => {
+    closingRef.current = true;
+    if (reconnectTimerRef.current) clearTimeout(reconnectTimerRef.current);
     wsRef.current?.close();
     wsRef.current = null;
   }, []);
@@ -25,6 +25,7 @@ export const WebSocketMessageTypeSchema = z.enum([
     'user_message',
     'agent_message',
     'status_update',
+    'queue_position',
     'error',
 ])
 export type WebSocketMessageType = z.infer<typeof WebSocketMessageTypeSchema>;
@@ -39,7 +40,8 @@ export type RunAgentRequest = z.infer<typeof RunAgentRequestSchema>;
 
 export const RunAgentResponseSchema = z.object({
     job_id:z.string(),
-    status:z.enum(["queued"])
+    status:z.enum(["queued"]),
+    queue_position:z.number().nullable().optional()
 });
 export type RunAgentResponse = z.infer<typeof RunAgentResponseSchema>;
 
@@ -76,7 +78,9 @@ export const WebScoketMessageResponseSchema = z.object({
     type : WebSocketMessageTypeSchema,
     content:z.string(),
     job_id:z.string().optional(),
-    timestamp:z.string()
+    timestamp:z.string(),
+    // stream id of the event, sent back as last_event_id when reconnecting
+    event_id:z.string().optional()
 })
 export type WebScoketMessageResponse = z.infer<typeof WebScoketMessageResponseSchema>;
 
@@ -0,0 +1,333 @@
+"""
+Import dependency graph of the cloned repository.
+
+Built once after clone (python imports via `ast`, best-effort regex parsing of
+JS/TS imports) and updated incrementally when the agent writes files. Used to
+select only the tests that can reach a changed file.
+"""
+import ast
+import logging
+import os
+import re
+import subprocess
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from Raw_Gent.test_runner import is_js_test_file, is_python_test_file
+
+PYTHON_EXTENSIONS = (".py",)
+JS_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+
+# Changes to these files can affect any test, so they force the full suite
+FULL_SUITE_TRIGGERS = {
+    "conftest.py", "pytest.ini", "tox.ini", "setup.cfg", "setup.py", "pyproject.toml",
+    "requirements.txt", "package.json", "package-lock.json", "yarn.lock", "tsconfig.json",
+    "jest.config.js", "jest.config.ts", "vitest.config.ts", "vite.config.ts", "babel.config.js",
+}
+
+_SKIP_DIRS = {".git", "node_modules", ".venv", "venv", "__pycache__", ".tox", "build", "dist", "site-packages"}
+
+_JS_IMPORT_PATTERN = re.compile(
+    r"""(?:import\s+(?:[\w*{}\s,]+\s+from\s+)?|export\s+[\w*{}\s,]+\s+from\s+|require\s*\(\s*|import\s*\(\s*)['"]([^'"]+)['"]"""
+)
+
+
+def is_test_file(relative_path: str) -> bool:
+    return is_python_test_file(relative_path) or is_js_test_file(relative_path)
+
+
+class DependencyGraph:
+    """
+    File level import graph.
+    `imports[a]` holds the repo files that `a` imports and `importers[b]` the
+    files that import `b`, so impacted tests are found by walking `importers`.
+    """
+    def __init__(self, repo_path: str):
+        self.repo_path = os.path.abspath(repo_path)
+        self.imports: Dict[str, Set[str]] = {}
+        self.importers: Dict[str, Set[str]] = {}
+        self.mtimes: Dict[str, float] = {}
+        # dotted module name (and every dotted suffix of it) -> python files
+        self.modules: Dict[str, Set[str]] = {}
+        # directories holding a package.json, used to resolve "@/" aliases
+        self.js_roots: Set[str] = set()
+        self.changed_files: Set[str] = set()
+        self.built_at: Optional[float] = None
+
+    # ---------- build ----------
+
+    def build(self) -> "DependencyGraph":
+        """parse every source file in the repository"""
+        started = time.monotonic()
+        files = []
+        for root, dirs, names in os.walk(self.repo_path):
+            dirs[:] = [d for d in dirs if d not in _SKIP_DIRS]
+            for name in names:
+                relative_path = os.path.relpath(os.path.join(root, name), self.repo_path)
+                if name == "package.json":
+                    self.js_roots.add(os.path.dirname(relative_path))
+                if name.endswith(PYTHON_EXTENSIONS + JS_EXTENSIONS):
+                    files.append(relative_path)
+
+        for relative_path in files:
+            if relative_path.endswith(PYTHON_EXTENSIONS):
+                self._index_module(relative_path)
+        for relative_path in files:
+            self._parse(relative_path)
+
+        self.built_at = time.time()
+        logging.info(
+            f"🕸️ Dependency graph built: {len(self.imports)} files, "
+            f"{sum(len(deps) for deps in self.imports.values())} edges in {time.monotonic() - started:.2f}s"
+        )
+        return self
+
+    def _index_module(self, relative_path: str) -> None:
+        parts = relative_path[:-3].split(os.sep)
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        for start in range(len(parts)):
+            self.modules.setdefault(".".join(parts[start:]), set()).add(relative_path)
+
+    def _unindex_module(self, relative_path: str) -> None:
+        for files in self.modules.values():
+            files.discard(relative_path)
+
+    # ---------- parsing ----------
+
+    def _read(self, relative_path: str) -> Optional[str]:
+        full_path = os.path.join(self.repo_path, relative_path)
+        try:
+            self.mtimes[relative_path] = os.path.getmtime(full_path)
+            with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _parse(self, relative_path: str) -> None:
+        source = self._read(relative_path)
+        if source is None:
+            self._set_imports(relative_path, set())
+            return
+        if relative_path.endswith(PYTHON_EXTENSIONS):
+            deps = self._python_imports(relative_path, source)
+        else:
+            deps = self._js_imports(relative_path, source)
+        deps.discard(relative_path)
+        self._set_imports(relative_path, deps)
+
+    def _set_imports(self, relative_path: str, deps: Set[str]) -> None:
+        for old in self.imports.get(relative_path, set()) - deps:
+            self.importers.get(old, set()).discard(relative_path)
+        for new in deps:
+            self.importers.setdefault(new, set()).add(relative_path)
+        self.imports[relative_path] = deps
+
+    def _resolve_module(self, name: str) -> Set[str]:
+        return set(self.modules.get(name, ()))
+
+    def _python_imports(self, relative_path: str, source: str) -> Set[str]:
+        try:
+            tree = ast.parse(source, filename=relative_path)
+        except (SyntaxError, ValueError):
+            return set()
+
+        package = relative_path[:-3].split(os.sep)[:-1]
+        deps: Set[str] = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    deps |= self._resolve_module(alias.name)
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    # relative import: anchor on the importing file's package
+                    base = package[:len(package) - (node.level - 1)] if node.level > 1 else package
+                    prefix = ".".join(base + ([node.module] if node.module else []))
+                else:
+                    prefix = node.module or ""
+                resolved = self._resolve_module(prefix) if prefix else set()
+                for alias in node.names:
+                    # `from pkg import mod` may name a submodule rather than an attribute
+                    name = f"{prefix}.{alias.name}" if prefix else alias.name
+                    resolved |= self._resolve_module(name)
+                deps |= resolved
+        return deps
+
+    def _js_imports(self, relative_path: str, source: str) -> Set[str]:
+        deps: Set[str] = set()
+        directory = os.path.dirname(relative_path)
+        for specifier in _JS_IMPORT_PATTERN.findall(source):
+            if specifier.startswith("."):
+                candidates = [os.path.normpath(os.path.join(directory, specifier))]
+            elif specifier.startswith("@/"):
+                candidates = [os.path.normpath(os.path.join(root, "src", specifier[2:])) for root in self.js_roots]
+            else:
+                # bare package import, not part of the repository
+                continue
+            for candidate in candidates:
+                resolved = self._resolve_js_path(candidate)
+                if resolved:
+                    deps.add(resolved)
+                    break
+        return deps
+
+    def _resolve_js_path(self, candidate: str) -> Optional[str]:
+        options = [candidate]
+        options += [candidate + ext for ext in JS_EXTENSIONS]
+        options += [os.path.join(candidate, "index" + ext) for ext in JS_EXTENSIONS]
+        for option in options:
+            if os.path.isfile(os.path.join(self.repo_path, option)):
+                return option
+        return None
+
+    # ---------- incremental updates ----------
+
+    def update_file(self, relative_path: str) -> None:
+        """re-parse one file after it was written or deleted"""
+        relative_path = os.path.normpath(relative_path)
+        full_path = os.path.join(self.repo_path, relative_path)
+        self.changed_files.add(relative_path)
+        if os.path.basename(relative_path) == "package.json":
+            self.js_roots.add(os.path.dirname(relative_path))
+        if not relative_path.endswith(PYTHON_EXTENSIONS + JS_EXTENSIONS):
+            return
+
+        if not os.path.exists(full_path):
+            self._set_imports(relative_path, set())
+            self.imports.pop(relative_path, None)
+            self.mtimes.pop(relative_path, None)
+            if relative_path.endswith(PYTHON_EXTENSIONS):
+                self._unindex_module(relative_path)
+            return
+
+        is_new = relative_path not in self.imports
+        if is_new and relative_path.endswith(PYTHON_EXTENSIONS):
+            self._index_module(relative_path)
+        self._parse(relative_path)
+
+    def refresh_stale(self, relative_paths: Iterable[str]) -> None:
+        """re-parse files whose mtime moved since they were last parsed"""
+        for relative_path in relative_paths:
+            full_path = os.path.join(self.repo_path, relative_path)
+            try:
+                mtime = os.path.getmtime(full_path)
+            except OSError:
+                mtime = None
+            if mtime is None or self.mtimes.get(relative_path) != mtime:
+                self.update_file(relative_path)
+
+    # ---------- queries ----------
+
+    def dependents(self, relative_paths: Iterable[str]) -> Set[str]:
+        """every file that transitively imports any of `relative_paths` (inclusive)"""
+        seen: Set[str] = set()
+        queue = deque(os.path.normpath(path) for path in relative_paths)
+        while queue:
+            current = queue.popleft()
+            if current in seen:
+                continue
+            seen.add(current)
+            queue.extend(self.importers.get(current, ()))
+        return seen
+
+    def impacted_tests(self, changed_files: Iterable[str]) -> List[str]:
+        """test files that can reach a changed file through imports"""
+        return sorted(path for path in self.dependents(changed_files) if is_test_file(path))
+
+    def select_tests(self, changed_files: Optional[Iterable[str]] = None) -> Optional[List[str]]:
+        """
+        Pick the tests to run for a set of changed files.
+
+        Args:
+            changed_files (Iterable[str], optional): Defaults to files written
+                since clone plus the files git reports as changed.
+
+        Returns:
+            list | None: Test files to run, or None when the full suite should run.
+        """
+        if changed_files is None:
+            changed_files = self.changed_files | set(git_changed_files(self.repo_path))
+        changed = {os.path.normpath(path) for path in changed_files}
+        if not changed:
+            return None
+        if any(os.path.basename(path) in FULL_SUITE_TRIGGERS for path in changed):
+            return None
+        self.refresh_stale(changed)
+        return self.impacted_tests(changed)
+
+
+def git_changed_files(repo_path: str) -> List[str]:
+    """Files modified, added, deleted or untracked in the working tree"""
+    try:
+        # -z: NUL separated and never quoted, so spaces and non-ASCII names come through as-is
+        result = subprocess.run(
+            ["git", "status", "--porcelain", "-z", "--untracked-files=all"],
+            cwd=repo_path, capture_output=True, text=True, encoding="utf-8", errors="surrogateescape", timeout=30,
+        )
+    except Exception as e:
+        logging.warning(f"⚠️ git status failed: {e}")
+        return []
+    files = []
+    entries = iter(result.stdout.split("\0"))
+    for entry in entries:
+        if len(entry) < 4:
+            continue
+        files.append(entry[3:])
+        # renames and copies are followed by their source path
+        if entry[0] in "RC":
+            next(entries, None)
+    return files
+
+
+# One graph per workspace (keyed by absolute repo path)
+_graphs: Dict[str, DependencyGraph] = {}
+
+
+def build_dependency_graph(repo_path: str) -> DependencyGraph:
+    """Build and register the dependency graph for a workspace"""
+    graph = DependencyGraph(repo_path).build()
+    _graphs[graph.repo_path] = graph
+    return graph
+
+
+def get_dependency_graph(repo_path: str) -> Optional[DependencyGraph]:
+    """Return the workspace's graph, or None if it has not been built yet"""
+    return _graphs.get(os.path.abspath(repo_path))
+
+
+def discard_dependency_graph(repo_path: str) -> None:
+    _graphs.pop(os.path.abspath(repo_path), None)
+
+
+def notify_file_written(repo_path: str, relative_path: str) -> None:
+    """Write hook: update the workspace's graph for a written file"""
+    graph = get_dependency_graph(repo_path)
+    if graph:
+        try:
+            graph.update_file(relative_path)
+        except Exception as e:
+            logging.warning(f"⚠️ Failed to update dependency graph for {relative_path}: {e}")
+
+
+def record_changed_files(repo_path: str, relative_paths: Iterable[str]) -> None:
+    """Feed a changed-file list (e.g. from collect_file_changes) into the graph"""
+    graph = get_dependency_graph(repo_path)
+    if graph:
+        graph.refresh_stale(relative_paths)
+        graph.changed_files.update(os.path.normpath(path) for path in relative_paths)
+
+
+def select_tests_for_workspace(repo_path: str) -> Tuple[Optional[List[str]], str]:
+    """
+    Tests impacted by the workspace's changes.
+
+    Returns:
+        tuple: (test files or None for the full suite, short reason)
+    """
+    graph = get_dependency_graph(repo_path)
+    if not graph:
+        return None, "dependency graph not built yet"
+    selected = graph.select_tests()
+    if selected is None:
+        return None, "no changes tracked or a global config file changed"
+    return selected, f"{len(selected)} test file(s) reach the changed files"
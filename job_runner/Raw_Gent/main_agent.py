@@ -1,5 +1,6 @@
 from google.adk.agents import LlmAgent
 from Raw_Gent import prompt
+from Raw_Gent.model_tiers import tiered_model
 from Raw_Gent.tools import read_file_from_repo, write_file_to_repo, list_files_in_repo
 from .sub_agents.bug_fix_workflow import bug_fix_workflow_agent
 from .sub_agents.code_improver_workflow import code_improver_workflow_agent
@@ -8,7 +9,7 @@ from .sub_agents.test_workflow import test_workflow_agent
 
 root_agent = LlmAgent(
     name="Raw_Gent",
-    model="gemini-3.1-flash-lite-preview",
+    model=tiered_model("Raw_Gent"),
     description=" you are the primary agent . Route user requests to appropriate specialist agents ",
     instruction=prompt.ROOT_AGENT,
     sub_agents=[
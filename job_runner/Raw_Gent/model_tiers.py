@@ -0,0 +1,306 @@
+"""
+Model tiering for Raw_Gent agents.
+
+Every agent asks for a model through `tiered_model(agent_name)` instead of
+hardcoding a model string. The returned `TieredLlm` picks the model for the
+current task size from a declarative config and switches to the configured
+fallback while the primary model is unhealthy (p95 latency or error rate over
+threshold).
+
+The config can be overridden with a JSON file (MODEL_TIERS_CONFIG) or an inline
+JSON string (MODEL_TIERS_JSON). Both are merged over DEFAULT_MODEL_TIERS.
+"""
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Callable, Deque, Dict, Optional, Tuple
+from google.adk.models import BaseLlm, LLMRegistry
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import PrivateAttr
+
+FLASH_LITE = "gemini-3.1-flash-lite-preview"
+FLASH = "gemini-2.5-flash"
+PRO = "gemini-2.5-pro"
+
+TASK_SIZES = ("small", "medium", "large")
+
+DEFAULT_MODEL_TIERS: Dict[str, Any] = {
+    # model used for any agent / size that is not listed below
+    "default_model": FLASH_LITE,
+    "agents": {
+        # routing and review are cheap, fix generation gets the strong model
+        "Raw_Gent": {"small": FLASH_LITE, "medium": FLASH_LITE, "large": FLASH_LITE},
+        "analyze_code": {"small": FLASH_LITE, "medium": FLASH, "large": FLASH},
+        "fix_code": {"small": FLASH, "medium": PRO, "large": PRO},
+        "test_code": {"small": FLASH_LITE, "medium": FLASH_LITE, "large": FLASH},
+        "review_code": {"small": FLASH_LITE, "medium": FLASH_LITE, "large": FLASH_LITE},
+    },
+    # model -> model to use while it is unhealthy
+    "fallbacks": {
+        PRO: FLASH,
+        FLASH: FLASH_LITE,
+        FLASH_LITE: FLASH,
+    },
+    "health": {
+        "window": 50,               # number of recent calls kept per model
+        "min_samples": 10,          # calls needed before health is judged
+        "p95_latency_seconds": 45.0,
+        "max_error_rate": 0.3,
+        "cooldown_seconds": 120.0,  # how long a tripped model stays on fallback
+    },
+    # prompt length (chars) / repo file count that separate the task sizes
+    "task_size": {
+        "small_max_prompt_chars": 500,
+        "small_max_files": 200,
+        "large_min_prompt_chars": 4000,
+        "large_min_files": 2000,
+    },
+}
+
+# Task size of the job running in the current asyncio context
+current_task_size: ContextVar[str] = ContextVar("raw_gent_task_size", default="medium")
+
+# Stub / custom backends keyed by model name (checked before the ADK registry)
+_BACKEND_FACTORIES: Dict[str, Callable[[str], BaseLlm]] = {}
+
+# Rolling health per model name, shared by every agent that uses the model
+_HEALTH: Dict[str, "ModelHealth"] = {}
+
+_config: Optional[Dict[str, Any]] = None
+
+
+def load_model_tiers() -> Dict[str, Any]:
+    """
+    Load the tiering config, merging env overrides over the defaults.
+
+    Returns:
+        dict: The effective config.
+    """
+    config = json.loads(json.dumps(DEFAULT_MODEL_TIERS))
+    override: Dict[str, Any] = {}
+
+    config_path = os.getenv("MODEL_TIERS_CONFIG")
+    if config_path:
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                override = json.load(f)
+        except Exception as e:
+            logging.error(f"❌ Failed to load model tiers from {config_path}: {e}")
+    elif os.getenv("MODEL_TIERS_JSON"):
+        try:
+            override = json.loads(os.environ["MODEL_TIERS_JSON"])
+        except json.JSONDecodeError as e:
+            logging.error(f"❌ Invalid MODEL_TIERS_JSON: {e}")
+
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            for sub_key, sub_value in value.items():
+                if isinstance(sub_value, dict) and isinstance(config[key].get(sub_key), dict):
+                    config[key][sub_key].update(sub_value)
+                else:
+                    config[key][sub_key] = sub_value
+        else:
+            config[key] = value
+    return config
+
+
+def get_model_tiers() -> Dict[str, Any]:
+    """Return the cached tiering config"""
+    global _config
+    if _config is None:
+        _config = load_model_tiers()
+    return _config
+
+
+def set_model_tiers(config: Optional[Dict[str, Any]]) -> None:
+    """Replace the tiering config (None reloads from env) and reset health"""
+    global _config
+    _config = config
+    _HEALTH.clear()
+
+
+def classify_task_size(prompt: str, file_count: int = 0) -> str:
+    """
+    Classify a job as small, medium or large.
+
+    Args:
+        prompt (str): The user prompt including conversation history.
+        file_count (int): Number of files in the cloned repository.
+
+    Returns:
+        str: One of TASK_SIZES.
+    """
+    limits = get_model_tiers()["task_size"]
+    if len(prompt) >= limits["large_min_prompt_chars"] or file_count >= limits["large_min_files"]:
+        return "large"
+    if len(prompt) <= limits["small_max_prompt_chars"] and file_count <= limits["small_max_files"]:
+        return "small"
+    return "medium"
+
+
+def set_task_size(task_size: str) -> None:
+    """Set the task size for agents running in the current asyncio context"""
+    if task_size not in TASK_SIZES:
+        raise ValueError(f"Unknown task size '{task_size}', expected one of {TASK_SIZES}")
+    current_task_size.set(task_size)
+
+
+def register_model_backend(model_name: str, factory: Callable[[str], BaseLlm]) -> None:
+    """
+    Register a backend for a model name, e.g. a stub model in tests.
+
+    Args:
+        model_name (str): Model name used in the tiering config.
+        factory (Callable): Called with the model name, returns a BaseLlm.
+    """
+    _BACKEND_FACTORIES[model_name] = factory
+
+
+def unregister_model_backend(model_name: str) -> None:
+    """Remove a backend registered with register_model_backend"""
+    _BACKEND_FACTORIES.pop(model_name, None)
+
+
+def resolve_backend(model_name: str) -> BaseLlm:
+    """Build the BaseLlm for a model name"""
+    factory = _BACKEND_FACTORIES.get(model_name)
+    if factory:
+        return factory(model_name)
+    return LLMRegistry.new_llm(model_name)
+
+
+class ModelHealth:
+    """
+    Rolling latency / error window for one model.
+    The model trips to its fallback when p95 latency or error rate crosses the
+    configured threshold, and stays tripped for the cooldown.
+    """
+    def __init__(self, window: int, min_samples: int, p95_latency_seconds: float,
+                 max_error_rate: float, cooldown_seconds: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.samples: Deque[Tuple[float, bool]] = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.p95_latency_seconds = p95_latency_seconds
+        self.max_error_rate = max_error_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.tripped_until = 0.0
+        self._clock = clock
+
+    def record(self, latency: float, ok: bool) -> None:
+        """record one model call"""
+        self.samples.append((latency, ok))
+
+    def p95_latency(self) -> float:
+        if not self.samples:
+            return 0.0
+        latencies = sorted(latency for latency, _ in self.samples)
+        index = min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def is_degraded(self) -> bool:
+        """check thresholds, tripping the model if they are crossed"""
+        now = self._clock()
+        if now < self.tripped_until:
+            return True
+        if len(self.samples) < self.min_samples:
+            return False
+        if self.p95_latency() > self.p95_latency_seconds or self.error_rate() > self.max_error_rate:
+            self.tripped_until = now + self.cooldown_seconds
+            logging.warning(
+                f"⚠️ Model degraded (p95={self.p95_latency():.1f}s, "
+                f"errors={self.error_rate():.0%}), using fallback for {self.cooldown_seconds}s"
+            )
+            # start the next window fresh once the cooldown ends
+            self.samples.clear()
+            return True
+        return False
+
+
+def get_model_health(model_name: str) -> ModelHealth:
+    """Return (creating if needed) the health tracker for a model"""
+    health = _HEALTH.get(model_name)
+    if health is None:
+        health = ModelHealth(**get_model_tiers()["health"])
+        _HEALTH[model_name] = health
+    return health
+
+
+class TieredLlm(BaseLlm):
+    """
+    BaseLlm that delegates to the model configured for an agent and the current
+    task size, falling back to the configured fallback model when the primary is
+    degraded or fails before producing any output.
+    """
+    agent_name: str
+
+    _backends: Dict[str, BaseLlm] = PrivateAttr(default_factory=dict)
+
+    def select_model(self, task_size: Optional[str] = None) -> str:
+        """Return the configured (primary) model for the agent and task size"""
+        config = get_model_tiers()
+        task_size = task_size or current_task_size.get()
+        tiers = config["agents"].get(self.agent_name, {})
+        return tiers.get(task_size) or tiers.get("medium") or config["default_model"]
+
+    def fallback_for(self, model_name: str) -> Optional[str]:
+        fallback = get_model_tiers()["fallbacks"].get(model_name)
+        return fallback if fallback and fallback != model_name else None
+
+    def _backend(self, model_name: str) -> BaseLlm:
+        if model_name not in self._backends:
+            self._backends[model_name] = resolve_backend(model_name)
+        return self._backends[model_name]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        primary = self.select_model()
+        fallback = self.fallback_for(primary)
+        model_name = primary
+        if fallback and get_model_health(primary).is_degraded():
+            model_name = fallback
+
+        while True:
+            health = get_model_health(model_name)
+            llm_request.model = model_name
+            started = time.monotonic()
+            produced = False
+            errored = False
+            try:
+                async for response in self._backend(model_name).generate_content_async(
+                    llm_request, stream=stream
+                ):
+                    produced = True
+                    errored = errored or bool(response.error_code)
+                    yield response
+            except Exception as e:
+                health.record(time.monotonic() - started, ok=False)
+                if produced or model_name != primary or not fallback:
+                    raise
+                logging.warning(f"⚠️ {self.agent_name}: {model_name} failed ({e}), retrying on {fallback}")
+                model_name = fallback
+                continue
+            health.record(time.monotonic() - started, ok=not errored)
+            return
+
+
+def tiered_model(agent_name: str) -> TieredLlm:
+    """
+    Model for an agent, resolved per call from the tiering config.
+
+    Args:
+        agent_name (str): The agent's name as used in the config.
+
+    Returns:
+        TieredLlm: A BaseLlm to pass as the agent's `model`.
+    """
+    return TieredLlm(model=f"tiered/{agent_name}", agent_name=agent_name)
@@ -0,0 +1,181 @@
+"""
+Speculative context prefetch.
+
+While the root agent is still routing, the files the user is most likely
+talking about are already known from the prompt: explicit paths, stack-trace
+frames and identifiers. This module resolves those mentions against the
+workspace and loads the files into the read cache so the first sub-agent's
+reads are served from memory.
+"""
+import asyncio
+import logging
+import os
+import re
+import subprocess
+import time
+from typing import Iterable, List, Set, Tuple
+from Raw_Gent.workspace_cache import get_read_cache
+
+PREFETCH_MAX_FILES = int(os.getenv("PREFETCH_MAX_FILES", "40"))
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "8"))
+
+_SOURCE_EXTENSIONS = (
+    "py", "js", "jsx", "ts", "tsx", "mjs", "cjs", "java", "kt", "go", "rs", "rb", "php",
+    "c", "h", "cpp", "hpp", "cs", "swift", "scala", "json", "yml", "yaml", "toml", "md", "html", "css",
+)
+_PATH_PATTERN = re.compile(r"(?<![\w/.-])((?:[\w.-]+/)*[\w.-]+\.(?:%s))\b" % "|".join(_SOURCE_EXTENSIONS))
+_PY_FRAME_PATTERN = re.compile(r'File "([^"]+)", line \d+(?:, in (\w+))?')
+_JS_FRAME_PATTERN = re.compile(r"at (?:([\w.$<>]+) )?\(?((?:[A-Za-z]:)?[^\s():]+):\d+:\d+\)?")
+_BACKTICK_PATTERN = re.compile(r"`([A-Za-z_][\w.]*)(?:\(\))?`")
+_CALL_PATTERN = re.compile(r"\b([A-Za-z_]\w{2,})\(\)")
+_IDENTIFIER_PATTERN = re.compile(r"\b([a-z]+(?:_[a-z0-9]+)+|[a-z]+(?:[A-Z][a-z0-9]*)+|[A-Z][a-z0-9]+(?:[A-Z][a-z0-9]+)+)\b")
+
+# Frames in these locations are never part of the user's repository
+_LIBRARY_MARKERS = ("site-packages", "dist-packages", "node_modules", "/lib/python", "<frozen", "internal/")
+
+
+def extract_mentions(texts: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """
+    Pull file paths and symbol names out of free text and stack traces.
+
+    Args:
+        texts (Iterable[str]): Prompt and conversation history messages.
+
+    Returns:
+        tuple: (paths, symbols), most specific first, without duplicates.
+    """
+    paths: List[str] = []
+    symbols: List[str] = []
+
+    def add(items: List[str], value: str):
+        if value and value not in items:
+            items.append(value)
+
+    for text in texts:
+        if not text:
+            continue
+        for path, function in _PY_FRAME_PATTERN.findall(text):
+            if not any(marker in path for marker in _LIBRARY_MARKERS):
+                add(paths, path)
+                if function and function != "<module>":
+                    add(symbols, function)
+        for function, path in _JS_FRAME_PATTERN.findall(text):
+            if not any(marker in path for marker in _LIBRARY_MARKERS):
+                add(paths, path)
+                if function:
+                    add(symbols, function.split(".")[-1])
+        for path in _PATH_PATTERN.findall(text):
+            add(paths, path)
+        for symbol in _BACKTICK_PATTERN.findall(text):
+            if "." in symbol and symbol.rsplit(".", 1)[-1] in _SOURCE_EXTENSIONS:
+                continue
+            add(symbols, symbol.split(".")[-1])
+        for symbol in _CALL_PATTERN.findall(text) + _IDENTIFIER_PATTERN.findall(text):
+            add(symbols, symbol)
+    return paths, symbols
+
+
+def _tracked_files(repo_path: str) -> List[str]:
+    result = subprocess.run(
+        ["git", "ls-files"], cwd=repo_path, capture_output=True, text=True, timeout=30
+    )
+    return [line for line in result.stdout.split("\n") if line]
+
+
+def resolve_paths(mentions: List[str], tracked_files: List[str]) -> List[str]:
+    """
+    Map mentioned paths to files in the repository. Absolute paths from stack
+    traces (e.g. /app/src/x.py) match by their longest repository suffix; bare
+    file names match every file with that name.
+    """
+    tracked = set(tracked_files)
+    by_name = {}
+    for path in tracked_files:
+        by_name.setdefault(os.path.basename(path), []).append(path)
+
+    resolved: List[str] = []
+    for mention in mentions:
+        parts = [part for part in mention.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+        match = None
+        for start in range(len(parts)):
+            candidate = "/".join(parts[start:])
+            if candidate in tracked:
+                match = [candidate]
+                break
+        if match is None and parts:
+            match = by_name.get(parts[-1], [])
+        for path in match:
+            if path not in resolved:
+                resolved.append(path)
+    return resolved
+
+
+def find_symbol_files(repo_path: str, symbols: List[str], limit: int) -> List[str]:
+    """files that define or mention the symbols, definitions first"""
+    if not symbols or limit <= 0:
+        return []
+    symbols = symbols[:20]
+    definition = r"(def|class|function|const|let|var|type|interface|func|fn)\s+(%s)\b" % "|".join(map(re.escape, symbols))
+    files: List[str] = []
+    for args in (["-E", "-e", definition], ["-w", "-F", *sum((["-e", s] for s in symbols), [])]):
+        try:
+            result = subprocess.run(
+                ["git", "grep", "-l", "-I", *args], cwd=repo_path, capture_output=True, text=True, timeout=15
+            )
+        except Exception as e:
+            logging.debug(f"git grep failed: {e}")
+            continue
+        for path in result.stdout.split("\n"):
+            if path and path not in files:
+                files.append(path)
+            if len(files) >= limit:
+                return files
+    return files
+
+
+async def prefetch_workspace(repo_path: str, prompt: str, conversation_history: List[dict],
+                             max_files: int = PREFETCH_MAX_FILES) -> List[str]:
+    """
+    Warm the workspace read cache with the files the request is likely about.
+
+    Args:
+        repo_path (str): Path to the cloned repository.
+        prompt (str): Current user request.
+        conversation_history (list): Previous messages (may contain tracebacks).
+        max_files (int): Upper bound on files loaded.
+
+    Returns:
+        list: Relative paths that were loaded into the cache.
+    """
+    started = time.monotonic()
+    texts = [prompt] + [msg.get("content", "") for msg in conversation_history]
+    paths, symbols = extract_mentions(texts)
+    if not paths and not symbols:
+        return []
+
+    tracked = await asyncio.to_thread(_tracked_files, repo_path)
+    targets = resolve_paths(paths, tracked)[:max_files]
+    remaining = max_files - len(targets)
+    for path in await asyncio.to_thread(find_symbol_files, repo_path, symbols, remaining):
+        if path not in targets:
+            targets.append(path)
+    targets = targets[:max_files]
+
+    cache = get_read_cache(repo_path)
+    semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+    loaded: Set[str] = set()
+
+    async def load(path: str):
+        async with semaphore:
+            try:
+                await asyncio.to_thread(cache.load, path)
+                loaded.add(path)
+            except (OSError, UnicodeDecodeError):
+                pass
+
+    await asyncio.gather(*(load(path) for path in targets))
+    logging.info(
+        f"🔮 Prefetched {len(loaded)}/{len(targets)} file(s) from {len(paths)} path and "
+        f"{len(symbols)} symbol mention(s) in {time.monotonic() - started:.2f}s"
+    )
+    return [path for path in targets if path in loaded]
@@ -1,9 +1,10 @@
 from google.adk.agents import LlmAgent
+from Raw_Gent.model_tiers import tiered_model
 from .analyze_code_prompt import Analyze_Code_Prompt
 
 Analyze_Code_Agent = LlmAgent(
     name="analyze_code",
-    model="gemini-3.1-flash-lite-preview",
+    model=tiered_model("analyze_code"),
     description="",
     instruction=Analyze_Code_Prompt
 )
\ No newline at end of file
@@ -1,9 +1,10 @@
 from google.adk.agents import LlmAgent
+from Raw_Gent.model_tiers import tiered_model
 from .fix_code_prompt import Fix_Code_Prompt
 
 Fix_Code_Agent = LlmAgent(
     name="fix_code",
-    model="gemini-3.1-flash-lite-preview",
+    model=tiered_model("fix_code"),
     description="",
     instruction=Fix_Code_Prompt
 )
\ No newline at end of file
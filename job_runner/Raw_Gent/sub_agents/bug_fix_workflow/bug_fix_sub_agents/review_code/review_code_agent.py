@@ -1,9 +1,10 @@
 from google.adk.agents import LlmAgent
+from Raw_Gent.model_tiers import tiered_model
 from .review_code_prompt import Review_Code_Prompt
 
 Review_Code_Agent = LlmAgent(
     name="review_code",
-    model="gemini-3.1-flash-lite-preview",
+    model=tiered_model("review_code"),
     description="",
     instruction=Review_Code_Prompt
     )
\ No newline at end of file
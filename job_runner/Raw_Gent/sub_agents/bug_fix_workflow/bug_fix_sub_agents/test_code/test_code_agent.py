@@ -1,9 +1,15 @@
 from google.adk.agents import LlmAgent
+from Raw_Gent.model_tiers import tiered_model
+from Raw_Gent.tools import read_file_from_repo, run_tests
 from .test_code_prompt import Test_Code_Prompt
 
 Test_Code_Agent = LlmAgent(
     name="test_code",
-    model="gemini-3.1-flash-lite-preview",
+    model=tiered_model("test_code"),
     description="",
-    instruction=Test_Code_Prompt
+    instruction=Test_Code_Prompt,
+    tools=[
+        read_file_from_repo,
+        run_tests
+    ],
 )
\ No newline at end of file
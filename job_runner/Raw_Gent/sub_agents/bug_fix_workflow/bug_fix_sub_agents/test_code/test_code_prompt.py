@@ -7,7 +7,9 @@ INSTRUCTIONS:
 
 Test Planning: Design test cases covering the fix and potential regressions
 Test Implementation: Create automated and manual test procedures
-Execution: Run tests systematically and document results
+Execution: Run tests systematically and document results. Use the run_tests tool to execute the
+repository's real test suite (optionally limited to one test file or directory) instead of predicting
+results; report the actual pass/fail counts and failing tracebacks it returns
 Regression Testing: Verify existing functionality remains intact
 Edge Case Testing: Test boundary conditions and unusual scenarios
 
@@ -0,0 +1,405 @@
+"""
+Sandboxed test execution for the cloned repository.
+Detects the project's test framework, runs it in resource-limited subprocesses
+(sharded across CPU cores where the framework allows it) and returns a compact
+summary. Results are cached by the workspace tree hash.
+"""
+import asyncio
+import logging
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Limits applied to every test subprocess
+TEST_TIMEOUT_SECONDS = int(os.getenv("TEST_RUNNER_TIMEOUT", "300"))
+TEST_MEMORY_LIMIT_MB = int(os.getenv("TEST_RUNNER_MEMORY_MB", "2048"))
+TEST_MAX_FILE_SIZE_MB = int(os.getenv("TEST_RUNNER_MAX_FILE_MB", "100"))
+TEST_MAX_SHARDS = int(os.getenv("TEST_RUNNER_MAX_SHARDS", str(os.cpu_count() or 1)))
+TEST_OUTPUT_BUDGET = int(os.getenv("TEST_RUNNER_OUTPUT_BUDGET", "4000"))
+
+# Only these variables reach the test process (no tokens or API keys)
+_ENV_ALLOWLIST = ("PATH", "HOME", "LANG", "LC_ALL", "TMPDIR", "TERM", "GOPATH", "GOCACHE", "CARGO_HOME", "RUSTUP_HOME")
+
+_SKIP_DIRS = {".git", "node_modules", ".venv", "venv", "__pycache__", ".tox", "build", "dist", "site-packages"}
+
+_CACHE_SIZE = 64
+_result_cache: "OrderedDict[Tuple, TestRunResult]" = OrderedDict()
+
+
+@dataclass
+class TestRunResult:
+    framework: str
+    exit_code: int = 0
+    passed: int = 0
+    failed: int = 0
+    errors: int = 0
+    skipped: int = 0
+    duration: float = 0.0
+    timed_out: bool = False
+    shards: int = 1
+    cached: bool = False
+    failures: List[str] = field(default_factory=list)
+    output_tail: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code == 0 and not self.timed_out and not self.failed and not self.errors
+
+    def format(self, max_chars: int = TEST_OUTPUT_BUDGET) -> str:
+        """compact pass/fail summary with failing tracebacks, within max_chars"""
+        status = "PASS" if self.ok else ("TIMEOUT" if self.timed_out else "FAIL")
+        header = (
+            f"Test run ({self.framework}, {self.shards} shard(s), {self.duration:.1f}s"
+            f"{', cached' if self.cached else ''}): {status}\n"
+            f"passed={self.passed} failed={self.failed} errors={self.errors} "
+            f"skipped={self.skipped} exit_code={self.exit_code}\n"
+        )
+        body = ""
+        if self.failures:
+            budget = max(0, max_chars - len(header))
+            per_failure = max(200, budget // len(self.failures))
+            for failure in self.failures:
+                chunk = failure if len(failure) <= per_failure else failure[:per_failure] + "\n... (truncated)"
+                if len(body) + len(chunk) + 1 > budget:
+                    body += f"... {len(self.failures)} failure(s) total, output budget reached\n"
+                    break
+                body += chunk + "\n"
+        elif not self.ok and self.output_tail:
+            body = self.output_tail[-max(0, max_chars - len(header)):]
+        return (header + body)[:max_chars]
+
+
+def _iter_files(repo_path: str):
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if d not in _SKIP_DIRS]
+        for name in files:
+            yield os.path.relpath(os.path.join(root, name), repo_path)
+
+
+def _read_text(path: str) -> str:
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def detect_test_framework(repo_path: str) -> Optional[str]:
+    """
+    Detect the test framework used by the repository.
+
+    Args:
+        repo_path (str): Path to the cloned repository.
+
+    Returns:
+        str | None: "pytest", "unittest", "jest", "vitest", "npm", "go", "cargo" or None.
+    """
+    def exists(name: str) -> bool:
+        return os.path.exists(os.path.join(repo_path, name))
+
+    if exists("package.json"):
+        package_json = _read_text(os.path.join(repo_path, "package.json"))
+        if '"test"' in package_json:
+            if "vitest" in package_json:
+                return "vitest"
+            if "jest" in package_json:
+                return "jest"
+            return "npm"
+    if exists("go.mod"):
+        return "go"
+    if exists("Cargo.toml"):
+        return "cargo"
+
+    pytest_markers = ("pytest.ini", "conftest.py", "tox.ini")
+    if any(exists(name) for name in pytest_markers):
+        return "pytest"
+    for config in ("pyproject.toml", "setup.cfg"):
+        if "pytest" in _read_text(os.path.join(repo_path, config)):
+            return "pytest"
+    python_tests = discover_python_tests(repo_path)
+    if python_tests:
+        uses_pytest = any(
+            "import pytest" in _read_text(os.path.join(repo_path, path)) for path in python_tests[:50]
+        )
+        return "pytest" if uses_pytest or shutil.which("pytest") else "unittest"
+    return None
+
+
+def is_python_test_file(relative_path: str) -> bool:
+    name = os.path.basename(relative_path)
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+def is_js_test_file(relative_path: str) -> bool:
+    return bool(re.search(r"\.(test|spec)\.[cm]?[jt]sx?$", relative_path)) or "__tests__/" in relative_path
+
+
+def discover_python_tests(repo_path: str) -> List[str]:
+    """Return python test files relative to the repo root"""
+    return sorted(path for path in _iter_files(repo_path) if is_python_test_file(path))
+
+
+def shard_files(files: List[str], shards: int, repo_path: str) -> List[List[str]]:
+    """
+    Split test files into balanced shards (largest files first, greedy by size).
+    """
+    def size(path: str) -> int:
+        full_path = os.path.join(repo_path, path)
+        return os.path.getsize(full_path) if os.path.isfile(full_path) else 0
+
+    shards = max(1, min(shards, len(files)))
+    totals = [0] * shards
+    buckets: List[List[str]] = [[] for _ in range(shards)]
+    for path in sorted(files, key=size, reverse=True):
+        index = totals.index(min(totals))
+        buckets[index].append(path)
+        totals[index] += size(path)
+    return [bucket for bucket in buckets if bucket]
+
+
+def _build_commands(framework: str, repo_path: str, targets: List[str], shards: int) -> List[List[str]]:
+    """one command per shard"""
+    if framework == "pytest":
+        files = targets or discover_python_tests(repo_path)
+        base = [sys.executable, "-m", "pytest", "-q", "-rfE", "--tb=short", "-p", "no:cacheprovider"]
+        if not files:
+            return [base]
+        return [base + shard for shard in shard_files(files, shards, repo_path)]
+    if framework == "unittest":
+        if targets:
+            modules = [t[:-3].replace(os.sep, ".") if t.endswith(".py") else t for t in targets]
+            return [[sys.executable, "-m", "unittest", "-v", *modules]]
+        return [[sys.executable, "-m", "unittest", "discover", "-v"]]
+    if framework in ("jest", "vitest"):
+        runner = ["npx", "--no-install", framework]
+        base = runner + (["run"] if framework == "vitest" else ["--ci"]) + targets
+        if shards <= 1:
+            return [base]
+        return [base + [f"--shard={i}/{shards}"] for i in range(1, shards + 1)]
+    if framework == "npm":
+        return [["npm", "test", "--silent", "--", *targets]]
+    if framework == "go":
+        return [["go", "test", *(targets or ["./..."])]]
+    if framework == "cargo":
+        return [["cargo", "test", "--quiet", *targets]]
+    raise ValueError(f"Unsupported test framework '{framework}'")
+
+
+# Frameworks whose test processes are plain CPython; node and Go reserve far
+# more address space than they use, so they get RLIMIT_DATA instead of RLIMIT_AS
+_PYTHON_FRAMEWORKS = {"pytest", "unittest"}
+
+
+def _limit_resources(pid: int, framework: str) -> None:
+    """
+    Cap memory, file size and core dumps of a started test process (children
+    it forks inherit the limits). Applied with prlimit from the parent rather
+    than in a preexec_fn, which isn't safe once the runner uses threads.
+    """
+    try:
+        import resource
+        memory = TEST_MEMORY_LIMIT_MB * 1024 * 1024
+        memory_limit = resource.RLIMIT_AS if framework in _PYTHON_FRAMEWORKS else resource.RLIMIT_DATA
+        resource.prlimit(pid, memory_limit, (memory, memory))
+        file_size = TEST_MAX_FILE_SIZE_MB * 1024 * 1024
+        resource.prlimit(pid, resource.RLIMIT_FSIZE, (file_size, file_size))
+        resource.prlimit(pid, resource.RLIMIT_CORE, (0, 0))
+    except Exception:
+        # no prlimit (non-Linux) or the process already exited
+        pass
+
+
+def _sandbox_env() -> Dict[str, str]:
+    env = {key: os.environ[key] for key in _ENV_ALLOWLIST if key in os.environ}
+    env.update({"CI": "1", "PYTHONDONTWRITEBYTECODE": "1", "PYTHONUNBUFFERED": "1"})
+    return env
+
+
+async def _run_shard(command: List[str], repo_path: str, timeout: float, framework: str) -> Tuple[int, str, bool]:
+    """
+    run one shard, killing its whole process group on timeout
+
+    Returns:
+        (exit code, output, timed out); a timed out shard returns the output
+        it produced until it was killed
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        cwd=repo_path,
+        env=_sandbox_env(),
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        start_new_session=True,
+    )
+    _limit_resources(process.pid, framework)
+    chunks: List[bytes] = []
+
+    async def collect():
+        while True:
+            chunk = await process.stdout.read(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        await process.wait()
+
+    try:
+        await asyncio.wait_for(collect(), timeout=timeout)
+        return process.returncode, b"".join(chunks).decode("utf-8", errors="replace"), False
+    except asyncio.TimeoutError:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            process.kill()
+        await process.wait()
+        return -1, b"".join(chunks).decode("utf-8", errors="replace"), True
+
+
+_COUNT_PATTERN = re.compile(r"(\d+) (passed|failed|errors?|skipped|xfailed|xpassed)")
+
+
+def _parse_output(framework: str, output: str, result: TestRunResult) -> None:
+    """accumulate counts and failing tracebacks from one shard's output"""
+    if framework == "pytest":
+        summary = [line for line in output.splitlines() if re.search(r"\d+ (passed|failed|error)", line)]
+        if summary:
+            for count, kind in _COUNT_PATTERN.findall(summary[-1]):
+                if kind == "passed":
+                    result.passed += int(count)
+                elif kind == "failed":
+                    result.failed += int(count)
+                elif kind.startswith("error"):
+                    result.errors += int(count)
+                elif kind == "skipped":
+                    result.skipped += int(count)
+        failures = re.search(r"=+ (?:FAILURES|ERRORS) =+\n(.*?)(?:\n=+ short test summary info =+|\Z)", output, re.S)
+        if failures:
+            blocks = re.split(r"\n_{3,} (.+?) _{3,}\n", "\n" + failures.group(1))
+            # blocks = [preamble, name1, body1, name2, body2, ...]
+            for name, body in zip(blocks[1::2], blocks[2::2]):
+                result.failures.append(f"FAILED {name}\n{body.strip()}")
+        return
+
+    if framework == "unittest":
+        match = re.search(r"Ran (\d+) tests?", output)
+        total = int(match.group(1)) if match else 0
+        failed = re.search(r"failures=(\d+)", output)
+        errors = re.search(r"errors=(\d+)", output)
+        skipped = re.search(r"skipped=(\d+)", output)
+        result.failed += int(failed.group(1)) if failed else 0
+        result.errors += int(errors.group(1)) if errors else 0
+        result.skipped += int(skipped.group(1)) if skipped else 0
+        result.passed += max(0, total - (result.failed + result.errors + result.skipped))
+        for block in re.split(r"\n={20,}\n", output)[1:]:
+            result.failures.append(re.split(r"\n-{20,}\nRan ", block)[0].strip())
+        return
+
+    if framework in ("jest", "vitest", "npm"):
+        match = re.search(r"Tests?:?\s+(.*)", output)
+        if match:
+            for count, kind in re.findall(r"(\d+) (passed|failed|skipped)", match.group(1)):
+                setattr(result, kind, getattr(result, kind) + int(count))
+        result.failures.extend(block.strip() for block in re.findall(r"● .*?(?=\n\s*● |\Z)", output, re.S))
+        return
+
+    if framework == "go":
+        result.passed += len(re.findall(r"^ok\s", output, re.M))
+        result.failed += len(re.findall(r"^--- FAIL", output, re.M))
+        result.failures.extend(re.findall(r"^--- FAIL.*?(?=^(?:---|FAIL|ok)\s|\Z)", output, re.M | re.S))
+        return
+
+    if framework == "cargo":
+        for passed, failed, skipped in re.findall(r"(\d+) passed; (\d+) failed; (\d+) ignored", output):
+            result.passed += int(passed)
+            result.failed += int(failed)
+            result.skipped += int(skipped)
+        result.failures.extend(re.findall(r"^---- .*? stdout ----.*?(?=^---- |^failures:|\Z)", output, re.M | re.S))
+
+
+def workspace_tree_hash(repo_path: str) -> Optional[str]:
+    """
+    Hash of the working tree including uncommitted and untracked changes.
+    Uses a throwaway git index so the repository's own index is untouched.
+    """
+    try:
+        git_index = subprocess.run(
+            ["git", "rev-parse", "--git-path", "index"],
+            cwd=repo_path, capture_output=True, text=True, timeout=10, check=True,
+        ).stdout.strip()
+        with tempfile.TemporaryDirectory() as tmp:
+            index = os.path.join(tmp, "index")
+            source = git_index if os.path.isabs(git_index) else os.path.join(repo_path, git_index)
+            if os.path.exists(source):
+                # reuse the stat cache so unchanged files are not re-hashed
+                shutil.copyfile(source, index)
+            env = {**os.environ, "GIT_INDEX_FILE": index}
+            subprocess.run(["git", "add", "-A"], cwd=repo_path, env=env, capture_output=True, timeout=60, check=True)
+            return subprocess.run(
+                ["git", "write-tree"], cwd=repo_path, env=env, capture_output=True, text=True, timeout=30, check=True,
+            ).stdout.strip()
+    except Exception as e:
+        logging.warning(f"⚠️ Could not hash workspace tree: {e}")
+        return None
+
+
+async def run_test_suite(repo_path: str, targets: Optional[List[str]] = None,
+                         timeout: float = TEST_TIMEOUT_SECONDS,
+                         max_shards: int = TEST_MAX_SHARDS) -> TestRunResult:
+    """
+    Run the repository's tests (or only `targets`) in sandboxed, sharded subprocesses.
+
+    Args:
+        repo_path (str): Path to the cloned repository.
+        targets (list, optional): Test files / dirs relative to the repo root.
+        timeout (float): Wall-clock limit for the whole run.
+        max_shards (int): Upper bound on parallel shards.
+
+    Returns:
+        TestRunResult: Counts, failing tracebacks and run metadata.
+    """
+    targets = sorted(targets or [])
+    framework = await asyncio.to_thread(detect_test_framework, repo_path)
+    if not framework:
+        return TestRunResult(framework="none", exit_code=5, output_tail="No test framework detected in repository")
+
+    tree_hash = await asyncio.to_thread(workspace_tree_hash, repo_path)
+    cache_key = (repo_path, tree_hash, framework, tuple(targets))
+    if tree_hash and cache_key in _result_cache:
+        _result_cache.move_to_end(cache_key)
+        cached = _result_cache[cache_key]
+        logging.info(f"🧪 Test results served from cache ({tree_hash[:12]})")
+        return TestRunResult(**{**cached.__dict__, "cached": True})
+
+    commands = _build_commands(framework, repo_path, targets, max(1, max_shards))
+    result = TestRunResult(framework=framework, shards=len(commands))
+    started = time.monotonic()
+    logging.info(f"🧪 Running {framework} tests in {len(commands)} shard(s)")
+
+    try:
+        outcomes = await asyncio.gather(*(_run_shard(command, repo_path, timeout, framework) for command in commands))
+    except FileNotFoundError as e:
+        return TestRunResult(framework=framework, exit_code=127, output_tail=f"Test command not available: {e}")
+
+    for exit_code, output, timed_out in outcomes:
+        result.timed_out = result.timed_out or timed_out
+        if exit_code != 0 and result.exit_code == 0:
+            result.exit_code = exit_code
+        _parse_output(framework, output, result)
+        if output and exit_code != 0:
+            result.output_tail = output[-TEST_OUTPUT_BUDGET:]
+    result.duration = time.monotonic() - started
+    logging.info(f"🧪 Tests finished: passed={result.passed} failed={result.failed} in {result.duration:.1f}s")
+
+    if tree_hash and not result.timed_out:
+        _result_cache[cache_key] = result
+        while len(_result_cache) > _CACHE_SIZE:
+            _result_cache.popitem(last=False)
+    return result
@@ -2,8 +2,12 @@
 File operation tools for ADK agents.
 These tools allow agents to read, write, and list files in the cloned repository.
 """
+import asyncio
 import os
 from typing import Optional
+from Raw_Gent.dep_graph import notify_file_written, select_tests_for_workspace
+from Raw_Gent.test_runner import TEST_OUTPUT_BUDGET, detect_test_framework, run_test_suite
+from Raw_Gent.workspace_cache import get_read_cache
 
 
 def read_file_from_repo(relative_path: str, context) -> str:
@@ -29,8 +33,8 @@ def read_file_from_repo(relative_path: str, context) -> str:
         if not full_path.startswith(repo_path_abs):
             return f"Error: Invalid path - cannot access files outside repository"
         
-        with open(full_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Served from memory when the file was prefetched or read before and is unchanged
+        content = get_read_cache(repo_path_abs).read(os.path.relpath(full_path, repo_path_abs))
         return f"File: {relative_path}\n\n{content}"
     except FileNotFoundError:
         return f"Error: File '{relative_path}' not found in repository"
@@ -67,6 +71,10 @@ def write_file_to_repo(relative_path: str, content: str, context) -> str:
         
         with open(full_path, 'w', encoding='utf-8') as f:
             f.write(content)
+
+        # Keep the read cache and import graph current for later reads and test selection
+        get_read_cache(repo_path_abs).put(os.path.relpath(full_path, repo_path_abs), content)
+        notify_file_written(repo_path_abs, os.path.relpath(full_path, repo_path_abs))
         return f"Successfully wrote {len(content)} characters to {relative_path}"
     except Exception as e:
         return f"Error writing file '{relative_path}': {str(e)}"
@@ -119,3 +127,52 @@ def list_files_in_repo(directory: str = ".", context=None) -> str:
     except Exception as e:
         return f"Error listing files in '{directory}': {str(e)}"
 
+
+async def run_tests(test_path: str = "", full_suite: bool = False, context=None) -> str:
+    """
+    Runs the repository's tests in a sandboxed subprocess and reports the results.
+    By default only the tests that import (directly or transitively) a changed file are run.
+
+    Args:
+        test_path (str, optional): Test file or directory relative to repo root. Defaults to "" (impacted tests).
+        full_suite (bool, optional): Run the whole suite instead of only impacted tests. Defaults to False.
+
+    Returns:
+        str: Compact pass/fail summary with failing tracebacks, or an error message.
+    """
+    try:
+        if context is None:
+            return "Error: Context not available. Repository path not accessible."
+
+        repo_path = context.session.state.get('repo_path')
+        if not repo_path:
+            return "Error: Repository path not found in session state. Please ensure repo_path is set."
+
+        targets = []
+        if test_path:
+            # Security check: ensure path is within repo directory
+            full_path = os.path.abspath(os.path.join(repo_path, test_path))
+            repo_path_abs = os.path.abspath(repo_path)
+            if not full_path.startswith(repo_path_abs):
+                return f"Error: Invalid path - cannot run tests outside repository"
+            if not os.path.exists(full_path):
+                return f"Error: '{test_path}' not found in repository"
+            targets.append(os.path.relpath(full_path, repo_path_abs))
+
+        selection_note = ""
+        # both walk the repo / run git: keep them off the event loop shared by concurrent jobs
+        framework = await asyncio.to_thread(detect_test_framework, repo_path)
+        if not targets and not full_suite and framework in ("pytest", "unittest", "jest", "vitest"):
+            selected, reason = await asyncio.to_thread(select_tests_for_workspace, repo_path)
+            if selected is not None and not selected:
+                return f"No tests reach the changed files ({reason}). Call run_tests with full_suite=True to run everything."
+            if selected:
+                targets = selected
+                selection_note = f"Selected {len(selected)} impacted test file(s).\n"
+            else:
+                selection_note = f"Running full suite ({reason}).\n"
+
+        result = await run_test_suite(repo_path, targets=targets)
+        return selection_note + result.format(TEST_OUTPUT_BUDGET - len(selection_note))
+    except Exception as e:
+        return f"Error running tests: {str(e)}"
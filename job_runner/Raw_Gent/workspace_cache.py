@@ -0,0 +1,114 @@
+"""
+In-memory read cache for files in a job's workspace.
+Entries are validated against the file's mtime and size on every read, so
+writes from any source are picked up; write_file_to_repo also refreshes the
+entry directly.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+READ_CACHE_MAX_BYTES = int(os.getenv("READ_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+READ_CACHE_MAX_FILE_BYTES = int(os.getenv("READ_CACHE_MAX_FILE_BYTES", str(1024 * 1024)))
+
+
+class WorkspaceReadCache:
+    """LRU of file contents for one workspace, bounded by total size"""
+    def __init__(self, repo_path: str, max_bytes: int = READ_CACHE_MAX_BYTES,
+                 max_file_bytes: int = READ_CACHE_MAX_FILE_BYTES):
+        self.repo_path = os.path.abspath(repo_path)
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        # relative path -> ((mtime_ns, size), content)
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], str]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, relative_path: str) -> str:
+        return os.path.normpath(relative_path)
+
+    def _stat(self, relative_path: str) -> Tuple[int, int]:
+        stat = os.stat(os.path.join(self.repo_path, relative_path))
+        return stat.st_mtime_ns, stat.st_size
+
+    def read(self, relative_path: str) -> str:
+        """
+        Return the file's content, from memory when the file is unchanged.
+
+        Raises:
+            FileNotFoundError, UnicodeDecodeError, OSError like open() would.
+        """
+        key = self._key(relative_path)
+        signature = self._stat(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return self.load(key)
+
+    def load(self, relative_path: str) -> str:
+        """read the file from disk and cache it"""
+        key = self._key(relative_path)
+        signature = self._stat(key)
+        with open(os.path.join(self.repo_path, key), 'r', encoding='utf-8') as f:
+            content = f.read()
+        self.put(key, content, signature)
+        return content
+
+    def put(self, relative_path: str, content: str, signature: Optional[Tuple[int, int]] = None) -> None:
+        key = self._key(relative_path)
+        if len(content) > self.max_file_bytes:
+            self.invalidate(key)
+            return
+        if signature is None:
+            try:
+                signature = self._stat(key)
+            except OSError:
+                return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._size -= len(old[1])
+            self._entries[key] = (signature, content)
+            self._size += len(content)
+            while self._size > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def invalidate(self, relative_path: str) -> None:
+        with self._lock:
+            old = self._entries.pop(self._key(relative_path), None)
+            if old:
+                self._size -= len(old[1])
+
+    def __contains__(self, relative_path: str) -> bool:
+        return self._key(relative_path) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# One cache per workspace (keyed by absolute repo path)
+_caches: Dict[str, WorkspaceReadCache] = {}
+
+
+def get_read_cache(repo_path: str) -> WorkspaceReadCache:
+    """Return (creating if needed) the read cache for a workspace"""
+    key = os.path.abspath(repo_path)
+    cache = _caches.get(key)
+    if cache is None:
+        cache = _caches[key] = WorkspaceReadCache(key)
+    return cache
+
+
+def discard_read_cache(repo_path: str) -> None:
+    cache = _caches.pop(os.path.abspath(repo_path), None)
+    if cache:
+        logging.info(f"🗃️ Read cache for {repo_path}: {cache.hits} hits, {cache.misses} misses")
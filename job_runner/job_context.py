@@ -0,0 +1,188 @@
+"""
+Per-job state for the job runner.
+
+Everything that used to live in module globals or was derived from the process
+(session id, workspace, Redis channels, follow-up polling task, phase timings,
+open tool call spans) is held by a JobContext, so one process can run several jobs side by side on a
+single event loop.
+"""
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime
+import time
+from typing import Dict, Optional
+import redis.asyncio as redis
+from job_runner_models import JobSpec, JobUpdate
+from phase_timer import PhaseTimer
+from tracing import Span, tracer
+import wire
+
+# capped per-job event stream the backend replays to reconnecting clients
+JOB_EVENTS_MAXLEN = int(os.getenv("JOB_EVENTS_MAXLEN", "1000"))
+JOB_EVENTS_TTL_SECONDS = int(os.getenv("JOB_STATE_TTL_SECONDS", "86400"))
+# list the backend drains into its /metrics histograms, and its cap
+RUNNER_METRICS_KEY = os.getenv("RUNNER_METRICS_KEY", "metrics:runner")
+RUNNER_METRICS_MAXLEN = int(os.getenv("RUNNER_METRICS_MAXLEN", "10000"))
+# shared stream the backend persists status updates from (see backend JOB_STATUS_STREAM)
+JOB_STATUS_STREAM = os.getenv("JOB_STATUS_STREAM", "jobs:status")
+JOB_STATUS_STREAM_MAXLEN = int(os.getenv("JOB_STATUS_STREAM_MAXLEN", "100000"))
+
+# Append to the stream and publish prefixed with the entry id, in one
+# round trip; status updates also go to the shared status stream.
+# Same script as backend/services/redis.py.
+_PUBLISH_EVENT_SCRIPT = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[2], '*', 'data', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+if ARGV[4] == '1' then
+  redis.call('XADD', KEYS[3], 'MAXLEN', '~', ARGV[5], '*', 'job', ARGV[6], 'event', id, 'data', ARGV[1])
+end
+redis.call('PUBLISH', KEYS[2], id .. ' ' .. ARGV[1])
+return id
+"""
+
+
+class JobContext:
+    """state and Redis I/O of one agent job"""
+    def __init__(self, spec: JobSpec, redis_client: redis.Redis, workspace: Optional[str] = None,
+                 timer: Optional[PhaseTimer] = None):
+        self.spec = spec
+        self.job_id = spec.job_id
+        self.redis = redis_client
+        self.session_id = f"{spec.repo}_{spec.branch}_{spec.job_id}"
+        self.updates_channel = f"job:{spec.job_id}:updates"
+        self.events_key = f"job:{spec.job_id}:events"
+        self.queue_key = f"job:{spec.job_id}:queue"
+        self.timer = timer or PhaseTimer()
+        self.polling_task: Optional[asyncio.Task] = None
+        # ADK function call id -> span open until its response event
+        self.tool_spans: Dict[str, Span] = {}
+        self._last_event_at: Optional[float] = None
+        self._owns_workspace = workspace is None
+        self.workspace = workspace or tempfile.mkdtemp(prefix=f"job-{spec.job_id[:8]}-")
+
+    async def publish(self, message: dict) -> str:
+        """append a message to the job's event stream and publish it on the updates channel"""
+        traceparent = tracer.current_traceparent()
+        if traceparent:
+            message = dict(message, traceparent=traceparent)
+        return await self.redis.eval(
+            _PUBLISH_EVENT_SCRIPT, 3, self.events_key, self.updates_channel, JOB_STATUS_STREAM,
+            wire.encode(message), JOB_EVENTS_MAXLEN, JOB_EVENTS_TTL_SECONDS,
+            "1" if message.get("type") == "status_update" else "0", JOB_STATUS_STREAM_MAXLEN, self.job_id,
+        )
+
+    async def send_job_update(self, update: JobUpdate) -> None:
+        """Send update via Redis pub/sub only (no HTTP)"""
+        try:
+            message = {
+                "type": "status_update",
+                "content": update.model_dump(mode="json", exclude_none=True),
+                "job_id": self.job_id,
+                "timestamp": datetime.now().isoformat()
+            }
+            with self.timer.phase("publish"):
+                await self.publish(message)
+            logging.info(f"✅ [{self.job_id}] Published status update to Redis: {update.status}")
+        except Exception as e:
+            logging.error(f"❌ [{self.job_id}] Failed to publish update: {e}")
+
+    async def send_exit(self) -> None:
+        """
+        Tell the backend this runner is done (follow-ups included) so it frees
+        the job's scheduler slot. Not an event: it isn't kept in the stream.
+        """
+        try:
+            await self.redis.publish(self.updates_channel, wire.encode({
+                "type": "runner_exit",
+                "job_id": self.job_id,
+                "timestamp": datetime.now().isoformat(),
+            }))
+        except Exception as e:
+            logging.warning(f"⚠️ [{self.job_id}] Could not publish runner exit: {e}")
+
+    async def send_agent_response(self, content: str) -> None:
+        """Send agent response via Redis pub/sub"""
+        await self.publish({
+            "type": "agent_message",
+            "content": content,
+            "job_id": self.job_id,
+            "timestamp": datetime.now().isoformat()
+        })
+        logging.info(f"📤 [{self.job_id}] Published agent response to Redis")
+
+    def observe_event(self, event, phases: bool = True) -> None:
+        """
+        Time one ADK event: phase timings (unless `phases` is False, e.g.
+        for follow-ups), an `adk.event` span covering the time since the
+        previous event (the work that produced this one) and a `tool.call`
+        span from each function call to its response.
+        """
+        if phases:
+            self.timer.on_event(event.author)
+        now = time.time()
+        tracer.record("adk.event", self._last_event_at or now, now, author=event.author,
+                      final=event.is_final_response())
+        self._last_event_at = now
+        for call in event.get_function_calls():
+            self.timer.tool_started(call.id, call.name)
+            self.tool_spans[call.id] = tracer.start_span("tool.call", tool=call.name)
+        for response in event.get_function_responses():
+            self.timer.tool_finished(response.id)
+            span = self.tool_spans.pop(response.id, None)
+            if span:
+                span.end()
+
+    def start_events(self, phases: bool = True) -> None:
+        """the agent was just asked something: the next event's time counts from now"""
+        self._last_event_at = time.time()
+        if phases:
+            self.timer.start_agents()
+
+    async def push_metrics(self, outcome: str) -> None:
+        """hand the job's phase and tool timings to the backend (never fails the job)"""
+        report = dict(self.timer.report(), job_id=self.job_id, outcome=outcome)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.rpush(RUNNER_METRICS_KEY, wire.encode(report))
+                # nobody scraping: keep the newest reports only
+                pipe.ltrim(RUNNER_METRICS_KEY, -RUNNER_METRICS_MAXLEN, -1)
+                pipe.expire(RUNNER_METRICS_KEY, JOB_EVENTS_TTL_SECONDS)
+                await pipe.execute()
+        except Exception as e:
+            logging.warning(f"⚠️ [{self.job_id}] Could not push metrics: {e}")
+
+    async def poll_user_message(self, timeout: int = 5) -> Optional[dict]:
+        """
+        Poll the job's Redis queue for a user message (blocking)
+        Returns message or None after timeout
+        """
+        try:
+            result = await self.redis.blpop(self.queue_key, timeout=timeout)
+            if result:
+                _, message_json = result
+                message = json.loads(message_json)
+                logging.info(f"📨 [{self.job_id}] Got user message: {message.get('content')}")
+                return message
+        except Exception as e:
+            logging.error(f"[{self.job_id}] Error polling queue: {e}")
+            await asyncio.sleep(2)
+        return None
+
+    async def close(self) -> None:
+        """stop background work and remove the workspace"""
+        for span in self.tool_spans.values():
+            span.end(error="no response")
+        self.tool_spans.clear()
+        if self.polling_task and not self.polling_task.done():
+            self.polling_task.cancel()
+            try:
+                await self.polling_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self._owns_workspace:
+            shutil.rmtree(self.workspace, ignore_errors=True)
+            logging.info(f"🧹 [{self.job_id}] Cleaned up temporary directory.")
@@ -47,4 +47,20 @@ class WebScoketMessage(BaseModel):
     type : WebSocketMessageType
     content : str
     job_id : Optional[str] = None
-    timestamp : str
\ No newline at end of file
+    timestamp : str
+
+class JobSpec(BaseModel):
+    """Everything a runner needs to execute one job (from env or the job queue)"""
+    job_id: str
+    prompt: str
+    repo: str
+    branch: str
+    token: str
+    conversation_history: List[dict] = []
+    clone_url: Optional[str] = None
+    # W3C trace context of the backend's dispatch span
+    traceparent: Optional[str] = None
+
+    def resolved_clone_url(self) -> str:
+        # no credentials in the URL: git keeps it in .git, where the repo's own tests could read it
+        return self.clone_url or f"https://github.com/{self.repo}.git"
@@ -0,0 +1,99 @@
+"""
+Wall-clock phase timings for one agent job (clone, routing, each sub-agent,
+diff collection, publish) and tool call durations. Used for logging, the
+offline benchmarks and the metrics report pushed to the backend.
+"""
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+ROOT_AGENT_NAME = "Raw_Gent"
+
+
+class PhaseTimer:
+    """
+    Collects durations per phase. A phase can be recorded several times
+    (e.g. one publish per status update); totals and counts are kept.
+    """
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+        # tool name -> durations of its calls
+        self.tools: Dict[str, List[float]] = defaultdict(list)
+        self._tool_calls: Dict[str, Tuple[str, float]] = {}
+        self.started = time.perf_counter()
+        self._author: Optional[str] = None
+        # start of the time not yet given to an agent, and the open stretch
+        self._last_event: Optional[float] = None
+        self._stretch = 0.0
+        self._routed = False
+
+    def record(self, phase: str, seconds: float) -> None:
+        self.durations[phase].append(seconds)
+
+    @contextmanager
+    def phase(self, name: str):
+        """time the wrapped block as `name`"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def start_agents(self) -> None:
+        """the agent run was just started: the first event's time counts from here"""
+        self._last_event = time.perf_counter()
+
+    def on_event(self, author: Optional[str]) -> None:
+        """
+        Give the time since the previous event (or since `start_agents`) to
+        the author of this one: ADK emits an event once the model call or
+        tool behind it has finished. Consecutive events of one agent form a
+        stretch; the root agent's stretch before its first hand-off is
+        recorded as `routing`, every other stretch as `agent:<name>`.
+        """
+        now = time.perf_counter()
+        elapsed = now - self._last_event if self._last_event is not None else 0.0
+        self._last_event = now
+        if author != self._author:
+            self._close_stretch()
+            self._author = author
+        self._stretch += elapsed
+
+    def _close_stretch(self) -> None:
+        if self._author is not None:
+            if self._author == ROOT_AGENT_NAME and not self._routed:
+                self.record("routing", self._stretch)
+            else:
+                self.record(f"agent:{self._author}", self._stretch)
+            if self._author != ROOT_AGENT_NAME:
+                self._routed = True
+        self._stretch = 0.0
+
+    def finish_agents(self) -> None:
+        """close the running agent stretch once the event stream ends"""
+        self._close_stretch()
+        self._author = None
+        self._last_event = None
+
+    def tool_started(self, call_id: str, name: str) -> None:
+        """an agent asked for a tool call (ADK function call event)"""
+        self._tool_calls[call_id] = (name, time.perf_counter())
+
+    def tool_finished(self, call_id: str) -> None:
+        """the tool call's result came back (ADK function response event)"""
+        started = self._tool_calls.pop(call_id, None)
+        if started:
+            name, since = started
+            self.tools[name].append(time.perf_counter() - since)
+
+    def report(self) -> Dict[str, Dict[str, List[float]]]:
+        """every recorded duration, for the backend metrics"""
+        return {"phases": dict(self.durations), "tools": dict(self.tools)}
+
+    def totals(self) -> Dict[str, float]:
+        """total seconds per phase"""
+        return {phase: sum(values) for phase, values in self.durations.items()}
+
+    def summary(self) -> str:
+        return ", ".join(f"{phase}={seconds:.2f}s" for phase, seconds in self.totals().items())
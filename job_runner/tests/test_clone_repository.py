@@ -0,0 +1,49 @@
+"""
+The installation token used to clone must not end up in the workspace, where
+the repository's own tests (run by run_tests) could read it.
+
+    cd job_runner && python -m pytest tests
+"""
+import base64
+import os
+import subprocess
+from job_runner_models import JobSpec
+from main import clone_repository
+
+TOKEN = "ghs_clonetoken123"
+
+
+def make_repo(path: str) -> str:
+    git = ["git", "-c", "user.name=test", "-c", "user.email=test@localhost"]
+    subprocess.run(git + ["init", "-q", "-b", "main", path], check=True)
+    subprocess.run(git + ["-C", path, "commit", "-q", "--allow-empty", "-m", "initial"], check=True)
+    return f"file://{path}"
+
+
+def read_tree(path: str) -> bytes:
+    data = b""
+    for root, _, files in os.walk(path):
+        for name in files:
+            with open(os.path.join(root, name), "rb") as f:
+                data += f.read()
+    return data
+
+
+def test_github_clone_url_has_no_credentials():
+    spec = JobSpec(job_id="j", prompt="p", repo="owner/repo", branch="main", token=TOKEN)
+
+    assert spec.resolved_clone_url() == "https://github.com/owner/repo.git"
+
+
+def test_token_is_not_written_into_the_clone(tmp_path):
+    clone_url = make_repo(str(tmp_path / "origin"))
+    workspace = str(tmp_path / "workspace")
+
+    clone_repository(clone_url, "main", workspace, TOKEN)
+
+    git_dir = read_tree(os.path.join(workspace, ".git"))
+    assert TOKEN.encode() not in git_dir
+    assert base64.b64encode(f"x-access-token:{TOKEN}".encode()) not in git_dir
+    remote = subprocess.run(["git", "-C", workspace, "remote", "get-url", "origin"],
+                            capture_output=True, text=True, check=True).stdout.strip()
+    assert remote == clone_url
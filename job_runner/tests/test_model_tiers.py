@@ -0,0 +1,162 @@
+"""
+Model tiering with stub backends: tier selection by agent and task size, and
+fallback when the primary's p95 latency or error rate crosses its threshold.
+
+    cd job_runner && python -m pytest tests
+"""
+import asyncio
+from typing import AsyncGenerator, Dict, List
+import pytest
+from google.adk.models import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from Raw_Gent import model_tiers
+from Raw_Gent.model_tiers import (
+    classify_task_size, get_model_health, register_model_backend, set_model_tiers, set_task_size,
+    tiered_model, unregister_model_backend,
+)
+
+MODELS = ("stub-lite", "stub-flash", "stub-pro")
+
+CONFIG = {
+    "default_model": "stub-lite",
+    "agents": {
+        "fix_code": {"small": "stub-flash", "medium": "stub-pro", "large": "stub-pro"},
+        "review_code": {"small": "stub-lite", "large": "stub-flash"},
+    },
+    "fallbacks": {"stub-pro": "stub-flash", "stub-flash": "stub-lite"},
+    "health": {
+        "window": 10,
+        "min_samples": 4,
+        "p95_latency_seconds": 5.0,
+        "max_error_rate": 0.3,
+        "cooldown_seconds": 60.0,
+    },
+    "task_size": {
+        "small_max_prompt_chars": 100,
+        "small_max_files": 10,
+        "large_min_prompt_chars": 1000,
+        "large_min_files": 100,
+    },
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class StubLlm(BaseLlm):
+    """answers with its own name; latency and failures come from the test"""
+    behaviour: Dict
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        plan = self.behaviour.setdefault(self.model, {})
+        self.behaviour["calls"].append(self.model)
+        self.behaviour["clock"].now += plan.get("latency", 0.1)
+        if plan.get("raise"):
+            raise RuntimeError(f"{self.model} unavailable")
+        if plan.get("error"):
+            yield LlmResponse(error_code="UNAVAILABLE", error_message="overloaded")
+            return
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=self.model)]))
+
+
+@pytest.fixture
+def stubs(monkeypatch):
+    clock = FakeClock()
+    # call latency is measured with the module's clock; the stubs advance it
+    monkeypatch.setattr(model_tiers, "time", clock)
+    behaviour = {"calls": [], "clock": clock}
+    set_model_tiers(CONFIG)
+    for name in MODELS:
+        register_model_backend(name, lambda model, behaviour=behaviour: StubLlm(model=model, behaviour=behaviour))
+    set_task_size("medium")
+    yield behaviour
+    for name in MODELS:
+        unregister_model_backend(name)
+    set_model_tiers(None)
+    set_task_size("medium")
+
+
+def ask(agent: str, task_size: str = "medium") -> List[LlmResponse]:
+    async def run():
+        set_task_size(task_size)
+        llm = tiered_model(agent)
+        return [response async for response in llm.generate_content_async(LlmRequest())]
+    return asyncio.run(run())
+
+
+def answered_by(responses: List[LlmResponse]) -> str:
+    return responses[-1].content.parts[0].text
+
+
+def test_task_size_classification(stubs):
+    assert classify_task_size("fix it", file_count=5) == "small"
+    assert classify_task_size("fix it", file_count=50) == "medium"
+    assert classify_task_size("x" * 500, file_count=5) == "medium"
+    assert classify_task_size("x" * 1000, file_count=5) == "large"
+    assert classify_task_size("fix it", file_count=100) == "large"
+
+
+def test_selects_tier_by_agent_and_task_size(stubs):
+    assert answered_by(ask("fix_code", "small")) == "stub-flash"
+    assert answered_by(ask("fix_code", "medium")) == "stub-pro"
+    assert answered_by(ask("fix_code", "large")) == "stub-pro"
+    assert answered_by(ask("review_code", "small")) == "stub-lite"
+    assert answered_by(ask("review_code", "large")) == "stub-flash"
+    # no medium tier for review_code, no entry at all for unknown agents
+    assert answered_by(ask("review_code", "medium")) == "stub-lite"
+    assert answered_by(ask("analyze_code", "large")) == "stub-lite"
+
+
+def test_falls_back_when_p95_latency_crosses_threshold(stubs):
+    stubs["stub-pro"] = {"latency": 8.0}
+    for _ in range(CONFIG["health"]["min_samples"]):
+        assert answered_by(ask("fix_code")) == "stub-pro"
+
+    assert answered_by(ask("fix_code")) == "stub-flash"
+    assert get_model_health("stub-pro").tripped_until > 0
+    # the fallback's own health is untouched
+    assert get_model_health("stub-flash").tripped_until == 0
+
+
+def test_fast_primary_stays_selected(stubs):
+    stubs["stub-pro"] = {"latency": 4.0}
+    for _ in range(CONFIG["health"]["min_samples"] * 2):
+        assert answered_by(ask("fix_code")) == "stub-pro"
+
+
+def test_falls_back_when_error_rate_crosses_threshold(stubs):
+    stubs["stub-pro"] = {"error": True}
+    for _ in range(2):
+        assert ask("fix_code")[-1].error_code == "UNAVAILABLE"
+    stubs["stub-pro"] = {}
+    for _ in range(2):
+        assert answered_by(ask("fix_code")) == "stub-pro"
+
+    # 2 errors in 4 calls is over the 30% limit
+    assert get_model_health("stub-pro").error_rate() == 0.5
+    assert answered_by(ask("fix_code")) == "stub-flash"
+    assert stubs["calls"][-1] == "stub-flash"
+
+
+def test_primary_raising_before_output_is_retried_on_fallback(stubs):
+    stubs["stub-pro"] = {"raise": True}
+
+    assert answered_by(ask("fix_code")) == "stub-flash"
+    assert stubs["calls"] == ["stub-pro", "stub-flash"]
+    assert get_model_health("stub-pro").error_rate() == 1.0
+
+
+def test_fallback_without_own_fallback_raises(stubs):
+    stubs["stub-lite"] = {"raise": True}
+
+    with pytest.raises(RuntimeError):
+        ask("review_code", "small")
@@ -0,0 +1,220 @@
+"""
+Job tracing with W3C trace context (traceparent), without an OpenTelemetry
+dependency.
+
+The backend hands each job the traceparent of its dispatch span (TRACEPARENT
+or JobSpec.traceparent). The runner's spans (the job, clone, every ADK event,
+every tool call, diff collection) are its descendants, and every message the
+job publishes carries the current span's traceparent, so the backend can
+time Redis delivery in the same trace.
+
+Finished spans go to the exporter chosen by TRACE_EXPORTER:
+
+    jsonl   one JSON object per line, appended to TRACE_FILE (give the
+            backend and local runners the same absolute path to get whole
+            traces in one file)
+    memory  newest TRACE_BUFFER_SPANS spans in this process (benchmarks)
+    none    ids still propagate, spans are dropped (default)
+
+Kept in sync with backend/core/tracing.py.
+"""
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple, Union
+import orjson
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_BUFFER_SPANS = int(os.getenv("TRACE_BUFFER_SPANS", "10000"))
+
+logger = logging.getLogger(__name__)
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace id, parent span id) of a valid traceparent, else None"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff":
+        return None
+    trace_id, span_id = parts[1].lower(), parts[2].lower()
+    if len(trace_id) != 32 or len(span_id) != 16:
+        return None
+    try:
+        int(trace_id, 16), int(span_id, 16)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id, span_id
+
+
+class Span:
+    """one timed operation; wall-clock start so spans of different processes line up"""
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "start", "_started", "duration",
+                 "attributes", "error")
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str],
+                 start: Optional[float] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        # spans started now are timed with the monotonic clock
+        self._started = time.perf_counter() if start is None else None
+        self.start = time.time() if start is None else start
+        self.duration: Optional[float] = None
+        self.attributes: Dict[str, Any] = attributes or {}
+        self.error: Optional[str] = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: Optional[str] = None, end: Optional[float] = None) -> None:
+        """finish and export (only the first call counts)"""
+        if self.duration is not None:
+            return
+        if error:
+            self.error = error
+        if end is not None or self._started is None:
+            self.duration = max(0.0, (time.time() if end is None else end) - self.start)
+        else:
+            self.duration = time.perf_counter() - self._started
+        self.tracer.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.tracer.service,
+            "start": self.start,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class MemoryExporter:
+    """ring buffer of finished spans"""
+    def __init__(self, max_spans: int = TRACE_BUFFER_SPANS):
+        self.spans: Deque[Dict[str, Any]] = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span.to_dict())
+
+    def trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        return sorted((span for span in self.spans if span["trace_id"] == trace_id), key=lambda span: span["start"])
+
+
+class JsonlExporter:
+    """
+    appends one line per span with a single unbuffered write, so several
+    processes (backend and local runners) can share the file
+    """
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = orjson.dumps(span.to_dict(), default=str) + b"\n"
+        try:
+            with self._lock:
+                if self._file is None:
+                    self._file = open(self.path, "ab", buffering=0)
+                self._file.write(line)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write span to {self.path}: {e}")
+
+
+class NoopExporter:
+    def export(self, span: Span) -> None:
+        pass
+
+
+EXPORTERS = {"memory": MemoryExporter, "jsonl": JsonlExporter, "none": NoopExporter}
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+Parent = Union[Span, str, None]
+
+
+class Tracer:
+    def __init__(self, service: str, exporter=None):
+        self.service = service
+        self.exporter = exporter or NoopExporter()
+
+    def export(self, span: Span) -> None:
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.warning(f"⚠️ Span export failed: {e}")
+
+    @staticmethod
+    def current() -> Optional[Span]:
+        return _current.get()
+
+    def current_traceparent(self) -> Optional[str]:
+        span = _current.get()
+        return span.traceparent if span else None
+
+    def start_span(self, name: str, parent: Parent = None, start: Optional[float] = None,
+                   **attributes: Any) -> Span:
+        """
+        Start a span without making it current (end it yourself).
+
+        Args:
+            parent: a Span or a traceparent; defaults to the current span. A new
+                trace is started when there is none (or it doesn't parse).
+        """
+        if parent is None:
+            parent = _current.get()
+        if isinstance(parent, Span):
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            parsed = parse_traceparent(parent)
+            trace_id, parent_id = parsed if parsed else (secrets.token_hex(16), None)
+        return Span(self, name, trace_id, parent_id, start, attributes)
+
+    @contextmanager
+    def span(self, name: str, parent: Parent = None, **attributes: Any) -> Iterator[Span]:
+        """time the wrapped block as the current span"""
+        span = self.start_span(name, parent, **attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current.reset(token)
+            span.end()
+
+    def record(self, name: str, start: float, end: float, parent: Parent = None, **attributes: Any) -> Span:
+        """export a span whose wall-clock start and end are already known"""
+        span = self.start_span(name, parent, start=start, **attributes)
+        span.end(end=end)
+        return span
+
+
+def exporter_from_env():
+    if TRACE_EXPORTER not in EXPORTERS:
+        logger.warning(f"⚠️ Unknown TRACE_EXPORTER '{TRACE_EXPORTER}', spans are dropped")
+        return NoopExporter()
+    return EXPORTERS[TRACE_EXPORTER]()
+
+
+tracer = Tracer("job_runner", exporter_from_env())
@@ -0,0 +1,96 @@
+"""
+Wire format of job events (runner -> Redis -> backend).
+
+One versioned envelope, serialized once with orjson:
+
+    byte 0   version (1)
+    byte 1   flags (bit 0: body is zstd-compressed)
+    rest     orjson of {"type", "content", "job_id", "timestamp"} and,
+             on traced jobs, "traceparent" (W3C trace context)
+
+`content` is carried as-is, so a status update's fields are an object rather
+than a JSON string inside JSON. Bodies of at least WIRE_COMPRESS_MIN_BYTES
+(file changes) are zstd-compressed when zstandard is installed.
+
+On a job's updates channel the publish script prefixes the stream id:
+
+    b"<event id> " + envelope
+
+Plain JSON text published by older runners still decodes.
+
+Kept in sync with backend/core/wire.py, which also decodes and converts
+messages for browsers.
+"""
+import os
+from typing import Any, Dict, Union
+import orjson
+
+try:
+    import zstandard
+except ImportError:  # envelopes are sent uncompressed
+    zstandard = None
+
+VERSION = 1
+FLAG_ZSTD = 0x01
+# message types whose content is a JSON object (a JSON string in the legacy format)
+OBJECT_CONTENT = {"status_update", "queue_position"}
+WIRE_COMPRESS_MIN_BYTES = int(os.getenv("WIRE_COMPRESS_MIN_BYTES", "4096"))
+
+_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+
+class WireError(ValueError):
+    """message that isn't a valid envelope"""
+
+
+def encode(message: Dict[str, Any], compress_min: int = WIRE_COMPRESS_MIN_BYTES) -> bytes:
+    """serialize a message into an envelope"""
+    body = orjson.dumps(message)
+    if _compressor is not None and compress_min and len(body) >= compress_min:
+        compressed = _compressor.compress(body)
+        if len(compressed) < len(body):
+            return bytes((VERSION, FLAG_ZSTD)) + compressed
+    return bytes((VERSION, 0)) + body
+
+
+def decode(data: Union[bytes, str]) -> Dict[str, Any]:
+    """parse an envelope (or a legacy JSON message)"""
+    if isinstance(data, str):
+        data = data.encode()
+    if len(data) < 2:
+        raise WireError("truncated message")
+
+    if data[0] == ord("{"):
+        return _decode_legacy(data)
+
+    version, flags = data[0], data[1]
+    if version != VERSION:
+        raise WireError(f"unsupported envelope version {version}")
+    body = data[2:]
+    if flags & FLAG_ZSTD:
+        if _decompressor is None:
+            raise WireError("compressed envelope but zstandard is not installed")
+        try:
+            body = _decompressor.decompress(body)
+        except zstandard.ZstdError as e:
+            raise WireError(f"bad compressed body: {e}") from e
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise WireError(f"bad body: {e}") from e
+
+
+def _decode_legacy(data: bytes) -> Dict[str, Any]:
+    try:
+        message = orjson.loads(data)
+    except orjson.JSONDecodeError as e:
+        raise WireError(f"bad legacy message: {e}") from e
+    content = message.get("content")
+    if message.get("type") in OBJECT_CONTENT and isinstance(content, str):
+        try:
+            message["content"] = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+    return message
+